@@ -16,6 +16,7 @@
 # -----------------------------------------------------------------------------
 """Implement "rose app-run"."""
 
+from concurrent.futures import ThreadPoolExecutor
 from glob import glob
 import os
 import shlex
@@ -29,6 +30,7 @@ from metomi.isodatetime.parsers import ISO8601SyntaxError
 from metomi.rose.config import ConfigDumper
 from metomi.rose.date import RoseDateTimeOperator
 from metomi.rose.env import UnboundEnvironmentVariableError, env_var_process
+from metomi.rose.file_watch import get_file_watcher
 from metomi.rose.opt_parse import RoseOptionParser
 from metomi.rose.popen import RosePopenError
 from metomi.rose.reporter import Event, Reporter
@@ -121,6 +123,10 @@ class Poller:
     """Handle the [poll] functionality for AppRunner."""
 
     OLD_DURATION_UNITS = {"h": 3600, "m": 60, "s": 1}
+    FILE_TEST_BATCH_SIZE = 50
+    FILE_TEST_MAX_WORKERS = 8
+    FILE_TEST_RESULTS_MARKER = "**file-test-results**"
+    POLL_MIN_INTERVAL = 1.0  # seconds between file polls woken by changes
 
     def __init__(self, popen, handle_event_func):
         self.popen = popen
@@ -271,50 +277,192 @@ class Poller:
         poll_file_test=None,
     ):
         """Poll, including waiting for delays."""
-        while poll_delays and (poll_test or poll_any_files or poll_all_files):
-            poll_delay = poll_delays.pop(0)
-            if poll_delay:
-                sleep(poll_delay)
-            if poll_test:
-                ret_code = self.popen.run(
-                    poll_test, shell=True, stdout=sys.stdout, stderr=sys.stderr
-                )[0]
-                self.handle_event(PollEvent(time(), poll_test, ret_code == 0))
-                if ret_code == 0:
-                    poll_test = None
-            any_files = list(poll_any_files)
-            for file_ in any_files:
-                if self._poll_file(file_, poll_file_test):
-                    self.handle_event(PollEvent(time(), "any-files", True))
-                    poll_any_files = []
-                    break
-            all_files = list(poll_all_files)
-            for file_ in all_files:
-                if self._poll_file(file_, poll_file_test):
-                    poll_all_files.remove(file_)
-            if all_files and not poll_all_files:
-                self.handle_event(PollEvent(time(), "all-files", True))
+        # Use inotify (if available) to wake as soon as there is a change in
+        # the directories of the files being polled for, so each delay is a
+        # maximum wait rather than a sampling interval.
+        watcher = None
+        if poll_any_files or poll_all_files:
+            watcher = get_file_watcher()
+        try:
+            while poll_delays and (
+                poll_test or poll_any_files or poll_all_files
+            ):
+                if watcher is not None:
+                    for file_ in poll_any_files + poll_all_files:
+                        watcher.watch(watcher.get_watch_dir(file_))
+                poll_delay = poll_delays.pop(0)
+                if poll_delay and watcher is not None:
+                    poll_any_files, poll_all_files = self._wait(
+                        watcher,
+                        poll_delay,
+                        bool(poll_test),
+                        poll_any_files,
+                        poll_all_files,
+                        poll_file_test,
+                    )
+                elif poll_delay:
+                    sleep(poll_delay)
+                if poll_test:
+                    ret_code = self.popen.run(
+                        poll_test,
+                        shell=True,
+                        stdout=sys.stdout,
+                        stderr=sys.stderr,
+                    )[0]
+                    self.handle_event(
+                        PollEvent(time(), poll_test, ret_code == 0)
+                    )
+                    if ret_code == 0:
+                        poll_test = None
+                poll_any_files, poll_all_files = self._poll_files(
+                    poll_any_files, poll_all_files, poll_file_test
+                )
+        finally:
+            if watcher is not None:
+                watcher.close()
         # Return any remaining test-failing files.
         return poll_test, poll_any_files, poll_all_files
 
-    def _poll_file(self, file_: str, poll_file_test: str) -> bool:
-        """Poll for existence of a file."""
-        is_done = False
-        if poll_file_test:
-            test = poll_file_test.replace(
-                r'{}', self.popen.list_to_shell_str([file_])
+    def _wait(
+        self,
+        watcher,
+        poll_delay,
+        has_poll_test,
+        poll_any_files,
+        poll_all_files,
+        poll_file_test,
+    ):
+        """Wait for a poll delay, re-checking files soon after they change.
+
+        Return early once the files are all found, unless a poll test is
+        still waiting for the full delay.
+
+        Return the remaining (poll_any_files, poll_all_files).
+
+        """
+        t_end = time() + poll_delay
+        t_poll = time()
+        while (poll_any_files or poll_all_files) and watcher.wait(
+            t_end - time()
+        ):
+            # coalesce changes, e.g. from a busy watched directory, so that
+            # the files are polled at most every POLL_MIN_INTERVAL seconds
+            sleep(max(min(t_poll + self.POLL_MIN_INTERVAL, t_end) - time(), 0))
+            watcher.wait(0)
+            t_poll = time()
+            poll_any_files, poll_all_files = self._poll_files(
+                poll_any_files, poll_all_files, poll_file_test
             )
-            is_done = (
-                self.popen.run(
-                    test, shell=True, stdout=sys.stdout, stderr=sys.stderr
-                )[0]
-                == 0
+            # watch any newly created directories
+            for file_ in poll_any_files + poll_all_files:
+                watcher.watch(watcher.get_watch_dir(file_))
+        if has_poll_test or poll_any_files or poll_all_files:
+            sleep(max(t_end - time(), 0))
+        return poll_any_files, poll_all_files
+
+    def _poll_files(self, poll_any_files, poll_all_files, poll_file_test):
+        """Poll for any-files and all-files.
+
+        Return the remaining (poll_any_files, poll_all_files).
+
+        """
+        test_results = None
+        if poll_file_test and (poll_any_files or poll_all_files):
+            test_results = self._run_file_tests(
+                list(dict.fromkeys(poll_any_files + poll_all_files)),
+                poll_file_test,
             )
-        else:
+        for file_ in poll_any_files:
+            if self._poll_file(file_, test_results):
+                self.handle_event(PollEvent(time(), "any-files", True))
+                poll_any_files = []
+                break
+        all_files = list(poll_all_files)
+        poll_all_files = [
+            file_
+            for file_ in all_files
+            if not self._poll_file(file_, test_results)
+        ]
+        if all_files and not poll_all_files:
+            self.handle_event(PollEvent(time(), "all-files", True))
+        return poll_any_files, poll_all_files
+
+    def _poll_file(self, file_: str, test_results: Optional[dict]) -> bool:
+        """Poll for existence of a file.
+
+        If test_results is specified, use the result of the file test for the
+        file in it rather than checking for its existence.
+
+        """
+        if test_results is None:
             is_done = bool(glob(file_))
+        else:
+            is_done = test_results[file_]
         self.handle_event(PollEvent(time(), "file:" + file_, is_done))
         return is_done
 
+    def _run_file_tests(self, files, poll_file_test):
+        """Run the file test for each file.
+
+        The tests are run in batches of FILE_TEST_BATCH_SIZE files per shell,
+        with up to FILE_TEST_MAX_WORKERS batches running at once.
+
+        Return a dict {file: is_done, ...}.
+
+        """
+        batches = [
+            files[i : i + self.FILE_TEST_BATCH_SIZE]
+            for i in range(0, len(files), self.FILE_TEST_BATCH_SIZE)
+        ]
+        if len(batches) == 1:
+            results = [self._run_file_test_batch(files, poll_file_test)]
+        else:
+            with ThreadPoolExecutor(
+                max_workers=min(len(batches), self.FILE_TEST_MAX_WORKERS)
+            ) as executor:
+                results = executor.map(
+                    lambda batch: self._run_file_test_batch(
+                        batch, poll_file_test
+                    ),
+                    batches,
+                )
+        test_results = {}
+        for batch, batch_results in zip(batches, results):
+            test_results.update(zip(batch, batch_results))
+        return test_results
+
+    def _run_file_test_batch(self, files, poll_file_test):
+        """Run the file test for each file in a single shell.
+
+        Each test runs in its own sub-shell. The standard output of the tests
+        is passed on and the return codes are reported on a final line.
+
+        Return a list of booleans, True for each file that passes the test.
+
+        """
+        script = 'rets='
+        for file_ in files:
+            test = poll_file_test.replace(
+                r'{}', self.popen.list_to_shell_str([file_])
+            )
+            script += f'\n({test})\nrets="$rets $?"'
+        script += (
+            f"\nprintf '\\n%s%s\\n' '{self.FILE_TEST_RESULTS_MARKER}'"
+            ' "$rets"'
+        )
+        stdout = self.popen.run(script, shell=True, stderr=sys.stderr)[1]
+        stdout, _, rets = stdout.rpartition(
+            f'\n{self.FILE_TEST_RESULTS_MARKER}'
+        )
+        if stdout:
+            sys.stdout.write(stdout)
+            sys.stdout.flush()
+        rets = rets.split()
+        if len(rets) != len(files):
+            # the shell did not complete
+            return [False] * len(files)
+        return [ret == '0' for ret in rets]
+
 
 class BuiltinApp:
 
@@ -368,14 +516,27 @@ class AppRunner(Runner):
 
     def __init__(self, *args, **kwargs):
         Runner.__init__(self, *args, **kwargs)
-        path = os.path.dirname(
-            os.path.dirname(sys.modules["metomi.rose"].__file__)
-        )
-        self.builtins_manager = SchemeHandlersManager(
-            [path], "rose.apps", ["run"], None, *args, **kwargs
-        )
+        self._builtins_manager_args = (args, kwargs)
+        self._builtins_manager = None
         self.date_time_oper = RoseDateTimeOperator()
 
+    @property
+    def builtins_manager(self):
+        """The manager of the builtin applications.
+
+        The builtin application modules are only imported when first needed.
+
+        """
+        if self._builtins_manager is None:
+            args, kwargs = self._builtins_manager_args
+            path = os.path.dirname(
+                os.path.dirname(sys.modules["metomi.rose"].__file__)
+            )
+            self._builtins_manager = SchemeHandlersManager(
+                [path], "rose.apps", ["run"], None, *args, **kwargs
+            )
+        return self._builtins_manager
+
     def run_impl(self, opts, args, uuid, work_files):
         """The actual logic for a run."""
 
@@ -74,6 +74,7 @@ Functions:
     .. autosummary::
        metomi.rose.config.load
        metomi.rose.config.dump
+       metomi.rose.config.dumps
 
 Limitations:
     - The loader does not handle trailing comments.
@@ -89,12 +90,19 @@ What about the standard library ConfigParser? Well, it is problematic:
 
 import copy
 from functools import cmp_to_key
+from hashlib import sha1
+from io import BytesIO, StringIO
 import os.path
+import pickle
 import re
 import shlex
+from stat import S_IWGRP, S_IWOTH
 import sys
+from sys import intern
 from tempfile import NamedTemporaryFile, SpooledTemporaryFile
+from time import time
 
+import metomi.rose
 from metomi.rose.env import env_var_escape
 from metomi.rose.unicode_utils import write_safely
 
@@ -164,7 +172,9 @@ class ConfigNode:
 
     """
 
-    __slots__ = ["value", "state", "comments"]
+    # Comments are stored as None until needed, so that the many nodes
+    # without comments do not each need an empty list.
+    __slots__ = ["value", "state", "_comments"]
 
     STATE_NORMAL = ""
     """The default state of a ConfigNode."""
@@ -177,18 +187,27 @@ class ConfigNode:
     def __init__(self, value=None, state=STATE_NORMAL, comments=None):
         if value is None:
             value = {}
-        if comments is None:
-            comments = []
         self.value = value
         self.state = state
-        self.comments = comments
+        self._comments = comments or None
+
+    @property
+    def comments(self):
+        """The list of comments of this node."""
+        if self._comments is None:
+            self._comments = []
+        return self._comments
+
+    @comments.setter
+    def comments(self, comments):
+        self._comments = comments
 
     def __repr__(self):
         return str(
             {
                 "value": self.value,
                 "state": self.state,
-                "comments": self.comments,
+                "comments": self._comments or [],
             }
         )
 
@@ -223,7 +242,7 @@ class ConfigNode:
                         not isinstance(node_1.value, dict)
                         and node_1.value != node_2.value
                     )
-                    or node_1.comments != node_2.comments
+                    or (node_1._comments or []) != (node_2._comments or [])
                 ):
                     return False
             for keys_2, node_2 in other.walk(no_ignore=True):
@@ -654,6 +673,130 @@ class ConfigNode:
         diff.set_from_configs(other_config_node, self)
         return diff
 
+    def __deepcopy__(self, memo):
+        """Return a deep copy of this node.
+
+        This is much quicker than the generic deepcopy for a tree of nodes
+        with string values and lists of string comments.
+
+        """
+        node_copy = memo.get(id(self))
+        if node_copy is not None:
+            return node_copy
+        cls = type(self)
+        node_copy = cls.__new__(cls)
+        memo[id(self)] = node_copy
+        value = self.value
+        if isinstance(value, dict):
+            value = {
+                key: (
+                    node.__deepcopy__(memo)
+                    if type(node) is ConfigNode
+                    else copy.deepcopy(node, memo)
+                )
+                for key, node in value.items()
+            }
+        elif not isinstance(value, str):
+            value = copy.deepcopy(value, memo)
+        comments = self._comments
+        if isinstance(comments, list):
+            comments = list(comments)
+        elif comments is not None:
+            comments = copy.deepcopy(comments, memo)
+        node_copy.value = value
+        node_copy.state = self.state
+        node_copy._comments = comments
+        if hasattr(self, "__dict__"):
+            # attributes of a subclass
+            node_copy.__dict__.update(copy.deepcopy(self.__dict__, memo))
+        return node_copy
+
+    def overlay(self, other):
+        """Apply a copy of the settings in another node on top of this node.
+
+        This is how an optional configuration is combined with its main
+        configuration. Sections present in both nodes take the state and
+        comments of the other node, other settings are replaced.
+
+        Args:
+            other (ConfigNode): The node to apply to this node.
+
+        Returns:
+            ConfigNode: This config node.
+
+        Examples:
+            >>> config_node = ConfigNode()
+            >>> _ = config_node.set(keys=['foo', 'bar'], value='Bar')
+            >>> _ = config_node.set(keys=['foo', 'baz'], value='Baz')
+            >>> opt_config_node = ConfigNode()
+            >>> _ = opt_config_node.set(keys=['foo', 'bar'], value='Opt',
+            ...                         state=ConfigNode.STATE_USER_IGNORED)
+            >>> _ = opt_config_node.set(keys=['qux'], value='Qux')
+            >>> _ = config_node.overlay(opt_config_node)
+            >>> [keys for keys, sub_node in config_node.walk(no_ignore=True)]
+            [['', 'qux'], ['foo'], ['foo', 'baz']]
+
+        """
+        if not isinstance(self.value, dict):
+            self.value = {}
+        # Reversed for the same order of new keys as ConfigNode.walk.
+        for key, node in reversed(other.value.items()):
+            old_node = self.value.get(key)
+            if (
+                isinstance(node.value, dict)
+                and old_node is not None
+                and isinstance(old_node.value, dict)
+            ):
+                old_node.state = node.state
+                old_node.comments = copy.deepcopy(node._comments)
+                old_node.overlay(node)
+            else:
+                self.value[key] = copy.deepcopy(node)
+        return self
+
+    def underlay(self, other, no_ignore=False):
+        """Apply a copy of the settings in another node beneath this node.
+
+        This is how a configuration inherits from its imports: settings
+        already in this node win, settings only in the other node are added.
+        Sections present in both nodes keep the state and comments of this
+        node.
+
+        Args:
+            other (ConfigNode): The node to apply beneath this node.
+            no_ignore (bool): If True, skip ignored nodes in the other node.
+
+        Returns:
+            ConfigNode: This config node.
+
+        Examples:
+            >>> config_node = ConfigNode()
+            >>> _ = config_node.set(keys=['foo', 'bar'], value='Bar')
+            >>> base_config_node = ConfigNode()
+            >>> _ = base_config_node.set(keys=['foo', 'bar'], value='Base')
+            >>> _ = base_config_node.set(keys=['foo', 'baz'], value='Baz')
+            >>> _ = base_config_node.set(keys=['qux'], value='Qux',
+            ...                          state=ConfigNode.STATE_USER_IGNORED)
+            >>> _ = config_node.underlay(base_config_node, no_ignore=True)
+            >>> [keys for keys, sub_node in config_node.walk()]
+            [['foo'], ['foo', 'baz'], ['foo', 'bar']]
+            >>> config_node.get_value(keys=['foo', 'bar'])
+            'Bar'
+
+        """
+        if not isinstance(self.value, dict):
+            return self
+        # Reversed for the same order of new keys as ConfigNode.walk.
+        for key, node in reversed(other.value.items()):
+            if no_ignore and node.state:
+                continue
+            old_node = self.value.get(key)
+            if old_node is None:
+                self.value[key] = copy.deepcopy(node)
+            elif isinstance(node.value, dict):
+                old_node.underlay(node, no_ignore)
+        return self
+
     def __getstate__(self):
         """Avoid pickling the STATE constants within a deepcopy.
 
@@ -663,14 +806,14 @@ class ConfigNode:
         return {
             "state": self.state,
             "value": self.value,
-            "comments": self.comments,
+            "comments": self._comments,
         }
 
     def __setstate__(self, state):
         """Read in the results of __getstate__."""
         self.state = state["state"]
         self.value = state["value"]
-        self.comments = state["comments"]
+        self._comments = state["comments"] or None
 
 
 class ConfigNodeDiff:
@@ -750,26 +893,89 @@ class ConfigNodeDiff:
             [(('foo',), (None, '', []))]
 
         """
-        settings_1 = {}
-        settings_2 = {}
-        for config_node, settings in [
-            (config_node_1, settings_1),
-            (config_node_2, settings_2),
-        ]:
-            for keys, node in config_node.walk():
-                value = node.value
-                if isinstance(node.value, dict):
-                    value = None
-                settings[tuple(keys)] = (value, node.state, node.comments)
-        for keys in set(settings_2) - set(settings_1):
-            self.set_added_setting(keys, settings_2[keys])
-        for keys in set(settings_1) - set(settings_2):
-            self.set_removed_setting(keys, settings_1[keys])
-        for keys in set(settings_1).intersection(set(settings_2)):
-            if settings_1[keys] != settings_2[keys]:
-                self.set_modified_setting(
-                    keys, settings_1[keys], settings_2[keys]
+        self._set_from_nodes((), config_node_1, config_node_2)
+
+    def _set_from_nodes(self, keys, node_1, node_2):
+        """Add the differences between the sub-nodes of node_1 and node_2.
+
+        Sections (or other nodes) with the same content are skipped without
+        looking at each of their settings.
+
+        """
+        sub_nodes_1 = self._get_sub_nodes(node_1)
+        sub_nodes_2 = self._get_sub_nodes(node_2)
+        for key, sub_node_1 in sub_nodes_1.items():
+            sub_node_2 = sub_nodes_2.get(key)
+            if sub_node_1 is sub_node_2:
+                continue
+            sub_keys = keys + (key,)
+            keys_1 = self._get_keys_of(sub_keys, sub_node_1)
+            data_1 = self._get_data_of(sub_node_1)
+            if sub_node_2 is None:
+                self.set_removed_setting(keys_1, data_1)
+                self._set_from_nodes(sub_keys, sub_node_1, None)
+                continue
+            keys_2 = self._get_keys_of(sub_keys, sub_node_2)
+            data_2 = self._get_data_of(sub_node_2)
+            if keys_1 != keys_2:
+                self.set_removed_setting(keys_1, data_1)
+                self.set_added_setting(keys_2, data_2)
+            elif data_1 != data_2:
+                self.set_modified_setting(keys_1, data_1, data_2)
+            content_1 = self._get_content_of(sub_node_1)
+            if content_1 is None or content_1 != self._get_content_of(
+                sub_node_2
+            ):
+                self._set_from_nodes(sub_keys, sub_node_1, sub_node_2)
+        for key, sub_node_2 in sub_nodes_2.items():
+            if key not in sub_nodes_1:
+                sub_keys = keys + (key,)
+                self.set_added_setting(
+                    self._get_keys_of(sub_keys, sub_node_2),
+                    self._get_data_of(sub_node_2),
                 )
+                self._set_from_nodes(sub_keys, None, sub_node_2)
+
+    @staticmethod
+    def _get_sub_nodes(node):
+        """Return the sub-nodes of node, keyed by name."""
+        if node is None or not isinstance(node.value, dict):
+            return {}
+        return node.value
+
+    @staticmethod
+    def _get_keys_of(keys, node):
+        """Return the keys of a node in a diff, as from ConfigNode.walk."""
+        if len(keys) == 1 and not isinstance(node.value, dict):
+            return ("",) + keys
+        return keys
+
+    @staticmethod
+    def _get_data_of(node):
+        """Return the data of a node in a diff."""
+        value = node.value
+        if isinstance(value, dict):
+            value = None
+        return (value, node.state, node._comments or [])
+
+    @staticmethod
+    def _get_content_of(node):
+        """Return the content of the settings in a section, if possible.
+
+        Return None if node is not a section of settings, e.g. if it has
+        sub-sections.
+
+        """
+        if not isinstance(node.value, dict):
+            return ()
+        content = []
+        for key, sub_node in node.value.items():
+            if isinstance(sub_node.value, dict):
+                return None
+            content.append(
+                (key, sub_node.value, sub_node.state, sub_node._comments or [])
+            )
+        return content
 
     def get_as_opt_config(self, base_config=None):
         """Return a ConfigNode such that main + new_node = main + diff.
@@ -1149,10 +1355,9 @@ class ConfigDumper:
                 True, add [] before root level options.
 
         """
-        if sort_sections is None:
-            sort_sections = sort_settings
-        if sort_option_items is None:
-            sort_option_items = sort_settings
+        text = self.dumps(
+            root, sort_sections, sort_option_items, env_escape_ok, concat_mode
+        )
         handle = target
         if not hasattr(target, "write") or not hasattr(target, "close"):
             target_dir = os.path.dirname(target)
@@ -1166,13 +1371,50 @@ class ConfigDumper:
                 dir=target_dir,
                 delete=False,
             )
+        write_safely(text, handle)
+        if handle is not target:
+            handle.close()
+            if not os.path.exists(target):
+                open(target, "a").close()
+            os.chmod(handle.name, os.stat(target).st_mode)
+            os.rename(handle.name, target)
+
+    __call__ = dump
+
+    def dumps(
+        self,
+        root,
+        sort_sections=None,
+        sort_option_items=None,
+        env_escape_ok=False,
+        concat_mode=False,
+    ):
+        """Format a ConfigNode object and return the result as a string.
+
+        See "dump" for the arguments.
+
+        Examples:
+            >>> config_node = ConfigNode()
+            >>> _ = config_node.set(keys=['foo', 'bar'], value='Bar\\nBaz')
+            >>> ConfigDumper().dumps(config_node)
+            '[foo]\\nbar=Bar\\n   =Baz\\n'
+
+        """
+        if sort_sections is None:
+            section_sort_key = setting_sort_key
+        else:
+            section_sort_key = cmp_to_key(sort_sections)
+        if sort_option_items is None:
+            option_sort_key = setting_sort_key
+        else:
+            option_sort_key = cmp_to_key(sort_option_items)
+        lines = []
         blank = ""
-        if root.comments:
-            for comment in root.comments:
-                write_safely(self._comment_format(comment), handle)
+        if root._comments:
+            for comment in root._comments:
+                lines.append(self._comment_format(comment))
             blank = "\n"
-        root_keys = list(root.value.keys())
-        root_keys.sort(key=cmp_to_key(sort_sections))
+        root_keys = sorted(root.value, key=section_sort_key)
         root_option_keys = []
         section_keys = []
         for key in root_keys:
@@ -1181,48 +1423,38 @@ class ConfigDumper:
             else:
                 section_keys.append(key)
         if root_option_keys:
-            write_safely(blank, handle)
+            lines.append(blank)
             blank = "\n"
             if concat_mode:
-                handle.write(CHAR_SECTION_OPEN + CHAR_SECTION_CLOSE + "\n")
+                lines.append(CHAR_SECTION_OPEN + CHAR_SECTION_CLOSE + "\n")
             for key in root_option_keys:
                 self._string_node_dump(
-                    key, root.value[key], handle, env_escape_ok
+                    key, root.value[key], lines, env_escape_ok
                 )
         for section_key in section_keys:
             section_node = root.value[section_key]
-            write_safely(blank, handle)
+            lines.append(blank)
             blank = "\n"
-            for comment in section_node.comments:
-                write_safely(self._comment_format(comment), handle)
-            write_safely(
-                "%(open)s%(state)s%(key)s%(close)s\n"
-                % {
-                    "open": CHAR_SECTION_OPEN,
-                    "state": section_node.state,
-                    "key": section_key,
-                    "close": CHAR_SECTION_CLOSE,
-                },
-                handle,
+            for comment in section_node._comments or ():
+                lines.append(self._comment_format(comment))
+            lines.append(
+                CHAR_SECTION_OPEN
+                + section_node.state
+                + section_key
+                + CHAR_SECTION_CLOSE
+                + "\n"
             )
-            keys = list(section_node.value.keys())
-            keys.sort(key=cmp_to_key(sort_option_items))
-            for key in keys:
-                value = section_node.value[key]
-                self._string_node_dump(key, value, handle, env_escape_ok)
-        if handle is not target:
-            handle.close()
-            if not os.path.exists(target):
-                open(target, "a").close()
-            os.chmod(handle.name, os.stat(target).st_mode)
-            os.rename(handle.name, target)
-
-    __call__ = dump
+            options = section_node.value
+            for key in sorted(options, key=option_sort_key):
+                self._string_node_dump(
+                    key, options[key], lines, env_escape_ok
+                )
+        return "".join(lines)
 
-    def _string_node_dump(self, key, node, handle, env_escape_ok):
-        """Helper for self.dump().
+    def _string_node_dump(self, key, node, lines, env_escape_ok):
+        """Helper for self.dumps().
 
-        Return text representation of a string node.
+        Append text representation of a string node to lines.
 
         """
         state = node.state
@@ -1230,19 +1462,15 @@ class ConfigDumper:
             values = node.value.decode().split("\n")
         except AttributeError:
             values = node.value.split("\n")
-        for comment in node.comments:
-            write_safely(self._comment_format(comment), handle)
-        value0 = values.pop(0)
+        for comment in node._comments or ():
+            lines.append(self._comment_format(comment))
         if env_escape_ok:
-            value0 = env_var_escape(value0)
-        write_safely(state + key + self.char_assign + value0, handle)
-        write_safely("\n", handle)
-        if values:
-            indent = " " * len(state + key)
-            for value in values:
-                if env_escape_ok:
-                    value = env_var_escape(value)
-                write_safely(indent + self.char_assign + value + "\n", handle)
+            values = [env_var_escape(value) for value in values]
+        lines.append(state + key + self.char_assign + values[0] + "\n")
+        if len(values) > 1:
+            indent = " " * len(state + key) + self.char_assign
+            for value in values[1:]:
+                lines.append(indent + value + "\n")
 
     @classmethod
     def _comment_format(cls, comment):
@@ -1254,6 +1482,11 @@ class ConfigLoader:
 
     """Loader of an INI format configuration into a ConfigNode object.
 
+    If a cache directory is specified, or the ROSE_CONF_CACHE_DIR environment
+    variable is set, files loaded by path into new nodes are cached there in
+    binary form. A file is re-parsed only if its path, size, modification
+    time or the version of Rose has changed.
+
     Example:
         >>> with open('config.conf', 'w+') as config_file:
         ...     _ = config_file.write('''
@@ -1277,12 +1510,19 @@ class ConfigLoader:
     TYPE_SECTION = "TYPE_SECTION"
     TYPE_OPTION = "TYPE_OPTION"
     UNKNOWN_NAME = "<???>"
+    CACHE_DIR_ENV = "ROSE_CONF_CACHE_DIR"
+    # Don't cache files modified more recently than this (in seconds), a
+    # change within the resolution of the file system clock may go unnoticed
+    CACHE_MIN_AGE = 2.0
+    # Increment on any change to what is pickled, e.g. the ConfigNode layout
+    CACHE_FORMAT_VERSION = 1
 
     def __init__(
         self,
         char_assign=CHAR_ASSIGN,
         char_comment=CHAR_COMMENT,
         allow_sections=True,
+        cache_dir=None,
     ):
         """Initialise the configuration utility.
 
@@ -1292,11 +1532,16 @@ class ConfigLoader:
             char_comment (str): the character to indicate the start of a
                 comment.
             allow_sections (bool): whether to permit sections in the config.
+            cache_dir (str): directory to cache parsed files in. If not
+                specified, use $ROSE_CONF_CACHE_DIR, if set.
 
         """
         self.char_assign = char_assign
         self.char_comment = char_comment
         self.allow_sections = allow_sections
+        if cache_dir is None:
+            cache_dir = os.getenv(self.CACHE_DIR_ENV) or None
+        self.cache_dir = cache_dir
         self.re_option = re.compile(
             r"^(?P<state>!?!?)(?P<option>[^\s"
             + char_assign
@@ -1420,6 +1665,7 @@ class ConfigLoader:
             opt_conf_file_name = os.path.join(
                 source_dir, OPT_CONFIG_DIR, opt_conf_file_name_base
             )
+            opt_node = None
             try:
                 if mark_opt_confs:
                     self.load(
@@ -1433,6 +1679,13 @@ class ConfigLoader:
                             )
                         ],
                     )
+                elif return_config_map:
+                    # Parse once, for both the config map and the node.
+                    opt_node = self.load(opt_conf_file_name)
+                    if self._can_load_node(opt_node, node):
+                        self._load_node(opt_node, node)
+                    else:
+                        self.load(opt_conf_file_name, node)
                 else:
                     self.load(opt_conf_file_name, node)
             except IOError:
@@ -1445,7 +1698,9 @@ class ConfigLoader:
                 if used_keys is not None and key not in used_keys:
                     used_keys.append(key)
                 if return_config_map:
-                    config_map[key] = self.load(opt_conf_file_name)
+                    if opt_node is None:
+                        opt_node = self.load(opt_conf_file_name)
+                    config_map[key] = opt_node
         if defines is not None:
             node = self.load(defines, node)
         if return_config_map:
@@ -1483,46 +1738,134 @@ class ConfigLoader:
             {'value': 'Bar', 'state': '!', 'comments': [' Some comment']}
 
         """
+        if (
+            self.cache_dir
+            and node is None
+            and default_comments is None
+            and isinstance(source, str)
+        ):
+            return self._load_cached(source)
+        return self._parse(source, node, default_comments)
+
+    __call__ = load
+
+    def _load_cached(self, source):
+        """Load a file path into a new node via the cache."""
+        file_name = os.path.abspath(source)
+        try:
+            stat = os.stat(file_name)
+        except OSError:
+            return self._parse(source)  # raise the usual error
+        cache_key = (
+            file_name,
+            self.char_assign,
+            self.char_comment,
+            self.allow_sections,
+        )
+        cache_file = os.path.join(
+            self.cache_dir, sha1(repr(cache_key).encode()).hexdigest()
+        )
+        cache_key += (
+            stat.st_size,
+            stat.st_mtime_ns,
+            metomi.rose.__version__,
+            self.CACHE_FORMAT_VERSION,
+        )
+        # Only unpickle files that no other user could have written.
+        if self._is_cache_dir_private():
+            try:
+                with open(
+                    os.open(cache_file, os.O_RDONLY | os.O_NOFOLLOW), "rb"
+                ) as handle:
+                    if self._is_private(os.fstat(handle.fileno())):
+                        key, node = pickle.load(handle)
+                        if key == cache_key:
+                            return node
+            except Exception:  # missing, unreadable or corrupt
+                pass
+        node = self._parse(source)
+        if time() - stat.st_mtime_ns / 1e9 < self.CACHE_MIN_AGE:
+            return node
+        try:
+            os.makedirs(self.cache_dir, mode=0o700, exist_ok=True)
+            if not self._is_cache_dir_private():
+                return node
+            handle = NamedTemporaryFile(dir=self.cache_dir, delete=False)
+        except OSError:
+            return node  # the cache is an optimisation only
+        try:
+            with handle:
+                pickle.dump(
+                    (cache_key, node), handle, pickle.HIGHEST_PROTOCOL
+                )
+            os.replace(handle.name, cache_file)
+        except Exception:
+            os.unlink(handle.name)
+        return node
+
+    def _is_cache_dir_private(self):
+        """Return True if the cache directory is private to this user."""
+        try:
+            return self._is_private(os.stat(self.cache_dir))
+        except OSError:
+            return False
+
+    @staticmethod
+    def _is_private(stat):
+        """Return True if stat is of a file only this user can write to."""
+        return stat.st_uid == os.getuid() and not stat.st_mode & (
+            S_IWGRP | S_IWOTH
+        )
+
+    def _parse(self, source, node=None, default_comments=None):
+        """Parse source into node, see "load"."""
         if node is None:
             node = ConfigNode()
         handle, file_name = self._get_file_and_name(source)
         if isinstance(file_name, int):  # Probably a temporary file
             file_name = ""
-        keys = []  # Currently position under root node
-        type_ = None  # Type of current node, section or option?
+        try:
+            lines = self._read_lines(handle, source)
+        finally:
+            if handle is not source:
+                handle.close()
+        char_assign = self.char_assign
+        char_comment = self.char_comment
+        re_section_match = self.RE_SECTION.match
+        re_option_match = self.re_option.match
+        if not isinstance(node.value, dict):
+            node.value = {}
+        section_node = node  # Current section node, root if none
+        option_node = None  # Current option node, for continuation lines
+        values = None  # Lines of a multi-line value of the option node
         comments = None  # Comments associated with next node
         line_num = 0
-        # Note: "for line in handle:" hangs for sys.stdin
-        while True:
-            line = handle.readline()
-            if isinstance(line, bytes):
-                try:
-                    line = line.decode()
-                except UnicodeDecodeError as exc:
-                    raise ConfigDecodeError(source, exc)
-            if not line:
-                break
+        for line in lines:
             line_num += 1
             # White space and comments
             if line.isspace():
                 comments = []
                 continue
-            elif line.lstrip().startswith(self.char_comment):
+            elif line.lstrip().startswith(char_comment):
                 if comments is None:
                     node.comments.append(self._comment_strip(line))
                 else:
                     comments.append(self._comment_strip(line))
                 continue
             # Handle option continuation.
-            if type_ == self.TYPE_OPTION and line[0].isspace():
-                value = node.get(keys[:]).value
+            if option_node is not None and line[0].isspace():
                 value_cont = line.strip()
-                if value_cont.startswith(self.char_assign):
+                if value_cont.startswith(char_assign):
                     value_cont = value_cont[1:]
-                node.set(keys[:], value + "\n" + value_cont)
+                if values is None:
+                    values = [option_node.value]
+                values.append(value_cont)
                 continue
+            if values is not None:
+                option_node.value = "\n".join(values)
+                values = None
             # Match a section header?
-            match = self.RE_SECTION.match(line)
+            match = re_section_match(line)
             if match:
                 if self.allow_sections:
                     head, section, state = match.group(
@@ -1537,25 +1880,24 @@ class ConfigLoader:
                             len(head) + bad_index,
                             line,
                         )
-                    # Find position under root node
-                    if type_ == self.TYPE_OPTION:
-                        keys.pop()
-                    if keys:
-                        keys.pop()
+                    option_node = None
                     section = section.strip()
                     if section:
-                        keys.append(section)
-                        type_ = self.TYPE_SECTION
-                    else:
-                        keys = []
-                        type_ = None
-                    section_node = node.get(keys[:])
-                    if section_node is None:
-                        node.set(keys[:], {}, state, comments)
+                        if not isinstance(node.value, dict):
+                            node.value = {}
+                        section_node = node.value.get(section)
+                        if section_node is None:
+                            section_node = ConfigNode(
+                                {}, intern(state), comments
+                            )
+                            node.value[section] = section_node
+                            comments = []
+                            continue
                     else:
-                        section_node.state = state
-                        if comments:
-                            section_node.comments += comments
+                        section_node = node
+                    section_node.state = intern(state)
+                    if comments:
+                        section_node.comments += comments
                     comments = []
                     continue
                 else:
@@ -1567,7 +1909,7 @@ class ConfigLoader:
                         line,
                     )
             # Match the start of an option setting?
-            match = self.re_option.match(line)
+            match = re_option_match(line)
             if not match:
                 if self.allow_sections:
                     err = ConfigSyntaxError.BAD_SYNTAX
@@ -1575,18 +1917,78 @@ class ConfigLoader:
                     err = ConfigSyntaxError.BAD_SYNTAX_NO_SECTIONS
                 raise ConfigSyntaxError(err, file_name, line_num, 0, line)
             option, value, state = match.group("option", "value", "state")
-            if type_ == self.TYPE_OPTION:
-                keys.pop()
-            keys.append(option)
-            type_ = self.TYPE_OPTION
-            value = value.strip()
+            # Option names and states are repeated in many sections.
+            option = intern(option)
+            state = intern(state)
             if comments is not None and default_comments is not None:
                 comments += default_comments
-            node.set(keys[:], value.strip(), state, comments)
+            if not isinstance(section_node.value, dict):
+                section_node.value = {}
+            option_node = section_node.value.get(option)
+            if option_node is None:
+                option_node = ConfigNode(value.strip(), state, comments)
+                section_node.value[option] = option_node
+            else:
+                option_node.value = value.strip()
+                option_node.state = state
+                if comments is not None:
+                    option_node.comments = comments or None
             comments = []
+        if values is not None:
+            option_node.value = "\n".join(values)
         return node
 
-    __call__ = load
+    @staticmethod
+    def _load_node(source, node):
+        """Load a copy of the settings of a newly loaded node into node.
+
+        The result is as if the file of source was loaded into node, unless
+        the file has a root level setting and a section of the same name,
+        or _can_load_node returns False.
+
+        """
+        node.comments += source.comments
+        if source.state:
+            node.state = source.state
+        if not isinstance(node.value, dict):
+            node.value = {}
+        for key, source_sub_node in source.value.items():
+            sub_node = node.value.get(key)
+            if sub_node is None or not isinstance(
+                source_sub_node.value, dict
+            ):
+                node.value[key] = copy.deepcopy(source_sub_node)
+                continue
+            # An existing section
+            sub_node.state = source_sub_node.state
+            sub_node.comments += source_sub_node.comments
+            if not source_sub_node.value:
+                continue
+            if not isinstance(sub_node.value, dict):
+                sub_node.value = {}
+            for opt_key, opt_node in source_sub_node.value.items():
+                sub_node.value[opt_key] = copy.deepcopy(opt_node)
+
+    @staticmethod
+    def _can_load_node(source, node):
+        """Return True if _load_node(source, node) is the same as loading
+        the file of source into node.
+
+        A setting on the first line of a file, with no blank line before it,
+        keeps the comments of an existing setting when loaded into node, but
+        source does not record whether there was a blank line.
+
+        """
+        first_key = next(iter(source.value), None)
+        if first_key is None:
+            return True
+        sub_node = node.value.get(first_key)
+        return (
+            sub_node is None
+            or not sub_node._comments
+            or isinstance(source.value[first_key].value, dict)
+            or bool(source.value[first_key]._comments)
+        )
 
     @classmethod
     def _check_section_value(cls, section):
@@ -1639,6 +2041,32 @@ class ConfigLoader:
                 return len(scheme) + index_of["("] + 1
         return -1
 
+    @staticmethod
+    def _read_lines(handle, source):
+        """Read all of handle, return its lines with line endings.
+
+        Lines are split on "\\n" only, as with "handle.readline()".
+        """
+        data = handle.read()
+        if isinstance(data, bytes):
+            try:
+                data = data.decode()
+            except UnicodeDecodeError:
+                return ConfigLoader._decode_lines(data, source)
+        return StringIO(data)
+
+    @staticmethod
+    def _decode_lines(data, source):
+        """Decode data line by line, raise ConfigDecodeError at a bad line.
+
+        This allows the lines before the bad line to be parsed first.
+        """
+        for line in BytesIO(data):
+            try:
+                yield line.decode()
+            except UnicodeDecodeError as exc:
+                raise ConfigDecodeError(source, exc)
+
     @classmethod
     def _comment_strip(cls, line):
         """Strip comment character and whitespace from a comment."""
@@ -1765,6 +2193,18 @@ def dump(
     )
 
 
+def dumps(
+    root,
+    sort_sections=None,
+    sort_option_items=None,
+    env_escape_ok=False,
+):
+    """Shorthand for :py:func:`ConfigDumper.dumps`."""
+    return ConfigDumper().dumps(
+        root, sort_sections, sort_option_items, env_escape_ok
+    )
+
+
 def load(source, root=None):
     """Shorthand for :py:func:`ConfigLoader.load`."""
     return ConfigLoader()(source, root)
@@ -1783,6 +2223,27 @@ def sort_element(elem_1, elem_2):
         return (elem_1 > elem_2) - (elem_1 < elem_2)
 
 
+def setting_sort_key(setting):
+    """Return a key to sort sections and options, as with sort_settings.
+
+    Examples:
+        >>> sorted(['foo(10)', 'foo(2)', 'foo(bar)', 'foo', 'bar'],
+        ...        key=setting_sort_key)
+        ['bar', 'foo', 'foo(2)', 'foo(10)', 'foo(bar)']
+
+    """
+    if not isinstance(setting, str):
+        return (setting,)
+    match = REC_SETTING_ELEMENT.match(setting)
+    if not match:
+        return (setting,)
+    text, element = match.groups()
+    # Elements of a text sort after the text alone, numbers first.
+    if element.isdigit():
+        return (text + "(", 0, int(element))
+    return (text + "(", 1, element)
+
+
 def sort_settings(setting_1, setting_2):
     """Sort sections and options, by numeric element if possible."""
     if not isinstance(setting_1, str) or not isinstance(setting_2, str):
@@ -80,6 +80,8 @@ class UpgradeController:
             except OSError:
                 # This can occur when access is not allowed to metadata files.
                 continue
+            except metomi.rose.upgrade.UpgradeMacroCycleError:
+                continue
             self.config_dict[config_name] = app_config
             self.config_directory_dict[config_name] = app_directory
             self.config_manager_dict[config_name] = manager
@@ -17,14 +17,24 @@
 # -----------------------------------------------------------------------------
 """Rose configuration directory inheritance."""
 
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+import copy
 from io import StringIO
 import os
 import shlex
 from shutil import rmtree
 from tempfile import mkdtemp
+from threading import Lock
+from time import time
 
 from metomi.rose.c3 import mro
-from metomi.rose.config import ConfigDumper, ConfigLoader, ConfigNode
+from metomi.rose.config import (
+    OPT_CONFIG_DIR,
+    ConfigDumper,
+    ConfigLoader,
+    ConfigNode,
+)
 
 
 class BadOptionalConfigurationKeysError(Exception):
@@ -46,13 +56,63 @@ class ConfigTree:
                             in {rel_path: [config_dir_0, ...], ...}
     conf_tree.conf_dirs -- A lineralised list containing the source
                            directories of this configuration tree.
+    conf_tree.conf_name -- The (base) name of the configuration file, which
+                           is not listed in the files.
+
+    The files and file_locs are listed from the conf_dirs on first access.
     """
 
     def __init__(self):
         self.node = ConfigNode()
-        self.files = {}  # {rel path: root, ...}
-        self.file_locs = {}  # {rel path: [root0, ...], ...}
         self.conf_dirs = []
+        self.conf_name = None
+        self._files = None  # {rel path: root, ...}
+        self._file_locs = None  # {rel path: [root0, ...], ...}
+
+    @property
+    def files(self):
+        """A dict of the top files in the configuration tree."""
+        if self._files is None:
+            self._list_files()
+        return self._files
+
+    @files.setter
+    def files(self, value):
+        self._files = value
+
+    @property
+    def file_locs(self):
+        """A dict of all files in the configuration tree."""
+        if self._file_locs is None:
+            self._list_files()
+        return self._file_locs
+
+    @file_locs.setter
+    def file_locs(self, value):
+        self._file_locs = value
+
+    def _list_files(self):
+        """List the files in the conf_dirs into files and file_locs."""
+        files = {}
+        file_locs = {}
+        for conf_dir in self.conf_dirs:
+            for dir_path, dir_names, file_names in os.walk(conf_dir):
+                dir_names[:] = [
+                    dir_ for dir_ in dir_names if not dir_.startswith(".")
+                ]
+                for file_name in file_names:
+                    if file_name == self.conf_name or file_name.startswith(
+                        "."
+                    ):
+                        continue
+                    path = os.path.join(dir_path, file_name)
+                    rel_path = os.path.relpath(path, conf_dir)
+                    files.setdefault(rel_path, conf_dir)
+                    file_locs.setdefault(rel_path, []).append(conf_dir)
+        if self._files is None:
+            self._files = files
+        if self._file_locs is None:
+            self._file_locs = file_locs
 
     def get_file_name_of(self, key):
         """Return the full name of the file indexed by "key".
@@ -77,11 +137,32 @@ class ConfigTree:
 
 class ConfigTreeLoader:
 
-    """Load a Rose configuration with inheritance."""
+    """Load a Rose configuration with inheritance.
+
+    The directories of an inheritance tree are loaded concurrently, a level
+    of imports at a time. Up to DIR_CACHE_SIZE of the most recently used
+    directories are cached for the life of the process, and are re-loaded
+    only if the configuration file or anything in its "opt/" directory has
+    changed.
+    """
+
+    MAX_WORKERS = 8
+    DIR_CACHE_SIZE = 256
+
+    # {(conf_file_name, opt_keys, loader settings): (stats, node, used_keys)}
+    # in order of least to most recently used
+    _dir_cache: 'OrderedDict[tuple, tuple]' = OrderedDict()
+    _dir_cache_lock = Lock()
 
     def __init__(self, *args, **kwargs):
         self.node_loader = ConfigLoader(*args, **kwargs)
 
+    @classmethod
+    def clear_cache(cls):
+        """Forget all cached configuration directories."""
+        with cls._dir_cache_lock:
+            cls._dir_cache.clear()
+
     def load(
         self,
         conf_dir,
@@ -113,24 +194,18 @@ class ConfigTreeLoader:
             conf_dir_paths = []
         conf_dir = self._search(conf_dir, [os.getcwd()] + conf_dir_paths)
         nodes = {}  # {conf_dir: node, ...}
-        conf_file_name = os.path.join(conf_dir, conf_name)
         used_keys = []
-        nodes[conf_dir] = self.node_loader.load_with_opts(
-            conf_file_name,
-            more_keys=opt_keys,
-            used_keys=used_keys,
-            defines=defines,
+        nodes[conf_dir] = self._load_dir(
+            conf_dir, conf_name, opt_keys, used_keys, defines
+        )
+        import_dirs_of = self._load_imports(
+            conf_dir, conf_name, conf_dir_paths, opt_keys, used_keys, nodes
         )
 
         conf_tree = ConfigTree()
+        conf_tree.conf_name = conf_name
         conf_tree.conf_dirs = mro(
-            conf_dir,
-            self._get_base_names,
-            conf_name,
-            conf_dir_paths,
-            opt_keys,
-            used_keys,
-            nodes,
+            conf_dir, self._get_base_names, import_dirs_of
         )
 
         if opt_keys:
@@ -150,55 +225,178 @@ class ConfigTreeLoader:
             conf_tree.node = conf_node
         for t_conf_dir in conf_tree.conf_dirs:
             node = nodes[t_conf_dir]
-            for keys, sub_node in node.walk(no_ignore=no_ignore):
-                if keys == ["", "import"]:
-                    continue
-                if conf_tree.node.get(keys) is None:
-                    conf_tree.node.set(
-                        keys, sub_node.value, sub_node.state, sub_node.comments
-                    )
-            for dir_path, dir_names, file_names in os.walk(t_conf_dir):
-                names = [dir_ for dir_ in dir_names if dir_.startswith(".")]
-                for name in names:
-                    dir_names.remove(name)
-                for file_name in file_names:
-                    if file_name == conf_name or file_name.startswith("."):
-                        continue
-                    path = os.path.join(dir_path, file_name)
-                    rel_path = os.path.relpath(path, t_conf_dir)
-                    if rel_path not in conf_tree.files:
-                        conf_tree.files[rel_path] = t_conf_dir
-                    if rel_path not in conf_tree.file_locs:
-                        conf_tree.file_locs[rel_path] = []
-                    conf_tree.file_locs[rel_path].append(t_conf_dir)
+            # The nodes are private copies, so drop the import setting here.
+            import_node = node.value.get("import")
+            if import_node is not None and not isinstance(
+                import_node.value, dict
+            ):
+                del node.value["import"]
+            conf_tree.node.underlay(node, no_ignore=no_ignore)
 
         return conf_tree
 
     __call__ = load
 
-    def _get_base_names(
-        self,
-        my_conf_dir,
-        conf_name,
-        conf_dir_paths,
-        opt_keys,
-        used_keys,
-        nodes,
+    def _load_imports(
+        self, conf_dir, conf_name, conf_dir_paths, opt_keys, used_keys, nodes
     ):
+        """Load the configuration directories imported by conf_dir into nodes.
+
+        Directories are loaded concurrently, a level of imports at a time.
+        Return a dict of {conf_dir: [import_conf_dir, ...], ...} for every
+        directory in the inheritance tree.
+
+        """
+        import_dirs_of = {}
+        conf_dirs = [conf_dir]
+        executor = None
+        try:
+            while conf_dirs:
+                new_conf_dirs = []
+                for t_conf_dir in conf_dirs:
+                    import_dirs_of[t_conf_dir] = self._get_import_dirs(
+                        t_conf_dir, conf_dir_paths, nodes
+                    )
+                    for i_conf_dir in import_dirs_of[t_conf_dir]:
+                        if (
+                            i_conf_dir not in nodes
+                            and i_conf_dir not in new_conf_dirs
+                        ):
+                            new_conf_dirs.append(i_conf_dir)
+                if not new_conf_dirs:
+                    break
+                if executor is None:
+                    executor = ThreadPoolExecutor(self.MAX_WORKERS)
+                # Each load has its own used keys, to merge in order.
+                used_keys_list = [[] for _ in new_conf_dirs]
+                for i_conf_dir, i_used_keys, node in zip(
+                    new_conf_dirs,
+                    used_keys_list,
+                    executor.map(
+                        self._load_dir,
+                        new_conf_dirs,
+                        [conf_name] * len(new_conf_dirs),
+                        [opt_keys] * len(new_conf_dirs),
+                        used_keys_list,
+                    ),
+                ):
+                    nodes[i_conf_dir] = node
+                    for key in i_used_keys:
+                        if key not in used_keys:
+                            used_keys.append(key)
+                conf_dirs = new_conf_dirs
+        finally:
+            if executor is not None:
+                executor.shutdown()
+        return import_dirs_of
+
+    def _get_import_dirs(self, my_conf_dir, conf_dir_paths, nodes):
         """Return a list of configuration directories to import."""
         values = shlex.split(nodes[my_conf_dir].get_value(["import"], ""))
-        i_conf_dirs = []
-        for value in values:
-            i_conf_dir = self._search(
+        return [
+            self._search(
                 value, [os.path.dirname(my_conf_dir)] + conf_dir_paths
             )
-            i_conf_file_name = os.path.join(i_conf_dir, conf_name)
-            if nodes.get(i_conf_dir) is None:
-                nodes[i_conf_dir] = self.node_loader.load_with_opts(
-                    i_conf_file_name, more_keys=opt_keys, used_keys=used_keys
-                )
-            i_conf_dirs.append(i_conf_dir)
-        return i_conf_dirs
+            for value in values
+        ]
+
+    @staticmethod
+    def _get_base_names(my_conf_dir, import_dirs_of):
+        """Return a list of configuration directories to import."""
+        return import_dirs_of[my_conf_dir]
+
+    def _load_dir(
+        self, conf_dir, conf_name, opt_keys, used_keys, defines=None
+    ):
+        """Load a configuration directory, with its optional configurations.
+
+        Append the keys of the loaded optional configurations to used_keys.
+        Use the process cache unless there are defines.
+
+        """
+        conf_file_name = os.path.join(conf_dir, conf_name)
+        if defines is not None:
+            return self.node_loader.load_with_opts(
+                conf_file_name,
+                more_keys=opt_keys,
+                used_keys=used_keys,
+                defines=defines,
+            )
+        cache_key = (
+            conf_file_name,
+            tuple(opt_keys or ()),
+            self.node_loader.char_assign,
+            self.node_loader.char_comment,
+            self.node_loader.allow_sections,
+        )
+        stats = self.get_dir_stats(conf_file_name)
+        with self._dir_cache_lock:
+            item = self._dir_cache.get(cache_key)
+            if item is not None:
+                self._dir_cache.move_to_end(cache_key)
+        if stats is not None and item is not None and item[0] == stats:
+            node, keys = item[1:]
+            node = copy.deepcopy(node)
+        else:
+            keys = []
+            node = self.node_loader.load_with_opts(
+                conf_file_name, more_keys=opt_keys, used_keys=keys
+            )
+            if stats is not None:
+                # the cache keeps its own copy, the caller may modify node
+                item = (stats, copy.deepcopy(node), keys)
+                with self._dir_cache_lock:
+                    self._dir_cache[cache_key] = item
+                    self._dir_cache.move_to_end(cache_key)
+                    while len(self._dir_cache) > self.DIR_CACHE_SIZE:
+                        self._dir_cache.popitem(last=False)
+        for key in keys:
+            if key not in used_keys:
+                used_keys.append(key)
+        return node
+
+    @staticmethod
+    def get_dir_stats(conf_file_name):
+        """Return the stats of a configuration file and its optional configs.
+
+        Return None if the configuration cannot be cached, because it does not
+        exist or has been modified too recently to be sure of noticing a
+        further change.
+
+        The stats include the inode and change time of each file, so that
+        a copy that keeps the size and modification time of the original
+        (e.g. "cp -p") is noticed.
+
+        """
+        opt_dir = os.path.join(os.path.dirname(conf_file_name), OPT_CONFIG_DIR)
+        try:
+            file_stats = [(conf_file_name, os.stat(conf_file_name))]
+        except OSError:
+            return None
+        try:
+            opt_dir_stat = os.stat(opt_dir)
+            with os.scandir(opt_dir) as entries:
+                for entry in entries:
+                    file_stats.append((entry.name, entry.stat()))
+        except OSError:
+            pass
+        else:
+            file_stats.append((opt_dir, opt_dir_stat))
+        newest = max(
+            max(stat.st_mtime_ns, stat.st_ctime_ns) for _, stat in file_stats
+        ) / 1e9
+        if time() - newest < ConfigLoader.CACHE_MIN_AGE:
+            return None
+        return sorted(
+            (
+                name,
+                stat.st_size,
+                stat.st_mtime_ns,
+                stat.st_ino,
+                stat.st_ctime_ns,
+            )
+            for name, stat in file_stats
+        )
 
     @classmethod
     def _search(cls, conf_dir, conf_dir_paths):
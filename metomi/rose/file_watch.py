@@ -0,0 +1,130 @@
+# Copyright (C) British Crown (Met Office) & Contributors.
+# This file is part of Rose, a framework for meteorological suites.
+#
+# Rose is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Rose is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Rose. If not, see <http://www.gnu.org/licenses/>.
+# -----------------------------------------------------------------------------
+"""Wait for changes to files in directories using Linux inotify.
+
+Inotify only reports changes made on the local host, so changes on network
+file systems made elsewhere may go unnoticed. Callers should only use it to
+wake early and should always re-check the file system after a timeout.
+
+"""
+
+import ctypes
+import os
+import select
+
+
+class FileWatcher:
+
+    """Wait for files to be created or changed in watched directories.
+
+    Raise OSError on initialisation if inotify is not available.
+
+    """
+
+    # Event masks from <sys/inotify.h>
+    # (not IN_MODIFY, which fires on every write to a file still arriving,
+    # IN_CLOSE_WRITE and IN_MOVED_TO mean a file is complete)
+    IN_ATTRIB = 0x00000004
+    IN_CLOSE_WRITE = 0x00000008
+    IN_MOVED_TO = 0x00000080
+    IN_CREATE = 0x00000100
+    MASK = IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE
+
+    def __init__(self):
+        try:
+            libc = ctypes.CDLL(None, use_errno=True)
+            self._add_watch = libc.inotify_add_watch
+            inotify_init1 = libc.inotify_init1
+        except (AttributeError, OSError) as exc:
+            raise OSError(f"inotify not available: {exc}") from None
+        self._add_watch.argtypes = [
+            ctypes.c_int,
+            ctypes.c_char_p,
+            ctypes.c_uint32,
+        ]
+        self.fd = inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, os.strerror(errno))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+
+    def close(self):
+        """Stop watching."""
+        if self.fd >= 0:
+            os.close(self.fd)
+            self.fd = -1
+
+    def watch(self, path):
+        """Watch for changes to files in the directory at path.
+
+        Return True on success, False if the directory cannot be watched.
+        Watching a directory more than once has no further effect.
+
+        """
+        return self._add_watch(self.fd, os.fsencode(path), self.MASK) >= 0
+
+    def wait(self, timeout):
+        """Wait up to timeout seconds for a change in a watched directory.
+
+        Return True if there has been a change, False on timeout.
+
+        """
+        if not select.select([self.fd], [], [], max(timeout, 0))[0]:
+            return False
+        # drain the pending events, the caller re-checks what it needs to
+        try:
+            while os.read(self.fd, 65536):
+                pass
+        except BlockingIOError:
+            pass
+        return True
+
+    @staticmethod
+    def get_watch_dir(pattern):
+        """Return the nearest existing directory above a glob pattern.
+
+        Examples:
+            >>> FileWatcher.get_watch_dir('/')
+            '/'
+            >>> FileWatcher.get_watch_dir('/no/such/dir/file*')
+            '/'
+            >>> FileWatcher.get_watch_dir('/etc/*/file')
+            '/etc'
+
+        """
+        head = os.path.dirname(pattern)
+        for index, char in enumerate(head):
+            if char in '*?[':
+                head = os.path.dirname(head[:index])
+                break
+        head = os.path.abspath(head)
+        while not os.path.isdir(head):
+            head = os.path.dirname(head)
+        return head
+
+
+def get_file_watcher():
+    """Return a new FileWatcher, or None if inotify is not available."""
+    try:
+        return FileWatcher()
+    except OSError:
+        return None
@@ -21,6 +21,7 @@ from functools import lru_cache
 import json
 import os
 from random import choice, random, shuffle
+import selectors
 import shlex
 import signal
 from socket import error as SocketError
@@ -30,12 +31,15 @@ from socket import (
     gethostbyname_ex,
     gethostname,
 )
+from subprocess import PIPE, TimeoutExpired
 import sys
+from tempfile import TemporaryFile
 import textwrap
 from time import sleep, time
 import traceback
 from typing import List, Optional
 
+from metomi.rose.host_select_client import RESULT_MARKER
 from metomi.rose.opt_parse import RoseOptionParser
 from metomi.rose.popen import RosePopener
 from metomi.rose.reporter import Event, Reporter
@@ -144,6 +148,66 @@ class TimedOutHostEvent(Event):
         return self.args[0] + ": (timed out)"
 
 
+class HostSelectAgent:
+
+    """A persistent "rose host-select-client --agent" process on a host.
+
+    The agent answers each request sent to it with a line of output
+    "**result** N JSON", where N counts the requests it has received. Results
+    of earlier requests (e.g. from hosts not waited for) are discarded.
+
+    The standard error of the agent goes to stderr_file, so that it cannot
+    fill a pipe and block the agent while nothing is waiting on it.
+
+    """
+
+    RESULT_MARKER = RESULT_MARKER.encode()
+
+    def __init__(self, proc, stderr_file):
+        self.proc = proc
+        self.stderr_file = stderr_file
+        self.n_requests = 0
+        self.buffer = b''
+
+    def send(self, stdin):
+        """Send a request to the agent."""
+        self.proc.stdin.write(stdin)
+        self.proc.stdin.flush()
+        self.n_requests += 1
+
+    def read(self, data):
+        """Add data read from the agent.
+
+        Return the JSON result of the latest request if it is complete,
+        otherwise return None.
+
+        """
+        *lines, self.buffer = (self.buffer + data).split(b'\n')
+        for line in lines:
+            if not line.startswith(self.RESULT_MARKER):
+                continue  # e.g. output of shell profile scripts
+            n_request, result = line[len(self.RESULT_MARKER):].split(None, 1)
+            if int(n_request) == self.n_requests:
+                return result.decode()
+        return None
+
+    def read_stderr(self):
+        """Return the standard error output of the agent so far."""
+        self.stderr_file.seek(0)
+        return self.stderr_file.read()
+
+    def close(self, timeout):
+        """Ask the agent to exit, kill it if it has not within timeout."""
+        try:
+            self.proc.stdin.close()
+            self.proc.wait(timeout=timeout)
+        except (OSError, TimeoutExpired):
+            os.killpg(self.proc.pid, signal.SIGTERM)
+            self.proc.wait()
+        self.proc.stdout.close()
+        self.stderr_file.close()
+
+
 class HostSelector:
 
     """Select an available host machine by load of by random."""
@@ -153,16 +217,19 @@ class HostSelector:
     RANK_METHOD_RANDOM = "random"
     RANK_METHOD_MEM = "mem"
     RANK_METHOD_DEFAULT = RANK_METHOD_LOAD
-    SSH_CMD_POLL_DELAY = 0.05
     SSH_CMD_TIMEOUT = 10.0
 
-    def __init__(self, event_handler=None, popen=None):
+    def __init__(self, event_handler=None, popen=None, agent_mode=False):
         self.event_handler = event_handler
         if popen is None:
             popen = RosePopener(event_handler=event_handler)
         self.popen = popen
         self.scorers = {}
         self.local_host_strs = None
+        # agent_mode: keep a host-select-client running on each host to
+        # answer repeated selections, call close() to stop them
+        self.agent_mode = agent_mode
+        self.agents = {}
 
     def get_local_host_strs(self):
         """Return a list of names associated with the current host."""
@@ -300,6 +367,7 @@ class HostSelector:
         rank_method=None,
         thresholds=None,
         ssh_cmd_timeout=None,
+        first_n=None,
     ):
         """Return a list. Element 0 is most desirable.
         Each element of the list is a tuple (host, score).
@@ -321,6 +389,9 @@ class HostSelector:
 
         ssh_cmd_timeout: timeout of SSH commands to hosts. A float in seconds.
 
+        first_n: if specified, return as soon as this number of hosts have
+                 met the thresholds, without waiting for any slower hosts.
+
         """
 
         host_names, rank_method, thresholds = self.expand(
@@ -385,16 +456,13 @@ class HostSelector:
                     return [("localhost", 1)]
                 command = self.popen.get_cmd("ssh", host_name, "true")
                 proc = self.popen.run_bg(*command, preexec_fn=os.setpgrp)
-                time0 = time()
-                while (
-                    proc.poll() is None and time() - time0 <= ssh_cmd_timeout
-                ):
-                    sleep(self.SSH_CMD_POLL_DELAY)
-                if proc.poll() is None:
-                    os.killpg(proc.pid, signal.SIGTERM)
-                    proc.wait()
+                try:
+                    proc.wait(timeout=ssh_cmd_timeout)
+                except TimeoutExpired:
+                    self._kill(proc)
                     self.handle_event(TimedOutHostEvent(host_name))
-                elif proc.wait():
+                    continue
+                if proc.returncode:
                     self.handle_event(
                         HostSelectCommandFailedEvent(
                             host_name, proc.returncode
@@ -408,27 +476,6 @@ class HostSelector:
         # ssh to each host to return its score(s).
         host_proc_dict = {}
         for host_name in sorted(host_names):
-            # build host-select-client command
-            command: List[str] = []
-
-            # pass through CYLC_VERSION to support use of cylc wrapper script
-            try:
-                import cylc.flow
-            except ModuleNotFoundError:
-                pass
-            else:
-                command.extend([
-                    'env',
-                    f'CYLC_VERSION={cylc.flow.__version__}',
-                ])
-                cylc_env_name = os.getenv('CYLC_ENV_NAME')
-                if cylc_env_name:
-                    command.append(f'CYLC_ENV_NAME={cylc_env_name}')
-
-            command.extend(
-                self._bash_login_cmd(['rose', 'host-select-client'])
-            )
-
             # build list of metrics to obtain for each host
             metrics = rank_conf.get_command()
             for threshold_conf in threshold_confs:
@@ -439,72 +486,91 @@ class HostSelector:
             # convert metrics list to JSON stdin
             stdin = '\n***start**\n' + json.dumps(metrics) + '\n**end**\n'
 
-            if not self.is_local_host(host_name):
-                command = [
-                    *self.popen.get_cmd('ssh', host_name),
-                    shlex.join(command)
-                ]
+            if self.agent_mode:
+                # reuse the persistent host-select-client for this host
+                agent = self.agents.get(host_name)
+                if agent is None or agent.proc.poll() is not None:
+                    if agent is not None:
+                        agent.stderr_file.close()
+                    stderr_file = TemporaryFile(mode='w+')
+                    self.agents[host_name] = HostSelectAgent(
+                        self.popen.run_bg(
+                            *self._get_client_command(host_name, '--agent'),
+                            stdin=PIPE,
+                            stderr=stderr_file,
+                            preexec_fn=os.setpgrp,
+                        ),
+                        stderr_file,
+                    )
+                agent = self.agents[host_name]
+                agent.send(stdin)
+                host_proc_dict[host_name] = (agent.proc, metrics)
+                continue
+
             # fire off host-select-client processes
             proc = self.popen.run_bg(
-                *command, stdin=stdin, preexec_fn=os.setpgrp
+                *self._get_client_command(host_name),
+                stdin=stdin,
+                preexec_fn=os.setpgrp,
             )
             proc.stdin.write(stdin)
             proc.stdin.flush()
             host_proc_dict[host_name] = (proc, metrics)
 
-        # Retrieve score for each host name
+        # Retrieve score for each host name as soon as each host answers
         host_score_list = []
-        time0 = time()
-        while host_proc_dict:
-            sleep(self.SSH_CMD_POLL_DELAY)
-            for host_name, (proc, metrics) in list(host_proc_dict.items()):
-                if proc.poll() is None:  # still running
-                    continue
-                stdout, stderr = proc.communicate()
-                if proc.returncode:
+        if self.agent_mode:
+            iter_results = self._iter_agent_results
+        else:
+            iter_results = self._iter_results
+        for host_name, metrics, ret_code, stdout, stderr in iter_results(
+            host_proc_dict, ssh_cmd_timeout
+        ):
+            if ret_code:
+                self.handle_event(
+                    HostSelectCommandFailedEvent(host_name, ret_code, stderr)
+                )
+                continue
+            out = _deserialise(metrics, json.loads(stdout.strip()))
+            for threshold_conf in threshold_confs:
+                try:
+                    score = threshold_conf.command_out_parser(out, metrics)
+                    is_bad = threshold_conf.check_threshold(score)
+                except ValueError:
+                    is_bad = True
+                    score = None
+                if is_bad:
                     self.handle_event(
-                        HostSelectCommandFailedEvent(
-                            host_name, proc.returncode, stderr
+                        HostThresholdNotMetEvent(
+                            host_name, threshold_conf, score
                         )
                     )
-                    host_proc_dict.pop(host_name)
-                else:
-                    out = _deserialise(metrics, json.loads(stdout.strip()))
-
-                    host_proc_dict.pop(host_name)
-                    for threshold_conf in threshold_confs:
-                        try:
-                            score = threshold_conf.command_out_parser(
-                                out, metrics
-                            )
-                            is_bad = threshold_conf.check_threshold(score)
-                        except ValueError:
-                            is_bad = True
-                            score = None
-                        if is_bad:
-                            self.handle_event(
-                                HostThresholdNotMetEvent(
-                                    host_name, threshold_conf, score
-                                )
-                            )
-                            break
-                    else:
-                        try:
-                            score = rank_conf.command_out_parser(out, metrics)
-                            host_score_list.append((host_name, score))
-                        except ValueError:
-                            score = None
-                        self.handle_event(
-                            HostSelectScoreEvent(host_name, score)
-                        )
-            if time() - time0 > ssh_cmd_timeout:
+                    break
+            else:
+                try:
+                    score = rank_conf.command_out_parser(out, metrics)
+                    host_score_list.append((host_name, score))
+                except ValueError:
+                    score = None
+                self.handle_event(HostSelectScoreEvent(host_name, score))
+            if first_n and len(host_score_list) >= first_n:
                 break
 
+        # Stop any slower hosts no longer required
+        # (agents are left running, their late results will be discarded)
+        if first_n and len(host_score_list) >= first_n:
+            if not self.agent_mode:
+                for proc, _ in host_proc_dict.values():
+                    self._kill(proc)
+            host_proc_dict.clear()
+
         # Report timed out hosts
         for host_name, (proc, _) in sorted(host_proc_dict.items()):
             self.handle_event(TimedOutHostEvent(host_name))
-            os.killpg(proc.pid, signal.SIGTERM)
-            proc.wait()
+            self._kill(proc)
+            agent = self.agents.pop(host_name, None)
+            if agent is not None:
+                agent.stderr_file.close()
 
         if not host_score_list:
             raise NoHostSelectError()
@@ -515,6 +581,141 @@ class HostSelector:
 
     __call__ = select
 
+    def close(self):
+        """Stop any persistent host-select-client agents."""
+        while self.agents:
+            _, agent = self.agents.popitem()
+            agent.close(self.SSH_CMD_TIMEOUT)
+
+    def _get_client_command(self, host_name, *args):
+        """Return the command to run host-select-client on a host."""
+        command: List[str] = []
+
+        # pass through CYLC_VERSION to support use of cylc wrapper script
+        try:
+            import cylc.flow
+        except ModuleNotFoundError:
+            pass
+        else:
+            command.extend([
+                'env',
+                f'CYLC_VERSION={cylc.flow.__version__}',
+            ])
+            cylc_env_name = os.getenv('CYLC_ENV_NAME')
+            if cylc_env_name:
+                command.append(f'CYLC_ENV_NAME={cylc_env_name}')
+
+        command.extend(
+            self._bash_login_cmd(['rose', 'host-select-client', *args])
+        )
+
+        if not self.is_local_host(host_name):
+            command = [
+                *self.popen.get_cmd('ssh', host_name),
+                shlex.join(command)
+            ]
+        return command
+
+    @staticmethod
+    def _kill(proc):
+        """Kill a host-select-client process group and close its pipes."""
+        try:
+            os.killpg(proc.pid, signal.SIGTERM)
+        except ProcessLookupError:
+            pass  # already exited
+        proc.wait()
+        for handle in (proc.stdin, proc.stdout, proc.stderr):
+            if handle is not None:
+                handle.close()
+
+    @staticmethod
+    def _iter_results(host_proc_dict, timeout):
+        """Yield the result of each host-select-client as it completes.
+
+        Wait on the output pipes of all processes in host_proc_dict, yielding
+        (host_name, metrics, ret_code, stdout, stderr) for each host as soon as
+        its process exits. Hosts are removed from host_proc_dict as they are
+        yielded, so any left in it when the timeout (in seconds) is reached
+        have timed out. This includes a process that has closed its output
+        but not exited by then.
+
+        """
+        deadline = time() + timeout
+        buffers = {}
+        with selectors.DefaultSelector() as selector:
+            for host_name, (proc, _) in host_proc_dict.items():
+                buffers[host_name] = {proc.stdout: [], proc.stderr: []}
+                for handle in (proc.stdout, proc.stderr):
+                    selector.register(handle, selectors.EVENT_READ, host_name)
+            while host_proc_dict:
+                remaining = deadline - time()
+                if remaining <= 0:
+                    break
+                for key, _ in selector.select(remaining):
+                    host_name = key.data
+                    data = os.read(key.fd, 65536)
+                    if data:
+                        buffers[host_name][key.fileobj].append(data)
+                        continue
+                    selector.unregister(key.fileobj)
+                    if any(
+                        handle in selector.get_map()
+                        for handle in buffers[host_name]
+                    ):
+                        continue
+                    # all output received, wait for the process to exit
+                    proc, metrics = host_proc_dict[host_name]
+                    stdout, stderr = (
+                        b''.join(chunks).decode()
+                        for chunks in buffers.pop(host_name).values()
+                    )
+                    proc.stdout.close()
+                    proc.stderr.close()
+                    try:
+                        ret_code = proc.wait(
+                            timeout=max(deadline - time(), 0)
+                        )
+                    except TimeoutExpired:
+                        # the deadline has passed, the rest have timed out
+                        return
+                    del host_proc_dict[host_name]
+                    yield host_name, metrics, ret_code, stdout, stderr
+
+    def _iter_agent_results(self, host_proc_dict, timeout):
+        """Yield the result of each host-select-client agent as it answers.
+
+        As _iter_results, but for the persistent agents in agent mode, which
+        answer each request with a line of output rather than exiting.
+
+        """
+        deadline = time() + timeout
+        with selectors.DefaultSelector() as selector:
+            for host_name, (proc, _) in host_proc_dict.items():
+                selector.register(proc.stdout, selectors.EVENT_READ, host_name)
+            while host_proc_dict:
+                remaining = deadline - time()
+                if remaining <= 0:
+                    break
+                for key, _ in selector.select(remaining):
+                    host_name = key.data
+                    data = os.read(key.fd, 65536)
+                    if data:
+                        stdout = self.agents[host_name].read(data)
+                        if stdout is None:
+                            continue
+                        selector.unregister(key.fileobj)
+                        ret_code, stderr = 0, ''
+                    else:
+                        # the agent has exited without answering
+                        selector.unregister(key.fileobj)
+                        agent = self.agents.pop(host_name)
+                        stdout = agent.proc.communicate()[0]
+                        stderr = agent.read_stderr()
+                        agent.stderr_file.close()
+                        ret_code = agent.proc.returncode or 1
+                    _, metrics = host_proc_dict.pop(host_name)
+                    yield host_name, metrics, ret_code, stdout, stderr
+
 
 @lru_cache()
 def _tuple_factory(name, params):
@@ -701,7 +902,14 @@ CONFIGURATION
        (default=10.0)
         '''
     )
-    opt_parser.add_my_options("choice", "rank_method", "thresholds", "timeout")
+    opt_parser.add_my_options(
+        "choice",
+        "first_n",
+        "interval",
+        "rank_method",
+        "thresholds",
+        "timeout",
+    )
     opt_parser.modify_option(
         'timeout',
         help='Set the timeout in seconds of SSH commands to hosts.',
@@ -709,21 +917,35 @@ CONFIGURATION
     opts, args = opt_parser.parse_args()
     report = Reporter(opts.verbosity - opts.quietness)
     popen = RosePopener(event_handler=report)
-    select = HostSelector(event_handler=report, popen=popen)
-    try:
-        host_score_list = select(
-            names=args,
-            rank_method=opts.rank_method,
-            thresholds=opts.thresholds,
-            ssh_cmd_timeout=opts.timeout,
-        )
-    except (NoHostError, NoHostSelectError) as exc:
-        report(exc)
-        if opts.debug_mode:
-            traceback.print_exc()
-        sys.exit(1)
+    select = HostSelector(
+        event_handler=report,
+        popen=popen,
+        agent_mode=opts.interval is not None,
+    )
     opts.choice = int(opts.choice)
-    report(choice(host_score_list[0 : opts.choice])[0] + "\n", level=0)
+    try:
+        while True:
+            try:
+                host_score_list = select(
+                    names=args,
+                    rank_method=opts.rank_method,
+                    thresholds=opts.thresholds,
+                    ssh_cmd_timeout=opts.timeout,
+                    first_n=opts.first_n,
+                )
+            except (NoHostError, NoHostSelectError) as exc:
+                report(exc)
+                if opts.debug_mode:
+                    traceback.print_exc()
+                sys.exit(1)
+            report(
+                choice(host_score_list[0 : opts.choice])[0] + "\n", level=0
+            )
+            if opts.interval is None:
+                break
+            sleep(opts.interval)
+    finally:
+        select.close()
 
 
 if __name__ == "__main__":
@@ -21,6 +21,8 @@ import sys
 
 import psutil
 
+RESULT_MARKER = '**result**'
+
 
 def usage():
     print('''
@@ -49,19 +51,27 @@ $ rose host-select-client <<'__HERE__'
 > **end**
 > __HERE__
 [{"total": 17179869184, "available": 6276612096, "percent": 63.5, ...}]
+
+OPTIONS:
+    --agent
+        Keep running, answering each request in turn until stdin is closed.
+        Each result is written on a single line prefixed by "**result** N "
+        where N is the number of the request (counting from 1).
 '''.strip())
 
 
-def main():
-    if set(sys.argv) & {'--help', '-h'}:
-        usage()
-        sys.exit(0)
-    # read metrics from stdin
+def read_request(handle):
+    """Return the next metrics request read from handle.
+
+    Return None if the end of the input is reached before a complete request.
+    """
     started = False
-    line = True
     metrics = ''
     while True:
-        line = sys.stdin.readline().strip()
+        line = handle.readline()
+        if not line:
+            return None
+        line = line.strip()
         if '**start**' in line:
             started = True
             continue
@@ -70,8 +80,11 @@ def main():
         elif '**end**' in line:
             break
         metrics += f'\n{line}'
-    metrics = json.loads(metrics)
+    return json.loads(metrics)
+
 
+def get_metrics(metrics):
+    """Return the requested metrics as a JSON serialisable list."""
     # extract metrics using psutil
     ret = [
         getattr(psutil, key)(
@@ -90,9 +103,36 @@ def main():
     for ind, item in enumerate(ret):
         if hasattr(item, '_asdict'):
             ret[ind] = item._asdict()
+    return ret
+
+
+def main():
+    if set(sys.argv) & {'--help', '-h'}:
+        usage()
+        sys.exit(0)
+
+    if '--agent' in sys.argv:
+        # answer requests until stdin is closed
+        n_requests = 0
+        while True:
+            metrics = read_request(sys.stdin)
+            if metrics is None:
+                break
+            n_requests += 1
+            print(
+                f'{RESULT_MARKER} {n_requests} '
+                + json.dumps(get_metrics(metrics)),
+                flush=True,
+            )
+        return
+
+    # read metrics from stdin
+    metrics = read_request(sys.stdin)
+    if metrics is None:
+        sys.exit('No request received.')
 
     # output results as json
-    print(json.dumps(ret))
+    print(json.dumps(get_metrics(metrics)))
 
 
 if __name__ == '__main__':
@@ -37,15 +37,22 @@ It also stores macro base classes and macro library functions.
 """
 
 import ast
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager, redirect_stderr, redirect_stdout
 import copy
 from functools import cmp_to_key
 import glob
 from importlib.machinery import SourceFileLoader
 import inspect
+from io import RawIOBase, TextIOWrapper
+import multiprocessing
 import os
 import re
 import sys
+from tempfile import NamedTemporaryFile
 import traceback
+from typing import Dict
 
 import metomi.rose.config
 from metomi.rose.config import ConfigNode
@@ -695,6 +702,59 @@ def load_meta_path(
     return None, warning
 
 
+class MetaConfigCache:
+
+    """A process cache of metadata config trees.
+
+    Trees are keyed by the metadata directories they are loaded from and the
+    import path, and are reloaded if any of their files change on disk.
+
+    """
+
+    # {key: (conf_dirs, stats, ConfigTree), ...}
+    _trees: Dict[tuple, tuple] = {}
+
+    @classmethod
+    def get(cls, key):
+        """Return a copy of the cached tree for key, or None if stale."""
+        item = cls._trees.get(key)
+        if item is None:
+            return None
+        conf_dirs, stats, meta_config_tree = item
+        if stats != cls._get_stats(conf_dirs):
+            del cls._trees[key]
+            return None
+        return copy.deepcopy(meta_config_tree)
+
+    @classmethod
+    def set(cls, key, meta_config_tree, conf_dirs):
+        """Cache a copy of meta_config_tree, loaded from conf_dirs."""
+        stats = cls._get_stats(conf_dirs)
+        if stats is None:
+            return
+        cls._trees[key] = (
+            list(conf_dirs), stats, copy.deepcopy(meta_config_tree)
+        )
+
+    @classmethod
+    def clear(cls):
+        """Empty the cache."""
+        cls._trees.clear()
+
+    @staticmethod
+    def _get_stats(conf_dirs):
+        """Return the stats of the metadata files in conf_dirs, or None."""
+        stats = []
+        for conf_dir in conf_dirs:
+            dir_stats = metomi.rose.config_tree.ConfigTreeLoader.get_dir_stats(
+                os.path.join(conf_dir, metomi.rose.META_CONFIG_NAME)
+            )
+            if dir_stats is None:
+                return None
+            stats.append(dir_stats)
+        return stats
+
+
 def load_meta_config_tree(
     config,
     directory=None,
@@ -704,7 +764,12 @@ def load_meta_config_tree(
     opt_meta_paths=None,
     no_warn=None,
 ):
-    """Return the metadata config tree for a configuration."""
+    """Return the metadata config tree for a configuration.
+
+    Trees are cached by MetaConfigCache, so repeat loads of the same
+    metadata are cheap.
+
+    """
     if opt_meta_paths:
         paths = opt_meta_paths + sys.path
     else:
@@ -726,8 +791,7 @@ def load_meta_config_tree(
         no_ignore=True,
     )
     ignore_meta_error = ignore_meta_error or opt_node is None
-    meta_config_tree = None
-    meta_config = metomi.rose.config.ConfigNode()
+    default_meta_dirs = []
     for meta_key in meta_list:
         try:
             meta_path = str(locator.locate(meta_key))
@@ -735,18 +799,32 @@ def load_meta_config_tree(
             if not ignore_meta_error:
                 error_handler(text=ERROR_LOAD_META_PATH.format(meta_key))
             continue
+        default_meta_dirs.append(os.path.dirname(meta_path))
+    cache_key = (tuple(default_meta_dirs), config_meta_path, tuple(paths))
+    meta_config_tree = MetaConfigCache.get(cache_key)
+    if meta_config_tree is not None:
+        return meta_config_tree
+    is_cacheable = True
+    conf_dirs = []
+    meta_config_tree = None
+    meta_config = metomi.rose.config.ConfigNode()
+    for meta_dir in default_meta_dirs:
         try:
             meta_config_tree = metomi.rose.config_tree.ConfigTreeLoader().load(
-                os.path.dirname(meta_path),
+                meta_dir,
                 metomi.rose.META_CONFIG_NAME,
                 conf_dir_paths=list(paths),
                 conf_node=meta_config,
             )
         except metomi.rose.config.ConfigSyntaxError as exc:
             error_handler(text=str(exc))
+            is_cacheable = False
         else:
             meta_config = meta_config_tree.node
+            conf_dirs += meta_config_tree.conf_dirs
     if config_meta_path is None:
+        if is_cacheable and meta_config_tree is not None:
+            MetaConfigCache.set(cache_key, meta_config_tree, conf_dirs)
         return meta_config_tree
     # Try and get a proper non-default meta config tree.
     try:
@@ -758,11 +836,17 @@ def load_meta_config_tree(
     except metomi.rose.resource.ResourceError:
         if not ignore_meta_error:
             error_handler(text=ERROR_LOAD_META_PATH.format(meta_list))
+        is_cacheable = False
     except metomi.rose.config.ConfigSyntaxError as exc:
         error_handler(text=str(exc))
+        is_cacheable = False
+    else:
+        conf_dirs += meta_config_tree.conf_dirs
 
     meta_config += meta_config_tree.node
     meta_config_tree.node = meta_config
+    if is_cacheable:
+        MetaConfigCache.set(cache_key, meta_config_tree, conf_dirs)
     return meta_config_tree
 
 
@@ -1142,6 +1226,33 @@ def get_metadata_for_config_id(setting_id, meta_config):
 
             test_cleanup(['rose-app.conf', 'meta/rose-meta.conf', 'meta'])
 
+    """
+    index = _METADATA_INDEXES.get(id(meta_config))
+    if index is not None and index.meta_config is meta_config:
+        return index.get(setting_id)
+    return _get_metadata_for_config_id(
+        setting_id, lambda section: _get_meta_props(meta_config, section)
+    )
+
+
+def _get_meta_props(meta_config, section):
+    """Return a dict of the metadata properties of a section, if any."""
+    node = meta_config.get([section], no_ignore=True)
+    if node is None or not isinstance(node.value, dict):
+        return None
+    return {
+        opt: opt_node.value
+        for opt, opt_node in node.value.items()
+        if not opt_node.is_ignored()
+    }
+
+
+def _get_metadata_for_config_id(setting_id, get_props):
+    """Return a dict of metadata properties and values for a setting id.
+
+    get_props -- A callable to return the properties of a metadata section,
+                 or None if there is no such section.
+
     """
     metadata = {}
     if metomi.rose.CONFIG_DELIMITER in setting_id:
@@ -1154,12 +1265,10 @@ def get_metadata_for_config_id(setting_id, meta_config):
     no_modifier_id = REC_MODIFIER.sub("", search_id)
     if no_modifier_id != search_id:
         # There is a modifier e.g. namelist:foo{bar}.
-        node = meta_config.get([no_modifier_id], no_ignore=True)
+        props = get_props(no_modifier_id)
         # Get metadata for namelist:foo
-        if node is not None:
-            for opt, opt_node in node.value.items():
-                if not opt_node.is_ignored():
-                    metadata.update({opt: opt_node.value})
+        if props is not None:
+            metadata.update(props)
             if option is None and metomi.rose.META_PROP_TITLE in metadata:
                 # Handle section modifier titles
                 modifier = search_id.replace(no_modifier_id, "")
@@ -1170,12 +1279,10 @@ def get_metadata_for_config_id(setting_id, meta_config):
             ):
                 # foo{bar}(1) cannot inherit duplicate from foo.
                 metadata.pop(metomi.rose.META_PROP_DUPLICATE)
-    node = meta_config.get([search_id], no_ignore=True)
+    props = get_props(search_id)
     # If modifier, get metadata for namelist:foo{bar}
-    if node is not None:
-        for opt, opt_node in node.value.items():
-            if not opt_node.is_ignored():
-                metadata.update({opt: opt_node.value})
+    if props is not None:
+        metadata.update(props)
     if metomi.rose.META_PROP_TITLE in metadata:
         # Handle duplicate (indexed) settings sharing a title
         if option is None:
@@ -1198,6 +1305,62 @@ def get_metadata_for_config_id(setting_id, meta_config):
     return metadata
 
 
+class MetadataIndex:
+
+    """An index of the metadata properties in a metadata configuration.
+
+    Map each metadata section to its properties once, and remember the
+    metadata of each setting id, for get_metadata_for_config_id to look up
+    rather than re-derive. Use "metadata_index" to make it available.
+
+    """
+
+    def __init__(self, meta_config):
+        self.meta_config = meta_config
+        self.props_of = {}  # {section: {property: value, ...}, ...}
+        for section, node in meta_config.value.items():
+            if not node.is_ignored() and isinstance(node.value, dict):
+                self.props_of[section] = {
+                    opt: opt_node.value
+                    for opt, opt_node in node.value.items()
+                    if not opt_node.is_ignored()
+                }
+        self._metadata_of = {}  # {setting_id: metadata, ...}
+
+    def get(self, setting_id):
+        """Return a new dict of metadata properties for a setting id."""
+        try:
+            metadata = self._metadata_of[setting_id]
+        except KeyError:
+            metadata = _get_metadata_for_config_id(
+                setting_id, self.props_of.get
+            )
+            self._metadata_of[setting_id] = metadata
+        return dict(metadata)
+
+
+# {id(meta_config): MetadataIndex, ...}
+_METADATA_INDEXES: Dict[int, MetadataIndex] = {}
+
+
+@contextmanager
+def metadata_index(meta_config):
+    """Index a metadata configuration within the context.
+
+    Calls to get_metadata_for_config_id with meta_config use the index, so
+    the metadata configuration should not be modified within the context.
+
+    """
+    if meta_config is None or id(meta_config) in _METADATA_INDEXES:
+        yield
+        return
+    _METADATA_INDEXES[id(meta_config)] = MetadataIndex(meta_config)
+    try:
+        yield
+    finally:
+        del _METADATA_INDEXES[id(meta_config)]
+
+
 def run_macros(
     config_map,
     meta_config,
@@ -1293,78 +1456,79 @@ def run_macros(
         return False
 
     ret_code = 0
+    no_changes = True
+    # Derive the metadata of each setting once for all the macros.
+    with metadata_index(meta_config):
+        # Run any validator macros.
+        if VALIDATE_METHOD in macros_by_type:
+            new_combined_config_map = combine_opt_config_map(config_map)
+            macro_config_problems_map = {}
+            optional_values = {}
+            for conf_key, config in new_combined_config_map.items():
+                config_problems_map = report_config(
+                    config,
+                    meta_config,
+                    macros_by_type[VALIDATE_METHOD],
+                    modules,
+                    macro_tuples,
+                    opt_non_interactive,
+                    optional_config_name=conf_key,
+                    optional_values=optional_values,
+                    validate_mode=True,
+                )
+                if config_problems_map:
+                    ret_code = 1
+                for macro, problem_list in config_problems_map.items():
+                    macro_config_problems_map.setdefault(macro, {})
+                    problem_list.sort(key=cmp_to_key(report_sort))
+                    macro_config_problems_map[macro][conf_key] = problem_list
+            problem_macros = list(macro_config_problems_map)
+            problem_macros.sort()
+            for macro_name in problem_macros:
+                config_problems_map = macro_config_problems_map[macro_name]
+                method_id = VALIDATE_METHOD.upper()[0]
+                macro_id = MACRO_OUTPUT_ID.format(method_id, macro_name)
+                reporter(
+                    get_reports_as_text(
+                        config_problems_map, macro_id, is_from_transform=False
+                    ),
+                    level=reporter.V,
+                    kind=reporter.KIND_ERR,
+                    prefix="",
+                )
 
-    # Run any validator macros.
-    if VALIDATE_METHOD in macros_by_type:
-        new_combined_config_map = combine_opt_config_map(config_map)
-        macro_config_problems_map = {}
-        optional_values = {}
-        for conf_key, config in new_combined_config_map.items():
-            config_problems_map = report_config(
-                config,
-                meta_config,
-                macros_by_type[VALIDATE_METHOD],
-                modules,
-                macro_tuples,
-                opt_non_interactive,
-                optional_config_name=conf_key,
-                optional_values=optional_values,
-                validate_mode=True,
-            )
-            if config_problems_map:
-                ret_code = 1
-            for macro, problem_list in config_problems_map.items():
-                macro_config_problems_map.setdefault(macro, {})
-                problem_list.sort(key=cmp_to_key(report_sort))
-                macro_config_problems_map[macro][conf_key] = problem_list
-        problem_macros = list(macro_config_problems_map)
-        problem_macros.sort()
-        for macro_name in problem_macros:
-            config_problems_map = macro_config_problems_map[macro_name]
-            method_id = VALIDATE_METHOD.upper()[0]
-            macro_id = MACRO_OUTPUT_ID.format(method_id, macro_name)
-            reporter(
-                get_reports_as_text(
-                    config_problems_map, macro_id, is_from_transform=False
-                ),
-                level=reporter.V,
-                kind=reporter.KIND_ERR,
-                prefix="",
-            )
+        # Run any report macros.
+        if REPORT_METHOD in macros_by_type:
+            new_combined_config_map = combine_opt_config_map(config_map)
+            optional_values = {}
+            for conf_key, config in new_combined_config_map.items():
+                report_config(
+                    config,
+                    meta_config,
+                    macros_by_type[REPORT_METHOD],
+                    modules,
+                    macro_tuples,
+                    opt_non_interactive,
+                    optional_config_name=conf_key,
+                    optional_values=optional_values,
+                    validate_mode=False,
+                )
 
-    # Run any report macros.
-    if REPORT_METHOD in macros_by_type:
-        new_combined_config_map = combine_opt_config_map(config_map)
-        optional_values = {}
-        for conf_key, config in new_combined_config_map.items():
-            report_config(
-                config,
+        # Run any transform macros.
+        if TRANSFORM_METHOD in macros_by_type:
+            no_changes = no_changes and _run_transform_macros(
+                macros_by_type[TRANSFORM_METHOD],
+                config_name,
+                config_map,
                 meta_config,
-                macros_by_type[REPORT_METHOD],
                 modules,
                 macro_tuples,
-                opt_non_interactive,
-                optional_config_name=conf_key,
-                optional_values=optional_values,
-                validate_mode=False,
+                opt_non_interactive=opt_non_interactive,
+                opt_conf_dir=opt_conf_dir,
+                opt_output_dir=opt_output_dir,
+                reporter=reporter,
             )
 
-    # Run any transform macros.
-    no_changes = True
-    if TRANSFORM_METHOD in macros_by_type:
-        no_changes = no_changes and _run_transform_macros(
-            macros_by_type[TRANSFORM_METHOD],
-            config_name,
-            config_map,
-            meta_config,
-            modules,
-            macro_tuples,
-            opt_non_interactive=opt_non_interactive,
-            opt_conf_dir=opt_conf_dir,
-            opt_output_dir=opt_output_dir,
-            reporter=reporter,
-        )
-
     if not ret_code and no_changes:
         reporter(MacroFinishNothingEvent())
     return ret_code == 0
@@ -1479,6 +1643,22 @@ def handle_transform(
     return False
 
 
+def handle_transforms(conf_dir_config_maps, opt_non_interactive, reporter):
+    """Prompt the user to go ahead with changes to several configurations.
+
+    conf_dir_config_maps -- A list of (conf_dir, new_config_map) tuples.
+
+    Dump all the configurations, or none, and return True if dumped.
+
+    """
+    if not (opt_non_interactive or _get_user_accept()):
+        return False
+    dump_config_maps(conf_dir_config_maps)
+    for conf_dir, _ in conf_dir_config_maps:
+        reporter(MacroTransformDumpEvent(conf_dir, None), level=reporter.VV)
+    return True
+
+
 def combine_opt_config_map(config_map):
     """Combine optional configurations with a main configuration."""
     new_combined_config_map = {}
@@ -1487,24 +1667,9 @@ def combine_opt_config_map(config_map):
         if conf_key is None:
             new_combined_config_map[None] = copy.deepcopy(config)
             continue
-        new_config = copy.deepcopy(main_config)
-        for keylist, subnode in config.walk():
-            old_subnode = new_config.get(keylist)
-            if (
-                isinstance(subnode.value, dict)
-                and old_subnode is not None
-                and isinstance(old_subnode.value, dict)
-            ):
-                old_subnode.state = subnode.state
-                old_subnode.comments = subnode.comments
-            else:
-                new_config.set(
-                    keylist,
-                    value=copy.deepcopy(subnode.value),
-                    state=subnode.state,
-                    comments=subnode.comments,
-                )
-        new_combined_config_map[conf_key] = new_config
+        new_combined_config_map[conf_key] = copy.deepcopy(
+            main_config
+        ).overlay(config)
     return new_combined_config_map
 
 
@@ -1645,19 +1810,68 @@ def dump_config(
     """Dump the config in a standard form."""
     config = copy.deepcopy(config)
     pretty_format_config(config)
+    target_path = _get_dump_config_path(
+        opt_conf_dir, opt_output_dir, conf_key, name
+    )
+    metomi.rose.config.dump(config, target_path)
+
+
+def dump_config_maps(conf_dir_config_maps, name=metomi.rose.SUB_CONFIG_NAME):
+    """Dump the config maps of several configurations in a standard form.
+
+    conf_dir_config_maps -- A list of (conf_dir, config_map) tuples.
+
+    Write every config to a temporary file before moving any into place,
+    so that no configuration is changed if one fails to dump.
+
+    """
+    dumper = metomi.rose.config.ConfigDumper()
+    tmp_target_paths = []
+    new_dirs = []
+    try:
+        for conf_dir, config_map in conf_dir_config_maps:
+            for conf_key, config in config_map.items():
+                config = copy.deepcopy(config)
+                pretty_format_config(config)
+                target_path = _get_dump_config_path(
+                    conf_dir, None, conf_key, name
+                )
+                target_dir = os.path.dirname(target_path)
+                if not os.path.isdir(target_dir):
+                    os.makedirs(target_dir)
+                    new_dirs.append(target_dir)
+                with NamedTemporaryFile(
+                    mode='w',
+                    prefix=os.path.basename(target_path),
+                    dir=target_dir,
+                    delete=False,
+                ) as handle:
+                    tmp_target_paths.append((handle.name, target_path))
+                    dumper(config, handle)
+    except BaseException:
+        for tmp_path, _ in tmp_target_paths:
+            os.unlink(tmp_path)
+        for new_dir in reversed(new_dirs):
+            os.rmdir(new_dir)
+        raise
+    for tmp_path, target_path in tmp_target_paths:
+        if not os.path.exists(target_path):
+            open(target_path, "a").close()
+        os.chmod(tmp_path, os.stat(target_path).st_mode)
+        os.rename(tmp_path, target_path)
+
+
+def _get_dump_config_path(opt_conf_dir, opt_output_dir, conf_key, name):
+    """Return the path to dump a (possibly optional) config to."""
     if opt_output_dir is None:
         directory = opt_conf_dir
     else:
         directory = opt_output_dir
     if conf_key is None:
-        target_path = os.path.join(directory, name)
-    else:
-        source_root, source_ext = os.path.splitext(name)
-        base = source_root + "-" + conf_key + source_ext
-        target_path = os.path.join(
-            directory, metomi.rose.config.OPT_CONFIG_DIR, base
-        )
-    metomi.rose.config.dump(config, target_path)
+        return os.path.join(directory, name)
+    source_root, source_ext = os.path.splitext(name)
+    base = source_root + "-" + conf_key + source_ext
+    return os.path.join(directory, metomi.rose.config.OPT_CONFIG_DIR, base)
 
 
 def load_conf_from_file(conf_dir, config_file_path, mode="macro"):
@@ -1752,6 +1966,7 @@ ENVIRONMENT VARIABLES
     )
     opt_parser.add_my_options(
         "conf_dir",
+        "jobs",
         "meta_path",
         "non_interactive",
         "output_dir",
@@ -1761,6 +1976,14 @@ ENVIRONMENT VARIABLES
         "suite_only",
         "transform_all",
     )
+    opt_parser.modify_option(
+        'jobs',
+        help=(
+            'Run macros for up to N configurations at a time.'
+            '\nOnly applies to the default validators: transformers and'
+            ' named macros run for one configuration at a time.'
+        ),
+    )
     opt_parser.modify_option(
         'output_dir',
         help=(
@@ -1877,56 +2100,206 @@ def main():
     add_opt_meta_paths(opts.meta_path)
 
     # Run macros for each config.
-    verbosity = 1 + opts.verbosity - opts.quietness
+    # Macros which may modify a config run in series, so that no config is
+    # written after an earlier config has failed to load.
+    run_args = (list(args), opts, 1 + opts.verbosity - opts.quietness, confs)
+    if (
+        opts.jobs > 1
+        and len(confs) > 1
+        and not (args or opts.fix or opts.transform_all)
+    ):
+        rets = _run_conf_macros_in_pool(opts.jobs, run_args)
+    else:
+        rets = (
+            _run_conf_macros(config_file_path, *run_args)
+            for config_file_path in confs
+        )
     ret = [True]
-    for config_file_path in confs:
-        # Macro info.
-        conf_dir = os.path.dirname(config_file_path)
-        cur_conf_type = os.path.basename(config_file_path)
-        config_name = os.path.basename(conf_dir)
-        os.chdir(conf_dir)
+    for conf_ret in rets:
+        if conf_ret is None:
+            sys.exit(1)
+        ret.append(conf_ret)
 
-        # Load config.
-        try:
-            _, config_map, meta_config = load_conf_from_file(
-                conf_dir, config_file_path
+    # Fail if any macro failed.
+    sys.exit(0 if all(ret) else 1)
+
+
+def _run_conf_macros(config_file_path, args, opts, verbosity, confs):
+    """Run macros for one of confs, as requested by the rose macro options.
+
+    Return the result of run_macros, or None if the config cannot be loaded.
+
+    """
+    reporter = metomi.rose.reporter.Reporter()
+
+    # Macro info.
+    conf_dir = os.path.dirname(config_file_path)
+    cur_conf_type = os.path.basename(config_file_path)
+    config_name = os.path.basename(conf_dir)
+    os.chdir(conf_dir)
+
+    # Load config.
+    try:
+        _, config_map, meta_config = load_conf_from_file(
+            conf_dir, config_file_path
+        )
+    except TypeError:
+        return None
+
+    # Report which config we are currently working on.
+    if len(confs) > 1:
+        if cur_conf_type == metomi.rose.SUB_CONFIG_NAME:
+            reporter(
+                os.path.join(
+                    metomi.rose.SUB_CONFIGS_DIR, config_name, cur_conf_type
+                )
             )
-        except TypeError:
-            sys.exit(1)
+        else:
+            reporter(cur_conf_type)
+        sys.stdout.flush()
+
+    # Run macros.
+    return run_macros(
+        config_map,
+        meta_config,
+        config_name,
+        args,
+        conf_dir,
+        opts.fix,
+        opts.non_interactive,
+        opts.output_dir,
+        opts.validate_all,
+        opts.transform_all,
+        verbosity,
+        no_warn=opts.no_warn,
+        default_only=cur_conf_type == metomi.rose.INFO_CONFIG_NAME,
+    )
 
-        # Report which config we are currently working on.
-        if len(confs) > 1:
-            if cur_conf_type == metomi.rose.SUB_CONFIG_NAME:
-                reporter(
-                    os.path.join(
-                        metomi.rose.SUB_CONFIGS_DIR, config_name, cur_conf_type
+
+class _OutputRecorder(RawIOBase):
+    """Record what is written to a stream in a list shared by streams.
+
+    Each write is appended to the list as (stream_index, bytes), so that
+    output to several streams can be replayed in its original order.
+
+    """
+
+    def __init__(self, records, stream_index):
+        super().__init__()
+        self.records = records
+        self.stream_index = stream_index
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.records.append((self.stream_index, bytes(data)))
+        return len(data)
+
+
+def _run_conf_macros_captured(config_file_path, *run_args):
+    """Run _run_conf_macros, returning its result and recorded output.
+
+    The output is a list of (stream_index, bytes), where stream_index is
+    0 for stdout and 1 for stderr.
+
+    """
+    records = []
+    out, err = [
+        TextIOWrapper(
+            _OutputRecorder(records, stream_index),
+            encoding='utf-8',
+            write_through=True,
+        )
+        for stream_index in range(2)
+    ]
+    with redirect_stdout(out), redirect_stderr(err):
+        ret = _run_conf_macros(config_file_path, *run_args)
+    return ret, records
+
+
+def _write_recorded_output(records):
+    """Write output recorded by _run_conf_macros_captured."""
+    for stream_index, data in records:
+        for handle in (sys.stdout, sys.stderr):
+            handle.flush()
+        handle = (sys.stdout, sys.stderr)[stream_index]
+        try:
+            buffer = handle.buffer
+        except AttributeError:
+            handle.write(data.decode('utf-8'))
+        else:
+            buffer.write(data)
+            buffer.flush()
+    for handle in (sys.stdout, sys.stderr):
+        handle.flush()
+
+
+def _run_conf_macros_in_pool(jobs, run_args):
+    """Run _run_conf_macros for each config in a pool of jobs processes.
+
+    Yield the result for each config in turn, after writing the output it
+    would have written if run on its own. Configs are submitted in order,
+    with at most jobs running or waiting at a time, and none are submitted
+    after a config that cannot be loaded.
+
+    Metadata shared by several configs is loaded first, so that forked
+    processes inherit it from the config tree loader cache.
+
+    """
+    confs = run_args[-1]
+    _load_shared_meta_configs(confs)
+    mp_context = None
+    if 'fork' in multiprocessing.get_all_start_methods():
+        mp_context = multiprocessing.get_context('fork')
+    executor = ProcessPoolExecutor(jobs, mp_context=mp_context)
+    try:
+        config_file_paths = iter(confs)
+        futures = deque()
+        while True:
+            for config_file_path in config_file_paths:
+                futures.append(
+                    executor.submit(
+                        _run_conf_macros_captured, config_file_path, *run_args
                     )
                 )
-            else:
-                reporter(cur_conf_type)
-            sys.stdout.flush()
+                if len(futures) >= jobs:
+                    break
+            if not futures:
+                break
+            ret, records = futures.popleft().result()
+            _write_recorded_output(records)
+            yield ret
+            if ret is None:
+                break
+    finally:
+        executor.shutdown(cancel_futures=True)
 
-        # Run macros.
-        ret.append(
-            run_macros(
-                config_map,
-                meta_config,
-                config_name,
-                list(args),
-                conf_dir,
-                opts.fix,
-                opts.non_interactive,
-                opts.output_dir,
-                opts.validate_all,
-                opts.transform_all,
-                verbosity,
-                no_warn=opts.no_warn,
-                default_only=cur_conf_type == metomi.rose.INFO_CONFIG_NAME,
-            )
-        )
 
-    # Fail if any macro failed.
-    sys.exit(0 if all(ret) else 1)
+def _load_shared_meta_configs(confs):
+    """Load the metadata of confs where more than one config uses it."""
+    confs_of_meta_dir = {}
+    for config_file_path in confs:
+        conf_dir = os.path.dirname(config_file_path)
+        try:
+            config = metomi.rose.config.load(config_file_path)
+        except metomi.rose.config.ConfigSyntaxError:
+            continue
+        meta_dir = load_meta_path(config, conf_dir)[0]
+        if meta_dir is not None:
+            confs_of_meta_dir.setdefault(meta_dir, []).append(
+                (config_file_path, config)
+            )
+    for meta_confs in confs_of_meta_dir.values():
+        if len(meta_confs) > 1:
+            config_file_path, config = meta_confs[0]
+            load_meta_config(
+                config,
+                directory=os.path.dirname(config_file_path),
+                config_type=os.path.basename(config_file_path),
+                error_handler=lambda *_, **__: None,
+                ignore_meta_error=True,
+            )
 
 
 if __name__ == "__main__":
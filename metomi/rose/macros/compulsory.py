@@ -48,7 +48,9 @@ class CompulsoryChecker(metomi.rose.macro.MacroBaseRoseEdit):
         self.basic_section_aliases = {}
         self.alias_section_to_basics = {}
         self.duplicate_section_default = {}
+        self.section_option_aliases = {}
         self.compulsory_data = None
+        self.compulsory_meta_config = None
         super(CompulsoryChecker, self).__init__(*args, **kwargs)
 
     def get_compulsory_data(self, meta_config):
@@ -133,19 +135,25 @@ class CompulsoryChecker(metomi.rose.macro.MacroBaseRoseEdit):
 
         """
         self.reports = []
-        if self.compulsory_data is None:
+        if (
+            self.compulsory_data is None
+            or self.compulsory_meta_config is not meta_config
+        ):
             self.compulsory_data = self.get_compulsory_data(meta_config)
+            self.compulsory_meta_config = meta_config
         self._generate_aliases_for_sections(config_data)
         if only_these_sections is None:
             basic_sections_to_check = self.compulsory_data.keys()
         else:
-            basic_sections_to_check = []
-            alias_sections_to_check = []
+            basic_sections_to_check = {}
+            alias_sections_to_check = set()
             for section in list(only_these_sections):
-                basic_sections_to_check.extend(
-                    self.alias_section_to_basics.get(section, [section])
+                basic_sections_to_check.update(
+                    dict.fromkeys(
+                        self.alias_section_to_basics.get(section, [section])
+                    )
                 )
-                alias_sections_to_check.extend(
+                alias_sections_to_check.update(
                     self.basic_section_aliases.get(section, [section])
                 )
         check_user_ignored_ids = []
@@ -187,23 +195,20 @@ class CompulsoryChecker(metomi.rose.macro.MacroBaseRoseEdit):
                     and alias_section not in alias_sections_to_check
                 ):
                     continue
+                option_aliases = self._get_option_aliases(
+                    config_data, alias_section
+                )
                 for option in section_data[_OPTIONS_KEY]:
-                    present_option_aliases = []
-                    for alias_option in self._get_config_section_options(
-                        config_data, alias_section
-                    ):
-                        if option == alias_option or (
-                            alias_option.startswith(option)
-                            and metomi.rose.macro.REC_ID_STRIP_DUPL.sub(
-                                "", alias_option
-                            )
-                            == option
-                        ):
-                            setting_id = self._get_id_from_section_option(
-                                alias_section, alias_option
-                            )
-                            check_user_ignored_ids.append(setting_id)
-                            present_option_aliases.append(alias_option)
+                    present_option_aliases = [
+                        alias_option
+                        for alias_option in option_aliases.get(option, [])
+                        if alias_option.startswith(option)
+                    ]
+                    for alias_option in present_option_aliases:
+                        setting_id = self._get_id_from_section_option(
+                            alias_section, alias_option
+                        )
+                        check_user_ignored_ids.append(setting_id)
                     if not present_option_aliases:
                         self.add_report(
                             alias_section,
@@ -229,6 +234,9 @@ class CompulsoryChecker(metomi.rose.macro.MacroBaseRoseEdit):
 
     def _generate_aliases_for_sections(self, config_data):
         """Generate maps of duplicate-vs-basic sections in config_data."""
+        self.basic_section_aliases = {}
+        self.alias_section_to_basics = {}
+        self.section_option_aliases = {}
         for section in self._get_config_sections(config_data):
             if section not in self.alias_section_to_basics:
                 basic_section_no_modifier = metomi.rose.macro.REC_ID_STRIP.sub(
@@ -246,6 +254,26 @@ class CompulsoryChecker(metomi.rose.macro.MacroBaseRoseEdit):
                     self.basic_section_aliases.setdefault(basic_section, [])
                     self.basic_section_aliases[basic_section].append(section)
 
+    def _get_option_aliases(self, config_data, section):
+        """Return a map of basic options to options of a section.
+
+        Basic options have any duplicate or element suffixes stripped. An
+        option with a suffix is also mapped to from itself.
+
+        """
+        try:
+            return self.section_option_aliases[section]
+        except KeyError:
+            pass
+        option_aliases = {}
+        for option in self._get_config_section_options(config_data, section):
+            basic_option = metomi.rose.macro.REC_ID_STRIP_DUPL.sub("", option)
+            option_aliases.setdefault(basic_option, []).append(option)
+            if basic_option != option:
+                option_aliases.setdefault(option, []).append(option)
+        self.section_option_aliases[section] = option_aliases
+        return option_aliases
+
 
 class CompulsoryChanger(metomi.rose.macro.MacroBase):
 
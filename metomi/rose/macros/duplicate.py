@@ -30,17 +30,33 @@ class DuplicateChecker(metomi.rose.macro.MacroBase):
     def validate(self, config, meta_config=None):
         """Return a list of errors, if any."""
         self.reports = []
+        if meta_config is None:
+            meta_config = metomi.rose.config.ConfigNode()
+        meta_section_ids = self._get_meta_section_ids(meta_config)
+        # {(basic id, is indexed): (is duplicate, has metadata), ...}
+        section_metadata_map = {}
         sect_error_no_dupl = {}
         sect_keys = list(config.value)
         sorter = metomi.rose.config.sort_settings
         sect_keys.sort(key=cmp_to_key(sorter))
         for section in sect_keys:
-            node = config.get([section])
+            node = config.value[section]
             if not isinstance(node.value, dict):
                 continue
-            metadata = self.get_metadata_for_config_id(section, meta_config)
-            duplicate = metadata.get(metomi.rose.META_PROP_DUPLICATE)
-            is_duplicate = duplicate == metomi.rose.META_PROP_VALUE_TRUE
+            no_index_section = metomi.rose.macro.REC_ID_STRIP_DUPL.sub(
+                "", section
+            )
+            id_key = (no_index_section, no_index_section != section)
+            try:
+                is_duplicate, has_metadata = section_metadata_map[id_key]
+            except KeyError:
+                metadata = self.get_metadata_for_config_id(
+                    section, meta_config
+                )
+                duplicate = metadata.get(metomi.rose.META_PROP_DUPLICATE)
+                is_duplicate = duplicate == metomi.rose.META_PROP_VALUE_TRUE
+                has_metadata = list(metadata) != ["id"]
+                section_metadata_map[id_key] = (is_duplicate, has_metadata)
             basic_section = metomi.rose.macro.REC_ID_STRIP.sub("", section)
             if is_duplicate:
                 if basic_section == section:
@@ -50,32 +66,30 @@ class DuplicateChecker(metomi.rose.macro.MacroBase):
             elif section != basic_section:
                 if basic_section not in sect_error_no_dupl:
                     sect_error_no_dupl.update({basic_section: 1})
-                    no_index_section = metomi.rose.macro.REC_ID_STRIP_DUPL.sub(
-                        "", section
-                    )
                     if no_index_section != section:
                         basic_section = no_index_section
                     warning = self.WARNING_NUM_SECT_NO_DUPL
-                    if self._get_has_metadata(
-                        metadata, basic_section, meta_config
-                    ):
+                    if has_metadata or basic_section in meta_section_ids:
                         self.add_report(
                             section, None, None, warning.format(basic_section)
                         )
         return self.reports
 
-    def _get_has_metadata(self, metadata, basic_section, meta_config):
-        if list(metadata) != ["id"]:
-            return True
-        for meta_keys, meta_node in meta_config.walk(no_ignore=True):
-            meta_section = meta_keys[0]
-            if len(meta_keys) > 1:
+    @staticmethod
+    def _get_meta_section_ids(meta_config):
+        """Return the ids of the sections described in meta_config.
+
+        This includes the section of each option setting with metadata.
+
+        """
+        meta_section_ids = set()
+        for meta_section, meta_node in meta_config.value.items():
+            if meta_node.is_ignored() or not isinstance(
+                meta_node.value, dict
+            ):
                 continue
-            if (
-                meta_section == basic_section
-                or meta_section.startswith(
-                    basic_section + metomi.rose.CONFIG_DELIMITER
-                )
-            ) and isinstance(meta_node.value, dict):
-                return True
-        return False
+            meta_section_ids.add(meta_section)
+            meta_section_ids.add(
+                meta_section.split(metomi.rose.CONFIG_DELIMITER, 1)[0]
+            )
+        return meta_section_ids
@@ -15,6 +15,7 @@
 # along with Rose. If not, see <http://www.gnu.org/licenses/>.
 # -----------------------------------------------------------------------------
 
+from collections import deque
 import copy
 from typing import Any, Dict
 
@@ -66,7 +67,10 @@ class TriggerMacro(metomi.rose.macro.MacroBaseRoseEdit):
                     if not len(values):
                         id_value_dict.update({trig_id: [None]})
                 self.trigger_family_lookup.update({setting_id: id_value_dict})
-        self._trigger_involved_ids = self.get_all_ids()
+        self._trigger_involved_ids = set(self.get_all_ids())
+        self._triggered_ids = set()
+        for id_value_dict in self.trigger_family_lookup.values():
+            self._triggered_ids.update(id_value_dict)
 
     def transform(self, config, meta_config=None):
         """Apply metadata trigger expressions to variables."""
@@ -75,6 +79,137 @@ class TriggerMacro(metomi.rose.macro.MacroBaseRoseEdit):
         self._setup_triggers(meta_config)
         self.enabled_dict = {}
         self.ignored_dict = {}
+        id_list = self._get_config_ids(config)
+
+        # The sections are the same for every update.
+        config_sections = self._get_config_sections(config)
+        config_sections_duplicate_map = self._get_duplicate_config_sections(
+            config, config_sections=config_sections
+        )
+        config_sections = set(config_sections)
+        self._ranked_trigger_ids = self._get_ranked_trigger_ids()
+        for _, var_id in self._ranked_trigger_ids:
+            self.update(
+                var_id,
+                config,
+                meta_config,
+                config_sections=config_sections,
+                config_sections_duplicate_map=config_sections_duplicate_map,
+            )
+        self._transformed_meta_config = meta_config
+        self._linked_trigger_ids_of = None
+        self._transformed_id_index = {
+            var_id: i for i, var_id in enumerate(id_list)
+        }
+
+        self._apply_trigger_states(config, id_list)
+        return config, self.reports
+
+    def transform_incremental(self, config, meta_config, changed_ids):
+        """Re-apply the triggers that depend on changed_ids to config.
+
+        This is for a config that was already passed through transform by
+        this macro with the same meta_config, and then had the settings in
+        changed_ids modified, added or removed. The trigger lookup and the
+        enabled and ignored states of the last transform are reused, and
+        only the triggers connected to changed_ids are updated again.
+
+        If there was no such transform, this falls back to transform.
+
+        Return the config and a list of reports of state changes, as for
+        transform.
+
+        """
+        if getattr(self, '_transformed_meta_config', None) is not meta_config:
+            return self.transform(config, meta_config)
+        self.reports = []
+        config_sections = self._get_config_sections(config)
+        config_sections_duplicate_map = self._get_duplicate_config_sections(
+            config, config_sections=config_sections
+        )
+        config_sections = set(config_sections)
+        # Forget, then redo, the updates that depend on changed_ids.
+        dependent_ids = self._get_dependent_trigger_ids(
+            changed_ids, meta_config
+        )
+        for id_dict in [self.enabled_dict, self.ignored_dict]:
+            for var_id in list(id_dict):
+                if self._get_stripped_id(var_id, meta_config) in dependent_ids:
+                    del id_dict[var_id]
+        id_list = list(changed_ids)
+        for _, var_id in self._ranked_trigger_ids:
+            if var_id not in dependent_ids:
+                continue
+            id_list += self.update(
+                var_id,
+                config,
+                meta_config,
+                config_sections=config_sections,
+                config_sections_duplicate_map=config_sections_duplicate_map,
+            )
+        # Report in config order, walking the config again only if its
+        # layout may have changed.
+        id_index = self._transformed_id_index
+        for var_id in changed_ids:
+            section, option = self._get_section_option_from_id(var_id)
+            if config.get([section, option]) is None:
+                id_index.pop(var_id, None)
+            elif option is None or var_id not in id_index:
+                self._transformed_id_index = id_index = {
+                    var_id: i
+                    for i, var_id in enumerate(self._get_config_ids(config))
+                }
+                break
+        id_list = sorted(
+            dict.fromkeys(id_list),
+            key=lambda var_id: id_index.get(var_id, len(id_index)),
+        )
+        self._apply_trigger_states(config, id_list)
+        return config, self.reports
+
+    def _get_config_ids(self, config):
+        """Return the ids of all the settings in config."""
+        id_list = []
+        for keylist, _ in config.walk():
+            if len(keylist) == 1:
+                id_list.append(keylist[0])
+            else:
+                id_list.append(self._get_id_from_section_option(*keylist))
+        return id_list
+
+    def _get_dependent_trigger_ids(self, setting_ids, meta_config):
+        """Return the trigger ids whose updates depend on setting_ids.
+
+        An update walks through all the ids triggered below it, so these
+        are the ids connected to setting_ids by triggers in any direction.
+
+        """
+        linked_ids_of = self._linked_trigger_ids_of
+        if linked_ids_of is None:
+            linked_ids_of = self._linked_trigger_ids_of = {}
+            for var_id, id_value_dict in self.trigger_family_lookup.items():
+                child_ids = list(id_value_dict)
+                # A triggered section updates the triggers among its options.
+                section, option = self._get_section_option_from_id(var_id)
+                if option is not None:
+                    child_ids.append(section)
+                for child_id in child_ids:
+                    linked_ids_of.setdefault(var_id, []).append(child_id)
+                    linked_ids_of.setdefault(child_id, []).append(var_id)
+        dependent_ids = set()
+        stack = [
+            self._get_stripped_id(setting_id, meta_config)
+            for setting_id in setting_ids
+        ]
+        while stack:
+            var_id = stack.pop()
+            if var_id not in dependent_ids:
+                dependent_ids.add(var_id)
+                stack.extend(linked_ids_of.get(var_id, ()))
+        return dependent_ids
+
+    def _apply_trigger_states(self, config, id_list):
+        """Set the states of id_list in config, reporting any changes."""
         enabled = metomi.rose.config.ConfigNode.STATE_NORMAL
         trig_ignored = metomi.rose.config.ConfigNode.STATE_SYST_IGNORED
         user_ignored = metomi.rose.config.ConfigNode.STATE_USER_IGNORED
@@ -83,35 +218,21 @@ class TriggerMacro(metomi.rose.macro.MacroBaseRoseEdit):
             trig_ignored: 'trig-ignored',
             user_ignored: 'user-ignored',
         }
-        id_list = []
-        prev_ignoreds = {trig_ignored: [], user_ignored: []}
-        for keylist, node in config.walk():
-            if len(keylist) == 1:
-                n_id = keylist[0]
-            else:
-                n_id = self._get_id_from_section_option(*keylist)
-            id_list.append(n_id)
-            if node.state in prev_ignoreds:
-                prev_ignoreds[node.state].append(n_id)
-
-        ranked_ids = self._get_ranked_trigger_ids()
-        for _, var_id in sorted(ranked_ids):
-            self.update(var_id, config, meta_config)
-
-        # Report any discrepancies in ignored status.
         for var_id in id_list:
             section, option = self._get_section_option_from_id(var_id)
             node = config.get([section, option])
+            if node is None:
+                continue
             old, new = None, None
             if var_id in self.ignored_dict:
-                node.state = trig_ignored
-                if not any(var_id in v for v in prev_ignoreds.values()):
+                if node.state not in [trig_ignored, user_ignored]:
                     old, new = state_map[enabled], state_map[trig_ignored]
-            elif var_id in prev_ignoreds[trig_ignored]:
+                node.state = trig_ignored
+            elif node.state == trig_ignored:
                 node.state = enabled
                 old, new = state_map[trig_ignored], state_map[enabled]
             elif (
-                var_id in prev_ignoreds[user_ignored]
+                node.state == user_ignored
                 and var_id in self._trigger_involved_ids
             ):
                 node.state = enabled
@@ -123,9 +244,15 @@ class TriggerMacro(metomi.rose.macro.MacroBaseRoseEdit):
                 else:
                     value = node.value
                 self.add_report(section, option, value, info)
-        return config, self.reports
 
-    def update(self, var_id, config_data, meta_config):
+    def update(
+        self,
+        var_id,
+        config_data,
+        meta_config,
+        config_sections=None,
+        config_sections_duplicate_map=None,
+    ):
         """Update enabled and ignored ids starting with var_id.
 
         var_id - a setting id to start the triggering update at.
@@ -143,12 +270,19 @@ class TriggerMacro(metomi.rose.macro.MacroBaseRoseEdit):
             }
         }
         meta_config - a metomi.rose.config.ConfigNode.
+        config_sections - the sections of config_data, if already known.
+        config_sections_duplicate_map - the duplicate sections of config_data
+        by base section, if already known.
 
         """
-        config_sections = self._get_config_sections(config_data)
-        config_sections_duplicate_map = self._get_duplicate_config_sections(
-            config_data, config_sections=config_sections
-        )
+        if config_sections is None:
+            config_sections = self._get_config_sections(config_data)
+        if config_sections_duplicate_map is None:
+            config_sections_duplicate_map = (
+                self._get_duplicate_config_sections(
+                    config_data, config_sections=config_sections
+                )
+            )
         start_ids = [var_id]
         alt_ids = self._get_id_duplicates(
             var_id,
@@ -169,9 +303,7 @@ class TriggerMacro(metomi.rose.macro.MacroBaseRoseEdit):
             ):
                 # Definitely enabled.
                 is_ignored = False
-            if not sum(
-                [var_id in v for v in self.trigger_family_lookup.values()]
-            ):
+            if var_id not in self._triggered_ids:
                 # Not triggered by anything, so must be enabled.
                 is_ignored = False
             section, option = self._get_section_option_from_id(start_id)
@@ -289,24 +421,38 @@ class TriggerMacro(metomi.rose.macro.MacroBaseRoseEdit):
         We need these to update in breadth-first order to get the ignored
         parent statuses correct and trickled down.
 
-        """
-        # Starting stack has each starting point id with a default depth of 0.
-        # The depth will be overwritten with whatever is the maximum depth
-        # eventually found for that id.
-        stack = [(id_, 0) for id_ in self.trigger_family_lookup]
-
-        # Create a dictionary to store the maximum depth (rank) for each id.
-        id_ranks = dict(stack)
+        The depth (rank) of an id is the length of the longest trigger chain
+        leading to it, found in one pass over the ids in topological order
+        (Kahn's algorithm). Ids in or below a trigger cycle have no such
+        order, so they are ranked after all the others.
 
-        # Loop over the stack, going down all possible trigger chains.
-        while stack:
-            parent_id, depth = stack.pop(0)
-            child_ids = self.trigger_family_lookup.get(parent_id, [])
+        """
+        # Count the parents of each id, and rank ids with none at 0.
+        n_parents_of = dict.fromkeys(self.trigger_family_lookup, 0)
+        for child_ids in self.trigger_family_lookup.values():
             for child_id in child_ids:
-                id_ranks.setdefault(child_id, depth + 1)
-                if depth + 1 > id_ranks[child_id]:
-                    id_ranks[child_id] = depth + 1
-                stack.append((child_id, depth + 1))
+                n_parents_of[child_id] = n_parents_of.get(child_id, 0) + 1
+        id_ranks = {}
+        queue = deque(
+            id_ for id_, n_parents in n_parents_of.items() if not n_parents
+        )
+        for id_ in queue:
+            id_ranks[id_] = 0
+        # Each id is ranked when all its parents are.
+        while queue:
+            parent_id = queue.popleft()
+            depth = id_ranks[parent_id] + 1
+            for child_id in self.trigger_family_lookup.get(parent_id, ()):
+                if depth > id_ranks.get(child_id, -1):
+                    id_ranks[child_id] = depth
+                n_parents_of[child_id] -= 1
+                if not n_parents_of[child_id]:
+                    queue.append(child_id)
+        if len(id_ranks) < len(n_parents_of):
+            cycle_rank = max(id_ranks.values(), default=-1) + 1
+            for id_ in n_parents_of:
+                if n_parents_of[id_]:
+                    id_ranks[id_] = cycle_rank
         ranked_ids = []
         for id_, rank in id_ranks.items():
             ranked_ids.append((rank, id_))
@@ -577,11 +723,7 @@ class TriggerMacro(metomi.rose.macro.MacroBaseRoseEdit):
 
     def get_all_ids(self):
         """Return all setting ids involved in the triggers."""
-        ids = []
-        for trigger_id in self.trigger_family_lookup.keys():
-            ids.append(trigger_id)
+        ids = dict.fromkeys(self.trigger_family_lookup)
         for id_value_dict in self.trigger_family_lookup.values():
-            for triggered_id in id_value_dict:
-                if triggered_id not in ids:
-                    ids.append(triggered_id)
-        return ids
+            ids.update(dict.fromkeys(id_value_dict))
+        return list(ids)
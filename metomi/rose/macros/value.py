@@ -15,7 +15,6 @@
 # along with Rose. If not, see <http://www.gnu.org/licenses/>.
 # -----------------------------------------------------------------------------
 
-import copy
 import re
 
 import metomi.rose.env
@@ -27,6 +26,59 @@ import metomi.rose.variable
 REC_CHARACTER = re.compile(r"'(?:[^']|'')*'$")
 
 
+class ValueMetadata:
+
+    """The value checking metadata of a setting, parsed once.
+
+    key -- A hashable summary of the metadata properties.
+    metadata -- A dict of metadata properties, as returned by
+                metomi.rose.macro.get_metadata_for_config_id.
+
+    """
+
+    def __init__(self, key, metadata):
+        self.key = key
+        metadata = metomi.rose.variable.Variable('', '', metadata).metadata
+        num_elements = metadata.get(metomi.rose.META_PROP_LENGTH, 1)
+        if num_elements != 1:
+            if num_elements == ':':
+                num_elements = -1
+            else:
+                try:
+                    num_elements = int(num_elements)
+                except (TypeError, ValueError):
+                    num_elements = 1
+        self.num_elements = num_elements
+        self.meta_type = metadata.get(metomi.rose.META_PROP_TYPE)
+        type_list = metadata.get(metomi.rose.META_PROP_TYPE, '')
+        if isinstance(type_list, str):
+            type_list = [type_list]
+        self.type_list = type_list
+        self.type_checkers = {}
+        for type_name in type_list:
+            try:
+                meta_type = metomi.rose.meta_type.MetaType.get_meta_type(
+                    type_name
+                )
+            except KeyError:
+                self.type_checkers[type_name] = None
+            else:
+                self.type_checkers[type_name] = meta_type().is_valid
+        self.values = metadata.get(metomi.rose.META_PROP_VALUES)
+        self.value_set = None
+        if self.values is not None:
+            self.value_set = frozenset(self.values)
+        self.is_compulsory = (
+            metadata.get(metomi.rose.META_PROP_COMPULSORY)
+            == metomi.rose.META_PROP_VALUE_TRUE
+        )
+        self.pattern = metadata.get(metomi.rose.META_PROP_PATTERN)
+        self.rec_pattern = None
+        if self.pattern is not None:
+            self.rec_pattern = re.compile(self.pattern, re.VERBOSE)
+        self.range_pat = metadata.get(metomi.rose.META_PROP_RANGE)
+
+
 class ValueChecker(metomi.rose.macro.MacroBase):
 
     """Returns sections and options with wrong values according to metadata.
@@ -56,13 +108,15 @@ class ValueChecker(metomi.rose.macro.MacroBase):
     def __init__(self, *args, **kwargs):
         self.bad_value_meta_map = {}
         self.good_value_meta_map = {}
-        self.pattern_comp_map = {}
         self.range_func_map = {}
+        self.value_metadata_map = {}
+        self.id_value_metadata_map = {}
         super(ValueChecker, self).__init__(*args, **kwargs)
 
     def validate(self, config, meta_config=None, _variables=None):
         """Return a list of errors if found, None otherwise."""
         self.reports = []
+        self.id_value_metadata_map.clear()
         for node_keys, node in config.walk(no_ignore=True):
             if isinstance(node.value, dict):
                 continue
@@ -78,6 +132,7 @@ class ValueChecker(metomi.rose.macro.MacroBase):
     def validate_variables(self, variables, meta_config):
         """Return a list of errors if found, None otherwise."""
         self.reports = []
+        self.id_value_metadata_map.clear()
         for variable in variables:
             # Don't check ignored variables.
             if variable.ignored_reason:
@@ -91,16 +146,21 @@ class ValueChecker(metomi.rose.macro.MacroBase):
 
     def _validate_id(self, var_id, value, meta_config):
         """Validate the value of a particular variable id."""
-        metadata = metomi.rose.macro.get_metadata_for_config_id(
-            var_id, meta_config
-        )
         sect, key = self._get_section_option_from_id(var_id)
-        saved_metadata = copy.deepcopy(metadata)
-        saved_metadata.pop('id')
-        for meta_key in list(saved_metadata):
-            if meta_key not in self.META_PROPS:
-                saved_metadata.pop(meta_key)
-        goodness_id = (value, tuple(sorted(saved_metadata.items())))
+        # Duplicate settings share metadata, so only look it up once.
+        id_key = (
+            metomi.rose.macro.REC_ID_STRIP_DUPL.sub("", var_id),
+            metomi.rose.macro.REC_ID_SINGLE_ELEMENT.search(key) is not None,
+        )
+        try:
+            value_metadata = self.id_value_metadata_map[id_key]
+        except KeyError:
+            metadata = metomi.rose.macro.get_metadata_for_config_id(
+                var_id, meta_config
+            )
+            value_metadata = self._get_value_metadata(metadata)
+            self.id_value_metadata_map[id_key] = value_metadata
+        goodness_id = (value, value_metadata.key)
         if goodness_id in self.good_value_meta_map:
             return
         if goodness_id in self.bad_value_meta_map:
@@ -108,26 +168,14 @@ class ValueChecker(metomi.rose.macro.MacroBase):
                 sect, key, value, self.bad_value_meta_map[goodness_id]
             )
             return
-        variable = metomi.rose.variable.Variable(key, value, metadata)
-        metadata = variable.metadata
         if not isinstance(value, str):
             text = self.WARNING_NOT_STRING.format(repr(value))
             self.bad_value_meta_map[goodness_id] = text
             self.add_report(sect, key, value, text)
             return
-        num_elements = variable.metadata.get(metomi.rose.META_PROP_LENGTH, 1)
-        if num_elements != 1:
-            if num_elements == ':':
-                num_elements = -1
-            else:
-                try:
-                    num_elements = int(num_elements)
-                except (TypeError, ValueError):
-                    num_elements = 1
+        num_elements = value_metadata.num_elements
         val_list = [value]
-        type_list = metadata.get(metomi.rose.META_PROP_TYPE, '')
-        if isinstance(type_list, str):
-            type_list = [type_list]
+        type_list = value_metadata.type_list
         if num_elements != 1:
             val_list = metomi.rose.variable.array_split(value)
             if num_elements != -1:
@@ -144,17 +192,13 @@ class ValueChecker(metomi.rose.macro.MacroBase):
                     self.add_report(sect, key, value, text)
                     return
             num_elements = len(val_list)
-        skip_nulls = (
-            metadata.get(metomi.rose.META_PROP_COMPULSORY)
-            != metomi.rose.META_PROP_VALUE_TRUE
-            and num_elements != 1
-        )
-        if metomi.rose.META_PROP_VALUES in metadata:
-            meta_values = metadata[metomi.rose.META_PROP_VALUES]
+        skip_nulls = not value_metadata.is_compulsory and num_elements != 1
+        if value_metadata.values is not None:
+            meta_values = value_metadata.values
             for val in val_list:
                 if skip_nulls and not val:
                     continue
-                if val not in meta_values:
+                if val not in value_metadata.value_set:
                     if len(meta_values) > 1:
                         text = self.WARNING_WRONG_VALUES.format(
                             val, repr(meta_values)
@@ -166,18 +210,17 @@ class ValueChecker(metomi.rose.macro.MacroBase):
                     self.bad_value_meta_map[goodness_id] = text
                     self.add_report(sect, key, value, text)
                     break
-        elif metomi.rose.META_PROP_TYPE in metadata:
-            meta_type = metadata[metomi.rose.META_PROP_TYPE]
+        elif value_metadata.meta_type is not None:
+            meta_type = value_metadata.meta_type
             if num_elements == 1 and isinstance(meta_type, str):
                 # A standard, non array variable.
                 for val in val_list:
-                    try:
-                        if not self.meta_check(val, meta_type, sect, key):
-                            self.bad_value_meta_map[
-                                goodness_id
-                            ] = self.reports[-1].info
-                    except KeyError:
-                        pass
+                    if not self._check_type(
+                        value_metadata, val, meta_type, sect, key
+                    ):
+                        self.bad_value_meta_map[goodness_id] = self.reports[
+                            -1
+                        ].info
 
             else:
                 # The variable is an array or a derived type array.
@@ -186,38 +229,29 @@ class ValueChecker(metomi.rose.macro.MacroBase):
                 else:
                     type_list = meta_type
                     val_list = metomi.rose.variable.array_split(value)
-                if num_elements == -1:
-                    array_length = len(val_list) / len(type_list)
-                else:
-                    array_length = num_elements
-                type_list = type_list * array_length
+                type_list = type_list * num_elements
 
                 for type_name, val in zip(type_list, val_list):
                     if skip_nulls and not val:
                         continue
-                    try:
-                        if not self.meta_check(val, type_name, sect, key):
-                            self.bad_value_meta_map[
-                                goodness_id
-                            ] = self.reports[-1].info
-                            break
-                    except KeyError:
-                        pass
-        if metomi.rose.META_PROP_PATTERN in metadata:
-            pattern = metadata[metomi.rose.META_PROP_PATTERN]
-            if pattern not in self.pattern_comp_map:
-                self.pattern_comp_map[pattern] = re.compile(
-                    pattern, re.VERBOSE
+                    if not self._check_type(
+                        value_metadata, val, type_name, sect, key
+                    ):
+                        self.bad_value_meta_map[goodness_id] = self.reports[
+                            -1
+                        ].info
+                        break
+        if value_metadata.pattern is not None:
+            if not value_metadata.rec_pattern.search(value):
+                text = self.WARNING_BAD_PATTERN.format(
+                    value, value_metadata.pattern
                 )
-            if not self.pattern_comp_map[pattern].search(value):
-                text = self.WARNING_BAD_PATTERN.format(value, pattern)
                 self.bad_value_meta_map[goodness_id] = text
                 self.add_report(sect, key, value, text)
                 return
-        if metomi.rose.META_PROP_RANGE in metadata:
-            range_pat = metadata[metomi.rose.META_PROP_RANGE]
+        if value_metadata.range_pat is not None:
             text = self.check_range(
-                range_pat,
+                value_metadata.range_pat,
                 var_id,
                 sect,
                 key,
@@ -236,6 +270,42 @@ class ValueChecker(metomi.rose.macro.MacroBase):
             if goodness_id not in self.good_value_meta_map:
                 self.good_value_meta_map[goodness_id] = None
 
+    def _get_value_metadata(self, metadata):
+        """Return the ValueMetadata for the metadata of a setting.
+
+        Settings with the same value checking properties, such as the
+        duplicates of a setting, share the same ValueMetadata.
+
+        """
+        key = tuple(
+            sorted(
+                (prop, value)
+                for prop, value in metadata.items()
+                if prop in self.META_PROPS
+                or prop == metomi.rose.META_PROP_COMPULSORY
+            )
+        )
+        try:
+            return self.value_metadata_map[key]
+        except KeyError:
+            value_metadata = ValueMetadata(key, dict(metadata))
+            self.value_metadata_map[key] = value_metadata
+            return value_metadata
+
+    def _check_type(self, value_metadata, value, meta_type, sect, key):
+        """Check a value is of a type, reporting it if not.
+
+        Values of unknown types pass.
+
+        """
+        is_valid = value_metadata.type_checkers[meta_type]
+        if is_valid is None:
+            return True
+        res = is_valid(value)
+        if not res[0]:
+            self.add_report(sect, key, value, res[1])
+        return res[0]
+
     def meta_check(self, value, meta_type, sect, key):
         """Check function wrapper"""
         res = metomi.rose.meta_type.meta_type_checker(value, meta_type)
@@ -325,7 +395,7 @@ class TypeFixer(metomi.rose.macro.MacroBase):
             metadata = metomi.rose.macro.get_metadata_for_config_id(
                 var_id, meta_config
             )
-            saved_metadata = copy.deepcopy(metadata)
+            saved_metadata = dict(metadata)
             saved_metadata.pop('id')
             node = config.get([sect, opt])
             value = node.value
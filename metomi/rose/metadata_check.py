@@ -16,7 +16,9 @@
 # -----------------------------------------------------------------------------
 """Module to provide checking facilities for Rose configuration metadata."""
 
+from concurrent.futures import ProcessPoolExecutor
 from functools import cmp_to_key, partial
+import multiprocessing
 import os
 import re
 import sys
@@ -79,8 +81,9 @@ def _check_duplicate(value):
         return INVALID_SYNTAX.format(value)
 
 
-def _check_rule(value, setting_id, meta_config):
-    evaluator = metomi.rose.macros.rule.RuleEvaluator()
+def _check_rule(value, setting_id, meta_config, evaluator=None):
+    if evaluator is None:
+        evaluator = metomi.rose.macros.rule.RuleEvaluator()
     ids_used = evaluator.evaluate_rule_id_usage(value, setting_id, meta_config)
     ids_not_found = []
     for id_ in sorted(ids_used):
@@ -97,7 +100,9 @@ def _check_length(value):
         return INVALID_SYNTAX.format(value)
 
 
-def _check_macro(value, module_files=None, meta_dir=None):
+def _check_macro(
+    value, module_files=None, meta_dir=None, import_cache=None
+):
     if module_files is None:
         module_files = _get_module_files(meta_dir)
     if not module_files:
@@ -114,9 +119,7 @@ def _check_macro(value, module_files=None, meta_dir=None):
         ) or macro.endswith("." + metomi.rose.macro.TRANSFORM_METHOD):
             macro_name, method = macro.rsplit(".", 1)
         try:
-            macro_obj = metomi.rose.resource.import_object(
-                macro_name, module_files, _import_err_handler
-            )
+            macro_obj = _import_object(macro_name, module_files, import_cache)
         except Exception as exc:
             return INVALID_IMPORT.format(macro, type(exc).__name__, exc)
         if macro_obj is None:
@@ -211,7 +214,9 @@ def _check_value_hints(hints_value):
         return INCOMPATIBLE.format(metomi.rose.META_PROP_VALUES)
 
 
-def _check_widget(value, module_files=None, meta_dir=None):
+def _check_widget(
+    value, module_files=None, meta_dir=None, import_cache=None
+):
     """Check widget setting is OK."""
     if module_files is None:
         module_files = _get_module_files(meta_dir)
@@ -219,15 +224,39 @@ def _check_widget(value, module_files=None, meta_dir=None):
         return
     widget_name = value.split()[0]
     try:
-        widget = metomi.rose.resource.import_object(
-            widget_name, module_files, _import_err_handler
-        )
+        widget = _import_object(widget_name, module_files, import_cache)
     except Exception as exc:
         return INVALID_IMPORT.format(widget_name, type(exc).__name__, exc)
     if widget is None:
         return INVALID_OBJECT.format(value)
 
 
+def _import_object(import_string, module_files, import_cache=None):
+    """Import a macro or widget object from module_files.
+
+    If import_cache is a dict, store the object, or the exception raised
+    when importing it, so that each import_string is only imported once.
+
+    """
+    if import_cache is None:
+        return metomi.rose.resource.import_object(
+            import_string, module_files, _import_err_handler
+        )
+    try:
+        result = import_cache[import_string]
+    except KeyError:
+        try:
+            result = metomi.rose.resource.import_object(
+                import_string, module_files, _import_err_handler
+            )
+        except Exception as exc:
+            result = exc
+        import_cache[import_string] = result
+    if isinstance(result, Exception):
+        raise result
+    return result
+
+
 def _get_module_files(meta_dir=None):
     module_files = []
     if meta_dir is not None:
@@ -250,15 +279,16 @@ def metadata_check(
     meta_dir=None,
     only_these_sections=None,
     only_these_properties=None,
+    jobs=1,
 ):
-    """Check metadata validity."""
-    allowed_properties = get_allowed_metadata_properties()
-    reports = []
+    """Check metadata validity.
+
+    If jobs is more than 1, check the sections in up to jobs processes.
+
+    """
     module_files = _get_module_files(meta_dir)
-    sections = list(meta_config.value)
-    sections.sort(key=cmp_to_key(metomi.rose.config.sort_settings))
-    for section in sections:
-        node = meta_config.value[section]
+    sections = []
+    for section, node in meta_config.value.items():
         if node.is_ignored() or not isinstance(node.value, dict):
             continue
         if (
@@ -266,6 +296,62 @@ def metadata_check(
             and section not in only_these_sections
         ):
             continue
+        sections.append(section)
+    sections.sort(key=cmp_to_key(metomi.rose.config.sort_settings))
+    check_args = (meta_config, module_files, only_these_properties)
+    if jobs > 1 and len(sections) > 1:
+        reports = _check_sections_in_pool(jobs, sections, *check_args)
+    else:
+        reports = _check_sections(sections, *check_args)
+    # Check triggering.
+    trigger_macro = metomi.rose.macros.trigger.TriggerMacro()
+    # The .validate method will be replaced in a forthcoming enhancement.
+    trig_reports = trigger_macro.validate(
+        metomi.rose.config.ConfigNode(), meta_config=meta_config
+    )
+    for report in trig_reports:
+        if report.option is None:
+            new_rep_section = report.section
+        else:
+            new_rep_section = (
+                report.section + metomi.rose.CONFIG_DELIMITER + report.option
+            )
+        rep_id_node = meta_config.get([new_rep_section], no_ignore=True)
+        if rep_id_node is None:
+            new_rep_option = None
+            new_rep_value = None
+        else:
+            new_rep_option = metomi.rose.META_PROP_TRIGGER
+            rep_trig_node = meta_config.get(
+                [new_rep_section, new_rep_option], no_ignore=True
+            )
+            if rep_trig_node is None:
+                new_rep_value = None
+            else:
+                new_rep_value = rep_trig_node.value
+        reports.append(
+            metomi.rose.macro.MacroReport(
+                new_rep_section, new_rep_option, new_rep_value, report.info
+            )
+        )
+    reports.sort(key=cmp_to_key(metomi.rose.macro.report_sort))
+    return reports
+
+
+def _check_sections(
+    sections, meta_config, module_files, only_these_properties
+):
+    """Return reports for the properties of sections in meta_config.
+
+    Each macro and widget is imported once, and rules share an evaluator.
+
+    """
+    allowed_properties = get_allowed_metadata_properties()
+    evaluator = metomi.rose.macros.rule.RuleEvaluator()
+    import_cache = {}
+    reports = []
+    for section in sections:
+        node = meta_config.value[section]
         if (
             node.get([metomi.rose.META_PROP_VALUES], no_ignore=True)
             is not None
@@ -328,9 +414,17 @@ def metadata_check(
                         )
                     )
             if option.startswith(metomi.rose.META_PROP_WIDGET):
-                check_func = partial(_check_widget, module_files=module_files)
+                check_func = partial(
+                    _check_widget,
+                    module_files=module_files,
+                    import_cache=import_cache,
+                )
             elif option == metomi.rose.META_PROP_MACRO:
-                check_func = partial(_check_macro, module_files=module_files)
+                check_func = partial(
+                    _check_macro,
+                    module_files=module_files,
+                    import_cache=import_cache,
+                )
             elif option == metomi.rose.META_PROP_VALUE_TITLES:
                 check_func = partial(
                     _check_value_titles,
@@ -343,7 +437,10 @@ def metadata_check(
                 metomi.rose.META_PROP_WARN_IF,
             ]:
                 check_func = partial(
-                    _check_rule, setting_id=section, meta_config=meta_config
+                    _check_rule,
+                    setting_id=section,
+                    meta_config=meta_config,
+                    evaluator=evaluator,
                 )
             else:
                 func_name = "_check_" + option.replace("-", "_")
@@ -353,41 +450,55 @@ def metadata_check(
                 reports.append(
                     metomi.rose.macro.MacroReport(section, option, value, info)
                 )
-    # Check triggering.
-    trigger_macro = metomi.rose.macros.trigger.TriggerMacro()
-    # The .validate method will be replaced in a forthcoming enhancement.
-    trig_reports = trigger_macro.validate(
-        metomi.rose.config.ConfigNode(), meta_config=meta_config
-    )
-    for report in trig_reports:
-        if report.option is None:
-            new_rep_section = report.section
-        else:
-            new_rep_section = (
-                report.section + metomi.rose.CONFIG_DELIMITER + report.option
-            )
-        rep_id_node = meta_config.get([new_rep_section], no_ignore=True)
-        if rep_id_node is None:
-            new_rep_option = None
-            new_rep_value = None
-        else:
-            new_rep_option = metomi.rose.META_PROP_TRIGGER
-            rep_trig_node = meta_config.get(
-                [new_rep_section, new_rep_option], no_ignore=True
-            )
-            if rep_trig_node is None:
-                new_rep_value = None
-            else:
-                new_rep_value = rep_trig_node.value
-        reports.append(
-            metomi.rose.macro.MacroReport(
-                new_rep_section, new_rep_option, new_rep_value, report.info
-            )
-        )
-    reports.sort(key=cmp_to_key(metomi.rose.macro.report_sort))
     return reports
 
 
+def _check_sections_in_pool(jobs, sections, *check_args):
+    """Return _check_sections reports, using a pool of jobs processes.
+
+    The sections are split into a shard per process, and the reports are
+    returned in the same order as for a single process.
+
+    """
+    shard_size = -(-len(sections) // jobs)
+    mp_context = None
+    if 'fork' in multiprocessing.get_all_start_methods():
+        # Forked processes inherit check_args without pickling.
+        mp_context = multiprocessing.get_context('fork')
+    executor = ProcessPoolExecutor(
+        jobs,
+        mp_context=mp_context,
+        initializer=_init_check_sections_process,
+        initargs=check_args,
+    )
+    try:
+        futures = [
+            executor.submit(_check_sections_shard, sections[i:i + shard_size])
+            for i in range(0, len(sections), shard_size)
+        ]
+        reports = []
+        for future in futures:
+            reports += future.result()
+        return reports
+    finally:
+        executor.shutdown(cancel_futures=True)
+
+
+# The _check_sections arguments of a pool process, other than sections.
+_CHECK_ARGS = None
+
+
+def _init_check_sections_process(*check_args):
+    """Store the _check_sections arguments of a pool process."""
+    global _CHECK_ARGS
+    _CHECK_ARGS = check_args
+
+
+def _check_sections_shard(sections):
+    """Return _check_sections reports for sections in a pool process."""
+    return _check_sections(sections, *_CHECK_ARGS)
+
+
 def _import_err_handler(exception):
     if isinstance(exception, Exception):
         raise exception
@@ -406,7 +517,11 @@ ARGUMENTS
        this section will be checked.
        ''',
     )
-    opt_parser.add_my_options("conf_dir", "property")
+    opt_parser.add_my_options("conf_dir", "jobs", "property")
+    opt_parser.modify_option(
+        'jobs',
+        help='Check the metadata sections in up to N processes at a time.',
+    )
     opt_parser.modify_option(
         'property',
         help=(
@@ -439,6 +554,7 @@ ARGUMENTS
         meta_dir=opts.conf_dir,
         only_these_sections=sections,
         only_these_properties=properties,
+        jobs=opts.jobs,
     )
     macro_id = metomi.rose.macro.MACRO_OUTPUT_ID.format(
         metomi.rose.macro.VALIDATE_METHOD.upper()[0],
@@ -103,6 +103,17 @@ class RoseOptionParser(OptionParser):
                 "help": "Shorthand for --lookup-mode=address",
             },
         ],
+        "all_apps": [
+            ["--all-apps"],
+            {
+                "action": "store_true",
+                "default": False,
+                "help": (
+                    "Change every app in the suite with the same metadata"
+                    " category."
+                ),
+            },
+        ],
         "all_revs": [
             ["--all-revs"],
             {
@@ -384,6 +395,19 @@ class RoseOptionParser(OptionParser):
                 ),
             },
         ],
+        "first_n": [
+            ["--first-n"],
+            {
+                "action": "store",
+                "metavar": "N",
+                "type": "int",
+                "help": (
+                    "Stop waiting for hosts once N hosts have met the"
+                    " thresholds, ignoring any slower hosts."
+                    "\nDefault is to wait for all hosts or the timeout."
+                ),
+            },
+        ],
         "fix": [
             ["--fix", "-F"],
             {
@@ -456,6 +480,30 @@ class RoseOptionParser(OptionParser):
                 "help": "Install files only, don't run the command.",
             },
         ],
+        "interval": [
+            ["--interval"],
+            {
+                "action": "store",
+                "metavar": "SECONDS",
+                "type": "float",
+                "help": (
+                    "Select a host every SECONDS seconds until interrupted."
+                    "\nA host-select-client is kept running on each host"
+                    " between selections."
+                ),
+            },
+        ],
+        "jobs": [
+            ["--jobs", "-j"],
+            {
+                "action": "store",
+                "dest": "jobs",
+                "default": 1,
+                "metavar": "N",
+                "type": "int",
+                "help": "Process up to N configurations at a time.",
+            },
+        ],
         "keys": [
             ["--keys", "-k"],
             {
@@ -1157,6 +1205,7 @@ class RoseOptionParser(OptionParser):
             ["--timeout"],
             {
                 "metavar": "FLOAT",
+                "type": "float",
                 "help": "Set a timeout in seconds.",
             },
         ],
@@ -16,9 +16,10 @@
 # -----------------------------------------------------------------------------
 """Provide a common environment for a task in a cycling suite."""
 
-from glob import glob
+from glob import escape, glob, has_magic
 import os
 import sys
+from time import time
 import traceback
 
 from metomi.rose.env import EnvExportEvent
@@ -32,8 +33,18 @@ PATH_GLOBS = {
 }
 
 
+# Do not cache globs over directories modified this recently (in seconds),
+# as a further change within the resolution of the file system's modified
+# times would go unnoticed.
+GLOB_CACHE_MIN_AGE = 2.0
+
+
 def get_prepend_paths(
-    event_handler=None, path_root=None, path_glob_args=None, full_mode=False
+    event_handler=None,
+    path_root=None,
+    path_glob_args=None,
+    full_mode=False,
+    glob_cache=None,
 ):
     """Return map of PATH-like env-var names to path lists to prepend to them.
 
@@ -47,6 +58,8 @@ def get_prepend_paths(
                       file system paths to prepend to NAME.
     full_mode -- If True, prepend relevant paths in site/user configuration and
                  the setting defined in "rose.task_env.PATH_GLOBS".
+    glob_cache -- If specified, a dict for caching the results of the globs,
+                  see "cached_glob".
 
     Return something like:
         {"PATH": ["/opt/foo/bin", "/opt/bar/bin"],
@@ -103,8 +116,11 @@ def get_prepend_paths(
                     path_glob = os.path.expanduser(path_glob)
                 if not os.path.isabs(path_glob):
                     path_glob = os.path.join(path_root, path_glob)
-                for path in sorted(glob(path_glob)):
-                    more_prepend_paths_map[name].append(path)
+                if glob_cache is None:
+                    paths = sorted(glob(path_glob))
+                else:
+                    paths = cached_glob(path_glob, glob_cache)
+                more_prepend_paths_map[name].extend(paths)
             else:
                 more_prepend_paths_map[name] = []  # empty value resets
     for name, more_prepend_paths in more_prepend_paths_map.items():
@@ -118,6 +134,81 @@ def get_prepend_paths(
     return prepend_paths_map
 
 
+def cached_glob(path_glob, glob_cache):
+    """Return sorted(glob(path_glob)), using and updating glob_cache.
+
+    glob_cache -- A JSON serialisable dict, which maps each path_glob to its
+                  result and the modified times of the directories that
+                  determine it. A cached result is used until any of these
+                  directories is modified.
+
+    """
+    entry = glob_cache.get(path_glob)
+    if entry is not None and all(
+        _get_mtime_ns(dir_) == mtime_ns
+        for dir_, mtime_ns in entry["dirs"].items()
+    ):
+        return list(entry["paths"])
+    paths, dirs = _glob_with_dirs(path_glob)
+    min_mtime_ns = (time() - GLOB_CACHE_MIN_AGE) * 1e9
+    if all(
+        mtime_ns is not None and mtime_ns < min_mtime_ns
+        for mtime_ns in dirs.values()
+    ):
+        glob_cache[path_glob] = {"paths": paths, "dirs": dirs}
+    else:
+        glob_cache.pop(path_glob, None)
+    return paths
+
+
+def _get_mtime_ns(path):
+    """Return the modified time of path in ns, or None if it does not exist."""
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+
+def _glob_with_dirs(path_glob):
+    """Return the result of a glob and the directories that determine it.
+
+    Return (paths, dirs), where paths is sorted(glob(path_glob)) and dirs is a
+    dict mapping each directory listed to its modified time in ns.
+
+    Example:
+        >>> paths, dirs = _glob_with_dirs('/dev/nul[l]')
+        >>> paths
+        ['/dev/null']
+        >>> list(dirs)
+        ['/dev']
+
+    """
+    # split into the literal head and the tail with magic characters in it
+    head, tail = os.path.abspath(path_glob), []
+    while has_magic(head):
+        head, name = os.path.split(head)
+        tail.insert(0, name)
+    if not tail:
+        # no magic, depends on the existence of the file in its directory
+        head, name = os.path.split(head)
+        tail.append(name)
+    while not os.path.isdir(head):
+        # depends on the creation of head, or a directory above it
+        tail = []
+        head = os.path.dirname(head)
+    dirs = {}
+    paths = [head] if tail else []
+    for name in tail:
+        more_paths = []
+        for path in paths:
+            dirs[path] = _get_mtime_ns(path)
+            more_paths.extend(glob(os.path.join(escape(path), name)))
+        paths = more_paths
+    if not tail:
+        dirs[head] = _get_mtime_ns(head)
+    return sorted(paths), dirs
+
+
 def main():
     """rose task-env."""
     opt_parser = RoseOptionParser(
@@ -16,15 +16,19 @@
 # -----------------------------------------------------------------------------
 """Implement "rose task-run"."""
 
+import json
 import os
 import sys
+from tempfile import NamedTemporaryFile
+from time import time
 import traceback
 
-from metomi.rose.app_run import AppRunner
+import metomi.rose
+from metomi.rose.app_run import AppRunner, BuiltinApp
 from metomi.rose.env import env_export
 from metomi.rose.opt_parse import RoseOptionParser
 from metomi.rose.popen import RosePopenError
-from metomi.rose.reporter import Reporter
+from metomi.rose.reporter import Event, Reporter
 from metomi.rose.run import Runner
 from metomi.rose.task_env import get_prepend_paths
 
@@ -37,6 +41,100 @@ class TaskAppNotFoundError(Exception):
         return "%s (key=%s): task has no associated application." % self.args
 
 
+class TaskRunStartupEvent(Event):
+
+    """An event to report the time taken by each phase of task start-up."""
+
+    LEVEL = Event.VV
+
+    def __str__(self):
+        return "Start-up times:\n" + "".join(
+            "    %s: %.3fs\n" % (phase, seconds)
+            for phase, seconds in self.args[0]
+        )
+
+
+class TaskRunCache:
+
+    """Cache of task start-up information shared by the tasks of a suite run.
+
+    The cache is stored as a JSON file in the ".service" directory of the
+    suite run (if there is one). It holds:
+
+    * The schemes of the builtin applications, so that a task that is not a
+      builtin application does not need to import them.
+    * The results of the path-prepend globs, see
+      "metomi.rose.task_env.cached_glob".
+
+    The cache is discarded if it was written by a different version of Rose.
+
+    """
+
+    FILE_NAME = "rose-task-run-cache.json"
+
+    def __init__(self, suite_dir):
+        self.path = None
+        self.data = {}
+        if suite_dir:
+            service_dir = os.path.join(suite_dir, ".service")
+            if os.path.isdir(service_dir):
+                self.path = os.path.join(service_dir, self.FILE_NAME)
+        if self.path:
+            try:
+                with open(self.path) as handle:
+                    self.data = json.load(handle)
+            except (OSError, ValueError):
+                pass
+        if (
+            not isinstance(self.data, dict)
+            or self.data.get("version") != metomi.rose.__version__
+        ):
+            self.data = {"version": metomi.rose.__version__}
+        self.data.setdefault("path_globs", {})
+        self.orig_data = json.dumps(self.data, sort_keys=True)
+
+    @property
+    def glob_cache(self):
+        """The cache for "metomi.rose.task_env.get_prepend_paths"."""
+        return self.data["path_globs"]
+
+    def get_builtin_app_schemes(self, app_runner):
+        """Return the schemes of the builtin applications, in order.
+
+        Return None if a builtin application cannot be matched to a name by
+        its scheme alone. The builtin applications of app_runner are only
+        loaded if the schemes are not cached.
+
+        """
+        if "builtin_app_schemes" not in self.data:
+            handlers = app_runner.builtins_manager.handlers
+            schemes = list(handlers)
+            for handler in handlers.values():
+                if type(handler).can_handle is not BuiltinApp.can_handle:
+                    schemes = None
+                    break
+            self.data["builtin_app_schemes"] = schemes
+        return self.data["builtin_app_schemes"]
+
+    def save(self):
+        """Write the cache file, if it has changed."""
+        if not self.path:
+            return
+        data = json.dumps(self.data, sort_keys=True)
+        if data == self.orig_data:
+            return
+        try:
+            with NamedTemporaryFile(
+                "w", dir=os.path.dirname(self.path), delete=False
+            ) as handle:
+                handle.write(data)
+            os.replace(handle.name, self.path)
+        except OSError:
+            pass  # another task can write it
+        else:
+            self.orig_data = data
+
+
 class TaskRunner(Runner):
 
     """A wrapper to a Rose task."""
@@ -63,6 +161,9 @@ class TaskRunner(Runner):
 
     def run_impl(self, opts, args, uuid, work_files):
         """Run application configuration as a suite task."""
+        startup_times = []
+        time0 = time()
+
         # "rose task-env"
         t_prop = self.suite_engine_proc.get_task_props(
             cycle=opts.cycle,
@@ -75,6 +176,9 @@ class TaskRunner(Runner):
             if os.getenv(key) != value:
                 env_export(key, value, self.event_handler)
                 is_changed = True
+        cache = TaskRunCache(t_prop.suite_dir)
+        startup_times.append(("task-env", time() - time0))
+        time0 = time()
 
         path_globs = opts.path_globs
         if path_globs is None:
@@ -84,6 +188,7 @@ class TaskRunner(Runner):
             t_prop.suite_dir,
             path_globs,
             full_mode=is_changed,
+            glob_cache=cache.glob_cache,
         )
         for key, prepend_paths in prepend_paths_map.items():
             orig_paths = []
@@ -92,14 +197,39 @@ class TaskRunner(Runner):
                 orig_paths = orig_v.split(os.pathsep)
             value = os.pathsep.join(prepend_paths + orig_paths)
             env_export(key, value, self.event_handler)
+        startup_times.append(("path-prepend", time() - time0))
+        time0 = time()
 
         # Name association with builtin applications
         builtin_app = None
         if opts.app_mode is None:
-            builtin_apps_manager = self.app_runner.builtins_manager
-            builtin_app = builtin_apps_manager.guess_handler(t_prop.task_name)
+            schemes = cache.get_builtin_app_schemes(self.app_runner)
+            if schemes is None:
+                builtin_app = self.app_runner.builtins_manager.guess_handler(
+                    t_prop.task_name
+                )
+            else:
+                # only load the builtin applications if one is needed
+                if t_prop.task_name in schemes:
+                    scheme = t_prop.task_name
+                else:
+                    scheme = next(
+                        (
+                            scheme
+                            for scheme in schemes
+                            if t_prop.task_name.startswith(scheme)
+                        ),
+                        None,
+                    )
+                if scheme is not None:
+                    builtin_app = (
+                        self.app_runner.builtins_manager.get_handler(scheme)
+                    )
             if builtin_app is not None:
                 opts.app_mode = builtin_app.SCHEME
+        cache.save()
+        startup_times.append(("builtin-apps", time() - time0))
+        time0 = time()
 
         # Determine what app config to use
         if not opts.conf_dir:
@@ -126,6 +256,8 @@ class TaskRunner(Runner):
                 if not os.path.isdir(conf_dir):
                     raise TaskAppNotFoundError(t_prop.task_name, app_key)
             opts.conf_dir = conf_dir
+        startup_times.append(("app-config", time() - time0))
+        self.handle_event(TaskRunStartupEvent(startup_times))
 
         return self.app_runner(opts, args)
 
@@ -0,0 +1,123 @@
+# Copyright (C) British Crown (Met Office) & Contributors.
+# This file is part of Rose, a framework for meteorological suites.
+#
+# Rose is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Rose is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Rose. If not, see <http://www.gnu.org/licenses/>.
+# -----------------------------------------------------------------------------
+
+"""Tests for rose macros compulsory module.
+"""
+
+from io import StringIO
+
+import pytest
+
+from metomi.rose.config import ConfigLoader
+from metomi.rose.macros.compulsory import CompulsoryChecker
+
+
+param = pytest.param
+
+CONFIG = '''
+[namelist:req(1)]
+isec=1
+item(2)=1
+
+[namelist:req(2)]
+!isec=1
+
+[namelist:req{mod}(1)]
+'''
+
+META_CONFIG = '''
+[namelist:other]
+compulsory=true
+
+[namelist:req]
+duplicate=true
+
+[namelist:req=isec]
+compulsory=true
+
+[namelist:req=item]
+compulsory=true
+'''
+
+
+@pytest.mark.parametrize(
+    'only_these_sections, expected', [
+        param(
+            None,
+            [
+                ('namelist:other', None, 'sect missing'),
+                ('namelist:req(2)', 'isec', 'user ignored'),
+                ('namelist:req(2)', 'item', 'opt missing'),
+                ('namelist:req{mod}(1)', 'isec', 'opt missing'),
+                ('namelist:req{mod}(1)', 'item', 'opt missing'),
+            ],
+            id='all'
+        ),
+        param(
+            ['namelist:req(1)', 'namelist:req(2)'],
+            [
+                ('namelist:req(2)', 'isec', 'user ignored'),
+                ('namelist:req(2)', 'item', 'opt missing'),
+            ],
+            id='duplicates'
+        ),
+        param(
+            ['namelist:other', 'namelist:foo'],
+            [
+                ('namelist:other', None, 'sect missing'),
+            ],
+            id='missing'
+        ),
+    ]
+)
+def test_validate_settings(only_these_sections, expected):
+    """Test reporting missing and user-ignored compulsory settings."""
+    loader = ConfigLoader()
+    config = loader.load(StringIO(CONFIG))
+    meta_config = loader.load(StringIO(META_CONFIG))
+    checker = CompulsoryChecker()
+    infos = {
+        checker.WARNING_COMPULSORY_SECT_MISSING: 'sect missing',
+        checker.WARNING_COMPULSORY_OPT_MISSING: 'opt missing',
+        checker.WARNING_COMPULSORY_USER_IGNORED: 'user ignored',
+    }
+    reports = checker.validate_settings(
+        config, meta_config, only_these_sections
+    )
+    assert sorted(
+        (report.section, report.option, infos[report.info])
+        for report in reports
+    ) == expected
+
+
+def test_validate_settings_meta_config():
+    """Test compulsory data is re-read for a different metadata config."""
+    loader = ConfigLoader()
+    config = loader.load(StringIO('[env]\n'))
+    checker = CompulsoryChecker()
+    reports = checker.validate(
+        config, loader.load(StringIO('[env=A]\ncompulsory=true\n'))
+    )
+    assert [(report.section, report.option) for report in reports] == [
+        ('env', 'A'),
+    ]
+    reports = checker.validate(
+        config, loader.load(StringIO('[env=B]\ncompulsory=true\n'))
+    )
+    assert [(report.section, report.option) for report in reports] == [
+        ('env', 'B'),
+    ]
@@ -0,0 +1,95 @@
+# Copyright (C) British Crown (Met Office) & Contributors.
+# This file is part of Rose, a framework for meteorological suites.
+#
+# Rose is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Rose is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Rose. If not, see <http://www.gnu.org/licenses/>.
+# -----------------------------------------------------------------------------
+
+"""Tests for rose macros duplicate module.
+"""
+
+from io import StringIO
+
+import pytest
+
+from metomi.rose.config import ConfigLoader
+from metomi.rose.macros.duplicate import DuplicateChecker
+
+
+param = pytest.param
+
+META_CONFIG = '''
+[namelist:dupl]
+duplicate=true
+
+[namelist:mod]
+duplicate=true
+
+[namelist:nodupl]
+title=No duplicates
+
+[namelist:opts=foo]
+type=integer
+
+[!namelist:ignored]
+'''
+
+
+@pytest.mark.parametrize(
+    'sections, expected', [
+        param(
+            ['namelist:dupl(1)', 'namelist:dupl(2)'],
+            [],
+            id='duplicate'
+        ),
+        param(
+            ['namelist:dupl', 'namelist:dupl(1)'],
+            [('namelist:dupl', 'incorrect "duplicate=true" metadata')],
+            id='duplicate_no_index'
+        ),
+        param(
+            ['namelist:mod{a}', 'namelist:mod{a}(1)'],
+            [],
+            id='modifier'
+        ),
+        param(
+            ['namelist:nodupl(1)', 'namelist:nodupl(2)'],
+            [(
+                'namelist:nodupl(1)',
+                'namelist:nodupl requires "duplicate=true" metadata',
+            )],
+            id='no_duplicate'
+        ),
+        param(
+            ['namelist:opts(1)'],
+            [(
+                'namelist:opts(1)',
+                'namelist:opts requires "duplicate=true" metadata',
+            )],
+            id='option_metadata'
+        ),
+        param(
+            ['namelist:ignored(1)', 'namelist:other(1)'],
+            [],
+            id='no_metadata'
+        ),
+    ]
+)
+def test_validate(sections, expected):
+    """Test reporting sections whose duplicate metadata is wrong."""
+    config = ConfigLoader().load(StringIO(
+        ''.join(f'[{section}]\na=1\n' for section in sections)
+    ))
+    meta_config = ConfigLoader().load(StringIO(META_CONFIG))
+    reports = DuplicateChecker().validate(config, meta_config)
+    assert [(report.section, report.info) for report in reports] == expected
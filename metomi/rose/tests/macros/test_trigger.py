@@ -0,0 +1,172 @@
+# Copyright (C) British Crown (Met Office) & Contributors.
+# This file is part of Rose, a framework for meteorological suites.
+#
+# Rose is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Rose is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Rose. If not, see <http://www.gnu.org/licenses/>.
+# -----------------------------------------------------------------------------
+
+"""Tests for rose macros trigger module.
+"""
+
+from copy import deepcopy
+from io import StringIO
+
+import pytest
+
+from metomi.rose.config import ConfigLoader
+from metomi.rose.macros.trigger import TriggerMacro
+
+
+param = pytest.param
+
+
+def get_trigger_macro(lookup):
+    """Return a TriggerMacro with a trigger lookup of {parent: [child]}."""
+    trigger_macro = TriggerMacro()
+    trigger_macro.trigger_family_lookup = {
+        parent: dict.fromkeys(children, [None])
+        for parent, children in lookup.items()
+    }
+    return trigger_macro
+
+
+@pytest.mark.parametrize(
+    'lookup, ranked_ids', [
+        param(
+            {'a': ['b'], 'b': ['c']},
+            [(0, 'a'), (1, 'b'), (2, 'c')],
+            id='chain'
+        ),
+        param(
+            {'a': ['b', 'c'], 'b': ['d'], 'c': ['e'], 'e': ['d']},
+            [(0, 'a'), (1, 'b'), (1, 'c'), (2, 'e'), (3, 'd')],
+            id='longest_path'
+        ),
+        param(
+            {'a': ['c'], 'b': ['c']},
+            [(0, 'a'), (0, 'b'), (1, 'c')],
+            id='two_parents'
+        ),
+        param(
+            {'a': ['b'], 'b': ['c'], 'c': ['b']},
+            [(0, 'a'), (2, 'b'), (2, 'c')],
+            id='cycle'
+        ),
+    ]
+)
+def test_get_ranked_trigger_ids(lookup, ranked_ids):
+    """Test ranking trigger ids by their longest trigger chain."""
+    trigger_macro = get_trigger_macro(lookup)
+    assert trigger_macro._get_ranked_trigger_ids() == ranked_ids
+
+
+def test_get_ranked_trigger_ids_diamonds():
+    """Test ranking a deep chain of diamonds in linear time."""
+    lookup = {}
+    for i in range(1000):
+        lookup[f'top{i}'] = [f'left{i}', f'right{i}']
+        lookup[f'left{i}'] = [f'top{i + 1}']
+        lookup[f'right{i}'] = [f'top{i + 1}']
+    trigger_macro = get_trigger_macro(lookup)
+    ranked_ids = trigger_macro._get_ranked_trigger_ids()
+    assert ranked_ids[-1] == (2000, 'top1000')
+
+
+def test_transform():
+    """Test applying triggers to the states of settings."""
+    loader = ConfigLoader()
+    config = loader.load(StringIO(
+        '[env]\nA=false\nB=1\n!!C=1\n!D=1\n'
+    ))
+    meta_config = loader.load(StringIO(
+        '[env=A]\ntrigger=env=B: true; env=C: false\n'
+        '[env=B]\ntrigger=env=D\n'
+        '[env=C]\n[env=D]\n'
+    ))
+    config, reports = TriggerMacro().transform(config, meta_config)
+    assert [
+        (report.section, report.option, report.info) for report in reports
+    ] == [
+        ('env', 'C', 'trig-ignored -> enabled     '),
+        ('env', 'B', 'enabled      -> trig-ignored'),
+    ]
+    assert [
+        (keys, node.state) for keys, node in config.walk(['env'])
+    ] == [
+        (['env', 'D'], '!!'),
+        (['env', 'C'], ''),
+        (['env', 'B'], '!!'),
+        (['env', 'A'], ''),
+    ]
+
+
+@pytest.mark.parametrize(
+    'value, changed_ids', [
+        param('true', ['env=A'], id='value'),
+        param(None, ['env=A'], id='removed'),
+        param('false', ['env=E'], id='unrelated'),
+    ]
+)
+def test_transform_incremental(value, changed_ids):
+    """Test re-applying the triggers that depend on changed settings."""
+    loader = ConfigLoader()
+    config = loader.load(StringIO(
+        '[env]\nA=false\nB=1\n!!C=1\n!D=1\nE=true\n!!F=1\n'
+    ))
+    meta_config = loader.load(StringIO(
+        '[env=A]\ntrigger=env=B: true; env=C: false\n'
+        '[env=B]\ntrigger=env=D\n'
+        '[env=C]\n[env=D]\n'
+        '[env=E]\ntrigger=env=F: true\n'
+        '[env=F]\n'
+    ))
+    trigger_macro = TriggerMacro()
+    trigger_macro.transform(config, meta_config)
+    for changed_id in changed_ids:
+        option = changed_id.split('=')[1]
+        if value is None:
+            config.unset(['env', option])
+        else:
+            config.set(['env', option], value)
+    expected_config, expected_reports = TriggerMacro().transform(
+        deepcopy(config), meta_config
+    )
+    config, reports = trigger_macro.transform_incremental(
+        config, meta_config, changed_ids
+    )
+    assert [
+        (report.section, report.option, report.info) for report in reports
+    ] == [
+        (report.section, report.option, report.info)
+        for report in expected_reports
+    ]
+    assert [
+        (keys, node.state) for keys, node in config.walk()
+    ] == [
+        (keys, node.state) for keys, node in expected_config.walk()
+    ]
+
+
+def test_transform_incremental_no_transform():
+    """Test a full transform is done if there was none before."""
+    loader = ConfigLoader()
+    config = loader.load(StringIO('[env]\nA=false\nB=1\n'))
+    meta_config = loader.load(StringIO(
+        '[env=A]\ntrigger=env=B: true\n[env=B]\n'
+    ))
+    config, reports = TriggerMacro().transform_incremental(
+        config, meta_config, ['env=A']
+    )
+    assert [(report.option, report.info) for report in reports] == [
+        ('B', 'enabled      -> trig-ignored'),
+    ]
@@ -0,0 +1,100 @@
+# Copyright (C) British Crown (Met Office) & Contributors.
+# This file is part of Rose, a framework for meteorological suites.
+#
+# Rose is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Rose is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Rose. If not, see <http://www.gnu.org/licenses/>.
+# -----------------------------------------------------------------------------
+
+"""Tests for rose macros value module.
+"""
+
+from io import StringIO
+
+import pytest
+
+from metomi.rose.config import ConfigLoader
+from metomi.rose.macros.value import ValueChecker
+
+
+param = pytest.param
+
+META_CONFIG = '''
+[namelist:req]
+duplicate=true
+
+[namelist:req=item]
+type=integer
+
+[namelist:req=levels]
+length=:
+range=1:85
+type=integer
+
+[namelist:req=name]
+values='a', 'b'
+
+[namelist:req=package]
+pattern=^'.*'$
+'''
+
+
+@pytest.mark.parametrize(
+    'setting, value, info', [
+        param('item', '10', None, id='good'),
+        param(
+            'item', 'x',
+            "Not an integer: 'x'",
+            id='type'
+        ),
+        param(
+            'levels', '1,2,86',
+            'Value 86 is not in the range criteria: 1:85',
+            id='array-range'
+        ),
+        param(
+            'levels(2)', '86',
+            'Value 86 is not in the range criteria: 1:85',
+            id='array-element'
+        ),
+        param(
+            'name', "'c'",
+            "Value 'c' not in allowed values [\"'a'\", \"'b'\"]",
+            id='values'
+        ),
+        param(
+            'package', 'x',
+            "Value x does not contain the pattern: ^'.*'$",
+            id='pattern'
+        ),
+    ]
+)
+def test_validate(setting, value, info):
+    """Test checking the value of each duplicate of a setting."""
+    loader = ConfigLoader()
+    config = loader.load(StringIO(''.join(
+        f'[namelist:req({i})]\n{setting}={value}\n' for i in range(1, 4)
+    )))
+    meta_config = loader.load(StringIO(META_CONFIG))
+    value_checker = ValueChecker()
+    reports = value_checker.validate(config, meta_config)
+    if info is None:
+        assert reports == []
+    else:
+        assert sorted(
+            (report.section, report.option, report.info)
+            for report in reports
+        ) == [
+            (f'namelist:req({i})', setting, info) for i in range(1, 4)
+        ]
+    # The duplicates share their value checking metadata.
+    assert len(value_checker.value_metadata_map) == 1
@@ -0,0 +1,121 @@
+# Copyright (C) British Crown (Met Office) & Contributors.
+#
+# This file is part of Rose, a framework for meteorological suites.
+#
+# Rose is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Rose is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Rose. If not, see <http://www.gnu.org/licenses/>.
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from threading import Thread, Timer
+from time import sleep, time
+
+import pytest
+
+from metomi.rose.app_run import Poller
+from metomi.rose.file_watch import get_file_watcher
+from metomi.rose.popen import RosePopener
+
+
+@pytest.fixture
+def poller():
+    return Poller(RosePopener(), lambda *args, **kwargs: None)
+
+
+@pytest.fixture
+def tmp_dir():
+    # (not tmp_path, test_checksum checksums the pytest base temp dir)
+    with TemporaryDirectory() as tmp_dir:
+        yield Path(tmp_dir)
+
+
+@pytest.mark.skipif(get_file_watcher() is None, reason='requires inotify')
+def test_poll_wakes_on_file(poller, tmp_dir):
+    """It should not wait for the full delay once the files arrive."""
+    sub_dir = tmp_dir / 'sub'
+    Timer(0.2, (tmp_dir / 'any').touch).start()
+    Timer(0.3, sub_dir.mkdir).start()
+    Timer(0.5, (sub_dir / 'all.nc').touch).start()
+    time0 = time()
+    assert poller._run_poll(
+        None,
+        [str(sub_dir / '*.nc')],
+        [str(tmp_dir / 'any')],
+        [0, 30],
+    ) == (None, [], [])
+    assert time() - time0 < 10
+
+
+@pytest.mark.skipif(get_file_watcher() is None, reason='requires inotify')
+def test_poll_rate_limited(poller, tmp_dir, monkeypatch):
+    """It should not re-poll on every change in a busy directory."""
+    monkeypatch.setattr(Poller, 'POLL_MIN_INTERVAL', 0.5)
+    polls = []
+    poll_files = poller._poll_files
+    monkeypatch.setattr(
+        poller,
+        '_poll_files',
+        lambda *args: polls.append(time()) or poll_files(*args),
+    )
+
+    def write_other_files():
+        for i in range(100):
+            (tmp_dir / f'other{i}').write_text('x')
+            sleep(0.02)
+
+    thread = Thread(target=write_other_files)
+    thread.start()
+    assert poller._run_poll(
+        None,
+        [],
+        [str(tmp_dir / 'any')],
+        [2],
+    ) == (None, [str(tmp_dir / 'any')], [])
+    thread.join()
+    # 1 poll per interval of the delay, plus the poll at the end of it
+    assert 2 <= len(polls) <= 6
+
+
+def test_poll_without_file_watcher(poller, tmp_dir, monkeypatch):
+    """It should sleep for each delay if inotify is not available."""
+    monkeypatch.setattr('metomi.rose.app_run.get_file_watcher', lambda: None)
+    (tmp_dir / 'any').touch()
+    assert poller._run_poll(
+        None,
+        [str(tmp_dir / 'all')],
+        [str(tmp_dir / 'any')],
+        [0, 0.1],
+    ) == (None, [], [str(tmp_dir / 'all')])
+
+
+def test_poll_file_tests_batched(poller, tmp_dir, monkeypatch, capfd):
+    """It should run the file tests for many files in a few shells."""
+    monkeypatch.setattr(Poller, 'FILE_TEST_BATCH_SIZE', 10)
+    files = [str(tmp_dir / f'file{i}') for i in range(35)]
+    for file_ in files[::2]:
+        Path(file_).write_text('hello\n')
+    runs = []
+    run = poller.popen.run
+    monkeypatch.setattr(
+        poller.popen,
+        'run',
+        lambda *args, **kwargs: runs.append(args) or run(*args, **kwargs),
+    )
+    assert poller._run_poll(
+        None,
+        list(files),
+        [],
+        [0],
+        poll_file_test='test -e {} && cat {}',
+    ) == (None, [], files[1::2])
+    assert len(runs) == 4
+    assert capfd.readouterr().out == 'hello\n' * len(files[::2])
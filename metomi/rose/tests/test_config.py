@@ -14,8 +14,12 @@
 # You should have received a copy of the GNU General Public License
 # along with Rose. If not, see <http://www.gnu.org/licenses/>.
 # -----------------------------------------------------------------------------
-from io import StringIO
+import copy
+from functools import cmp_to_key
+from io import BytesIO, StringIO
 import os.path
+import pickle
+import random
 
 import metomi.rose.config
 import pytest
@@ -261,3 +265,363 @@ boiled=false
         loader.load(source)
     assert exc.value.code == 'SECTIONS_NOT_ALLOWED'
     assert exc.value.line_num == 3
+
+
+def test_load_continuation():
+    """Test loading continuation lines of multi-line values."""
+    conf = metomi.rose.config.ConfigNode({})
+    source = StringIO(
+        """[foo]
+bar=a
+   =b
+    c
+
+  =d
+# comment
+[foo]
+baz=e
+"""
+    )
+    loader = metomi.rose.config.ConfigLoader()
+    loader.load(source, conf)
+    assert conf.get_value(["foo", "bar"]) == "a\nb\nc\nd"
+    assert conf.get(["foo"]).comments == [" comment"]
+    assert conf.get_value(["foo", "baz"]) == "e"
+
+
+def test_load_into_node():
+    """Test loading a configuration on top of an existing one."""
+    loader = metomi.rose.config.ConfigLoader()
+    conf = loader.load(StringIO("foo=1\n[bar]\n#old\nbaz=2\n[qux]\n"))
+    loader.load(
+        StringIO("#extra\n\n#new\n[!bar]\nbaz=3\n  4\n"),
+        conf,
+        default_comments=["opt"],
+    )
+    assert conf.comments == ["extra"]
+    assert conf.get_value(["foo"]) == "1"
+    assert conf.get(["bar"]).state == "!"
+    assert conf.get(["bar"]).comments == ["new"]
+    assert conf.get(["bar", "baz"]).value == "3\n4"
+    assert conf.get(["bar", "baz"]).comments == ["opt"]
+    assert conf.get(["qux"]).value == {}
+
+
+@pytest.mark.parametrize(
+    "text, code, line_num, col_num",
+    [
+        ("[foo]\n[bar[]\n", "BAD_CHAR", 2, 4),
+        ("[foo]\n[!namelist:x(1]\n", "BAD_CHAR", 2, 14),
+        ("a=1\n  b\n=c\n", "BAD_SYNTAX", 3, 0),
+        ("[foo]\n  a=1\n", "BAD_SYNTAX", 2, 0),
+    ],
+)
+def test_load_bad_syntax_position(text, code, line_num, col_num):
+    """Test the position of syntax errors, including in binary files."""
+    loader = metomi.rose.config.ConfigLoader()
+    for source in StringIO(text), BytesIO(text.encode()):
+        with pytest.raises(metomi.rose.config.ConfigSyntaxError) as exc:
+            loader.load(source)
+        assert exc.value.code == code
+        assert (exc.value.line_num, exc.value.col_num) == (line_num, col_num)
+        assert exc.value.line == text.splitlines(True)[line_num - 1]
+
+
+def test_load_decode_error():
+    """Test loading a file with a bad character on a line."""
+    loader = metomi.rose.config.ConfigLoader()
+    conf = metomi.rose.config.ConfigNode()
+    with pytest.raises(metomi.rose.config.ConfigDecodeError):
+        loader.load(BytesIO(b"a=1\nb=\xff\n"), conf)
+    # lines before the bad one are loaded
+    assert conf.get_value(["a"]) == "1"
+
+
+def test_load_cache(tmp_path, monkeypatch):
+    """Test loading files via the parse cache."""
+    monkeypatch.setattr(metomi.rose.config.ConfigLoader, "CACHE_MIN_AGE", 0)
+    cache_dir = tmp_path / "cache"
+    conf_path = tmp_path / "rose-app.conf"
+    conf_path.write_text("[foo]\nbar=1\n  2\n")
+    loader = metomi.rose.config.ConfigLoader(cache_dir=str(cache_dir))
+    conf = loader.load(str(conf_path))
+    assert len(list(cache_dir.iterdir())) == 1
+    # loaded from the cache, independent of earlier results
+    conf.set(["foo", "bar"], "changed")
+    conf_2 = loader.load(str(conf_path))
+    assert conf_2.get_value(["foo", "bar"]) == "1\n2"
+    assert conf_2 is not loader.load(str(conf_path))
+    # changed file, re-parsed
+    conf_path.write_text("[foo]\nbar=3\n")
+    assert loader.load(str(conf_path)).get_value(["foo", "bar"]) == "3"
+    assert len(list(cache_dir.iterdir())) == 1
+    # corrupt cache, re-parsed
+    for path in cache_dir.iterdir():
+        path.write_bytes(b"rubbish")
+    assert loader.load(str(conf_path)).get_value(["foo", "bar"]) == "3"
+    # loading into an existing node does not use the cache
+    conf_3 = loader.load(str(conf_path), conf)
+    assert conf_3 is conf
+    assert conf.get_value(["foo", "bar"]) == "3"
+
+
+def test_load_cache_untrusted(tmp_path, monkeypatch):
+    """Test cache files other users could have written are not loaded."""
+    monkeypatch.setattr(metomi.rose.config.ConfigLoader, "CACHE_MIN_AGE", 0)
+    cache_dir = tmp_path / "cache"
+    conf_path = tmp_path / "rose-app.conf"
+    conf_path.write_text("[foo]\nbar=1\n")
+    loader = metomi.rose.config.ConfigLoader(cache_dir=str(cache_dir))
+    loader.load(str(conf_path))
+    assert cache_dir.stat().st_mode & 0o777 == 0o700
+    (cache_file,) = cache_dir.iterdir()
+    with open(cache_file, "rb") as handle:
+        key, node = pickle.load(handle)
+    node.set(["foo", "bar"], "tampered")
+    for path, mode, value in [
+        (cache_file, 0o664, "1"),
+        (cache_file, 0o644, "tampered"),
+        (cache_dir, 0o777, "1"),
+        (cache_dir, 0o700, "tampered"),
+    ]:
+        # tamper with the cached node, as another user could
+        with open(cache_file, "wb") as handle:
+            pickle.dump((key, node), handle)
+        path.chmod(mode)
+        assert loader.load(str(conf_path)).get_value(["foo", "bar"]) == value
+    # a symbolic link to a cache file is not followed
+    with open(cache_file, "wb") as handle:
+        pickle.dump((key, node), handle)
+    cache_file.rename(tmp_path / "link-target")
+    cache_file.symlink_to(tmp_path / "link-target")
+    assert loader.load(str(conf_path)).get_value(["foo", "bar"]) == "1"
+
+
+def test_load_cache_dump_error(tmp_path, monkeypatch):
+    """Test a failure to write a cache file leaves nothing behind."""
+    monkeypatch.setattr(metomi.rose.config.ConfigLoader, "CACHE_MIN_AGE", 0)
+
+    def dump(*_args, **_kwargs):
+        raise pickle.PicklingError("cannot pickle")
+
+    monkeypatch.setattr(metomi.rose.config.pickle, "dump", dump)
+    cache_dir = tmp_path / "cache"
+    conf_path = tmp_path / "rose-app.conf"
+    conf_path.write_text("[foo]\nbar=1\n")
+    loader = metomi.rose.config.ConfigLoader(cache_dir=str(cache_dir))
+    assert loader.load(str(conf_path)).get_value(["foo", "bar"]) == "1"
+    assert not list(cache_dir.iterdir())
+
+
+def test_load_cache_env(tmp_path, monkeypatch):
+    """Test the parse cache is off by default and set by environment."""
+    monkeypatch.delenv("ROSE_CONF_CACHE_DIR", raising=False)
+    assert metomi.rose.config.ConfigLoader().cache_dir is None
+    monkeypatch.setenv("ROSE_CONF_CACHE_DIR", str(tmp_path))
+    assert metomi.rose.config.ConfigLoader().cache_dir == str(tmp_path)
+
+
+def test_deepcopy():
+    """Test deep copies of nodes are independent."""
+    conf = metomi.rose.config.ConfigNode()
+    conf.set(["foo", "bar"], "BAR", comments=["bar"])
+    conf.set(["baz"], ["not", "a", "string"])
+    conf_2 = copy.deepcopy(conf)
+    assert conf_2 == conf
+    assert conf_2.get(["baz"]).value == ["not", "a", "string"]
+    conf_2.get(["foo", "bar"]).comments.append("changed")
+    conf_2.get(["baz"]).value.append("changed")
+    conf_2.set(["foo", "qux"], "QUX")
+    assert conf.get(["foo", "bar"]).comments == ["bar"]
+    assert conf.get(["baz"]).value == ["not", "a", "string"]
+    assert conf.get(["foo", "qux"]) is None
+
+
+def test_deepcopy_memo():
+    """Test deep copies keep shared nodes shared and subclasses."""
+
+    class MyNode(metomi.rose.config.ConfigNode):
+        pass
+
+    conf = MyNode()
+    conf.set(["foo", "bar"], "BAR")
+    conf.my_attr = ["mine"]
+    shared = conf.get(["foo"])
+    conf_2 = copy.deepcopy([conf, shared])
+    assert type(conf_2[0]) is MyNode
+    assert conf_2[0].my_attr == ["mine"]
+    assert conf_2[0].my_attr is not conf.my_attr
+    assert conf_2[1] is conf_2[0].get(["foo"])
+    assert conf_2[1] is not shared
+
+
+@pytest.mark.parametrize(
+    "opt_text",
+    [
+        pytest.param("bar=2\n\n[baz]\nqux=2\n", id="first-line"),
+        pytest.param("#opt\nbar=2\n", id="comment-first"),
+        pytest.param("\nbar=2\n", id="blank-first"),
+        pytest.param("#opt\n\n#bar\nbar=2\n", id="new-comment"),
+        pytest.param("[baz]\nqux=2\nbar=2\n", id="section-first"),
+    ],
+)
+def test_load_with_opts_config_map_comments(tmp_path, opt_text):
+    """Test the combined node is the same with or without a config map."""
+    (tmp_path / "opt").mkdir()
+    (tmp_path / "rose-app.conf").write_text(
+        "opts=foo\n#bar\nbar=1\n\n#baz\n[baz]\n#qux\nqux=1\n"
+    )
+    (tmp_path / "opt" / "rose-app-foo.conf").write_text(opt_text)
+    loader = metomi.rose.config.ConfigLoader()
+    path = str(tmp_path / "rose-app.conf")
+    conf = loader.load_with_opts(path, return_config_map=True)[0]
+    conf_2 = loader.load_with_opts(path)
+    assert conf == conf_2
+    assert [
+        (keys, node.comments) for keys, node in conf.walk()
+    ] == [(keys, node.comments) for keys, node in conf_2.walk()]
+
+
+def test_load_with_opts_config_map(tmp_path):
+    """Test the config map is independent of the combined node."""
+    (tmp_path / "opt").mkdir()
+    (tmp_path / "rose-app.conf").write_text(
+        "opts=foo\n\n#foo\n[foo]\nbar=1\n"
+    )
+    (tmp_path / "opt" / "rose-app-foo.conf").write_text(
+        "[!foo]\nbar=2\n  3\n\n#baz\n[baz]\nqux=4\n"
+    )
+    loader = metomi.rose.config.ConfigLoader()
+    path = str(tmp_path / "rose-app.conf")
+    conf, config_map = loader.load_with_opts(path, return_config_map=True)
+    assert conf == loader.load_with_opts(path)
+    assert conf.get(["foo"]).comments == ["foo"]
+    assert conf.get(["foo"]).state == "!"
+    assert conf.get(["foo", "bar"]).value == "2\n3"
+    assert conf.get(["baz"]).comments == ["baz"]
+    assert config_map["foo"] == loader.load(
+        str(tmp_path / "opt" / "rose-app-foo.conf")
+    )
+    conf.set(["baz", "qux"], "changed")
+    assert config_map["foo"].get_value(["baz", "qux"]) == "4"
+    assert config_map[None].get_value(["foo", "bar"]) == "1"
+
+
+def test_setting_sort_key():
+    """Test the sort key orders settings as sort_settings does."""
+    settings = [
+        "env",
+        "file:x",
+        "namelist:a",
+        "namelist:a_b",
+        "namelist:ab",
+        "namelist:a{c}",
+    ]
+    settings += [
+        f"{setting}({element})"
+        for setting in settings
+        for element in ["0", "1", "2", "10", "x", ":", "1a"]
+    ]
+    for seed in range(10):
+        random.Random(seed).shuffle(settings)
+        assert sorted(
+            settings, key=metomi.rose.config.setting_sort_key
+        ) == sorted(
+            settings, key=cmp_to_key(metomi.rose.config.sort_settings)
+        )
+
+
+def test_dumps():
+    """Test dumping to a string, also with custom sorting."""
+    conf = metomi.rose.config.ConfigNode()
+    conf.set(["namelist:x(10)", "b"], "1\n2")
+    conf.set(["namelist:x(2)", "a"], "$HOME")
+    conf.set(["z"], "root", comments=["z"])
+    assert metomi.rose.config.dumps(conf, env_escape_ok=True) == (
+        "#z\nz=root\n\n"
+        "[namelist:x(2)]\na=\\$HOME\n\n"
+        "[namelist:x(10)]\nb=1\n =2\n"
+    )
+    target = StringIO()
+    metomi.rose.config.dump(
+        conf,
+        target,
+        sort_sections=lambda x, y: (x > y) - (x < y),
+    )
+    assert target.getvalue() == (
+        "#z\nz=root\n\n"
+        "[namelist:x(10)]\nb=1\n =2\n\n"
+        "[namelist:x(2)]\na=$HOME\n"
+    )
+
+
+def test_node_comments():
+    """Test the comments of nodes behave as lists, whether used or not."""
+    conf = metomi.rose.config.ConfigLoader().load(
+        StringIO("[foo]\nbar=1\n#baz\nbaz=2\n")
+    )
+    bar = conf.get(["foo", "bar"])
+    assert str(bar) == "{'value': '1', 'state': '', 'comments': []}"
+    assert bar.comments == []
+    bar.comments.append("bar")
+    assert conf.get(["foo", "bar"]).comments == ["bar"]
+    assert conf.get(["foo", "baz"]).comments == ["baz"]
+    for copied in (
+        copy.deepcopy(conf),
+        pickle.loads(pickle.dumps(conf)),
+        metomi.rose.config.ConfigLoader().load(
+            StringIO(metomi.rose.config.dumps(conf))
+        ),
+    ):
+        assert copied == conf
+        assert copied.get(["foo"]).comments == []
+        assert copied.get(["foo", "bar"]).comments == ["bar"]
+    node = metomi.rose.config.ConfigNode(comments=None)
+    node.comments += ["added"]
+    assert node.comments == ["added"]
+
+
+def test_diff_set_from_configs():
+    """Test diffs of settings in changed and unchanged sections."""
+    loader = metomi.rose.config.ConfigLoader()
+    conf_1 = loader.load(
+        StringIO("foo=1\nbar=2\n[baz]\na=1\nb=2\n[qux]\na=1\n[same]\na=1\n")
+    )
+    conf_2 = loader.load(
+        StringIO("\n#x\nfoo=1\n[bar]\n[baz]\na=1\n!b=3\nc=4\n[!same]\na=1\n")
+    )
+    diff = metomi.rose.config.ConfigNodeDiff()
+    diff.set_from_configs(conf_1, conf_2)
+    assert diff.get_added() == [
+        (("bar",), (None, "", [])),
+        (("baz", "c"), ("4", "", [])),
+    ]
+    assert diff.get_removed() == [
+        (("", "bar"), ("2", "", [])),
+        (("qux",), (None, "", [])),
+        (("qux", "a"), ("1", "", [])),
+    ]
+    assert diff.get_modified() == [
+        (("", "foo"), (("1", "", []), ("1", "", ["x"]))),
+        (("baz", "b"), (("2", "", []), ("3", "!", []))),
+        (("same",), ((None, "", []), (None, "!", []))),
+    ]
+
+
+@pytest.mark.parametrize("no_ignore", [False, True])
+def test_underlay(no_ignore):
+    """Test applying a node beneath another node, first wins."""
+    loader = metomi.rose.config.ConfigLoader()
+    conf = loader.load(StringIO("foo=1\n[bar]\na=1\n[!baz]\n#c\nb=1\n"))
+    base = loader.load(
+        StringIO("foo=2\nqux=2\n!quux=2\n[bar]\na=2\n!b=2\n[baz]\nb=2\nc=2")
+    )
+    conf.underlay(base, no_ignore=no_ignore)
+    expect = "foo=1\nqux=2\n\n[bar]\na=1\n\n[!baz]\n#c\nb=1\nc=2\n"
+    if not no_ignore:
+        expect = "foo=1\n!quux=2\nqux=2\n\n[bar]\na=1\n!b=2\n\n[!baz]\n"
+        expect += "#c\nb=1\nc=2\n"
+    assert metomi.rose.config.dumps(conf) == expect
+    # the added settings are copies
+    base.set(["qux"], "changed")
+    assert conf.get_value(["qux"]) == "2"
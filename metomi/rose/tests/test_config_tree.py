@@ -0,0 +1,184 @@
+# Copyright (C) British Crown (Met Office) & Contributors.
+# This file is part of Rose, a framework for meteorological suites.
+#
+# Rose is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Rose is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Rose. If not, see <http://www.gnu.org/licenses/>.
+# -----------------------------------------------------------------------------
+import copy
+import os
+from types import SimpleNamespace
+
+from metomi.rose.config import ConfigLoader
+import metomi.rose.config_tree
+from metomi.rose.config_tree import ConfigTree, ConfigTreeLoader
+import pytest
+
+
+@pytest.fixture
+def conf_dirs(tmp_path, monkeypatch):
+    """A diamond of imports: top imports left and right, which import base."""
+    monkeypatch.setattr(ConfigLoader, "CACHE_MIN_AGE", 0)
+    ConfigTreeLoader.clear_cache()
+    for name, text in (
+        ("top", "import=left right\n\n[a]\nx=top\n"),
+        ("left", "import=base\n\n[a]\nx=left\ny=left\n"),
+        ("right", "import=base\n\n[b]\nz=right\n"),
+        ("base", "[a]\nx=base\ny=base\n\n[c]\nw=base\n"),
+    ):
+        (tmp_path / name).mkdir()
+        (tmp_path / name / "rose-t.conf").write_text(text)
+        (tmp_path / name / f"{name}.txt").write_text(name)
+    (tmp_path / "base" / "left.txt").write_text("base")
+    yield tmp_path
+    ConfigTreeLoader.clear_cache()
+
+
+def test_load_imports(conf_dirs):
+    """Test loading a configuration with imports."""
+    conf_tree = ConfigTreeLoader().load(str(conf_dirs / "top"), "rose-t.conf")
+    assert conf_tree.conf_dirs == [
+        str(conf_dirs / name) for name in ("top", "left", "right", "base")
+    ]
+    assert conf_tree.node.get_value(["import"]) is None
+    assert conf_tree.node.get_value(["a", "x"]) == "top"
+    assert conf_tree.node.get_value(["a", "y"]) == "left"
+    assert conf_tree.node.get_value(["b", "z"]) == "right"
+    assert conf_tree.node.get_value(["c", "w"]) == "base"
+    assert conf_tree.files == {
+        f"{name}.txt": str(conf_dirs / name)
+        for name in ("top", "left", "right", "base")
+    }
+    assert conf_tree.file_locs["left.txt"] == [
+        str(conf_dirs / "left"),
+        str(conf_dirs / "base"),
+    ]
+    assert conf_tree.get_file_name_of("base.txt") == str(
+        conf_dirs / "base" / "base.txt"
+    )
+
+
+def test_load_missing_import(conf_dirs):
+    """Test loading a configuration with a missing import."""
+    (conf_dirs / "right" / "rose-t.conf").write_text("import=nowhere\n")
+    with pytest.raises(IOError):
+        ConfigTreeLoader().load(str(conf_dirs / "top"), "rose-t.conf")
+
+
+def test_load_cache(conf_dirs):
+    """Test that loaded directories are cached until they change."""
+    loader = ConfigTreeLoader()
+    conf_tree = loader.load(str(conf_dirs / "top"), "rose-t.conf")
+    # a modified copy is not used by the next load
+    conf_tree.node.set(["c", "w"], "modified")
+    conf_tree = loader.load(str(conf_dirs / "top"), "rose-t.conf")
+    assert conf_tree.node.get_value(["c", "w"]) == "base"
+    # the cache is shared between loaders
+    (conf_dirs / "base" / "rose-t.conf").write_text("[c]\nw=changed\n")
+    conf_tree = ConfigTreeLoader().load(str(conf_dirs / "top"), "rose-t.conf")
+    assert conf_tree.node.get_value(["c", "w"]) == "changed"
+    # adding an optional configuration invalidates the cache
+    (conf_dirs / "base" / "opt").mkdir()
+    (conf_dirs / "base" / "opt" / "rose-t-foo.conf").write_text(
+        "[c]\nw=foo\n"
+    )
+    conf_tree = loader.load(
+        str(conf_dirs / "top"), "rose-t.conf", opt_keys=["foo"]
+    )
+    assert conf_tree.node.get_value(["c", "w"]) == "foo"
+    conf_tree = loader.load(str(conf_dirs / "top"), "rose-t.conf")
+    assert conf_tree.node.get_value(["c", "w"]) == "changed"
+
+
+def test_load_cache_same_mtime(conf_dirs):
+    """Test that a change which keeps the size and mtime is noticed."""
+    loader = ConfigTreeLoader()
+    conf_tree = loader.load(str(conf_dirs / "top"), "rose-t.conf")
+    assert conf_tree.node.get_value(["c", "w"]) == "base"
+    # e.g. "cp -p" or "rsync -t" of a file of the same size
+    conf_file = conf_dirs / "base" / "rose-t.conf"
+    stat = os.stat(conf_file)
+    conf_file.write_text(conf_file.read_text().replace("w=base", "w=copy"))
+    os.utime(conf_file, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    conf_tree = loader.load(str(conf_dirs / "top"), "rose-t.conf")
+    assert conf_tree.node.get_value(["c", "w"]) == "copy"
+
+
+def test_load_cache_recent(conf_dirs, monkeypatch):
+    """Test that recently modified directories are not cached."""
+    monkeypatch.setattr(ConfigLoader, "CACHE_MIN_AGE", 3600)
+    ConfigTreeLoader().load(str(conf_dirs / "top"), "rose-t.conf")
+    assert not ConfigTreeLoader._dir_cache
+
+
+def test_load_cache_size(conf_dirs, monkeypatch):
+    """Test that only the most recently used directories are cached."""
+    monkeypatch.setattr(ConfigTreeLoader, "DIR_CACHE_SIZE", 2)
+    loader = ConfigTreeLoader()
+
+    def get_cached_dirs():
+        return [
+            os.path.basename(os.path.dirname(key[0]))
+            for key in ConfigTreeLoader._dir_cache
+        ]
+
+    loader.load(str(conf_dirs / "base"), "rose-t.conf")
+    assert get_cached_dirs() == ["base"]
+    # a hit makes a directory the most recently used
+    loader.load(str(conf_dirs / "left"), "rose-t.conf")
+    assert get_cached_dirs() == ["left", "base"]
+    loader.load(str(conf_dirs / "right"), "rose-t.conf")
+    assert get_cached_dirs() == ["right", "base"]
+
+
+def test_load_cache_copy(conf_dirs, monkeypatch):
+    """Test that only nodes shared with the cache are copied."""
+    calls = []
+    monkeypatch.setattr(
+        metomi.rose.config_tree,
+        "copy",
+        SimpleNamespace(
+            deepcopy=lambda node: calls.append(node) or copy.deepcopy(node)
+        ),
+    )
+    monkeypatch.setattr(ConfigLoader, "CACHE_MIN_AGE", 3600)
+    ConfigTreeLoader().load(str(conf_dirs / "base"), "rose-t.conf")
+    assert not calls
+    monkeypatch.setattr(ConfigLoader, "CACHE_MIN_AGE", 0)
+    conf_tree = ConfigTreeLoader().load(str(conf_dirs / "base"), "rose-t.conf")
+    assert len(calls) == 1
+    conf_tree.node.set(["c", "w"], "modified")
+    conf_tree = ConfigTreeLoader().load(str(conf_dirs / "base"), "rose-t.conf")
+    assert len(calls) == 2
+    assert conf_tree.node.get_value(["c", "w"]) == "base"
+
+
+def test_files_lazy(conf_dirs, monkeypatch):
+    """Test that files are only listed on demand."""
+    calls = []
+    walk = os.walk
+    monkeypatch.setattr(
+        os, "walk", lambda *args: calls.append(args) or walk(*args)
+    )
+    conf_tree = ConfigTreeLoader().load(str(conf_dirs / "top"), "rose-t.conf")
+    assert not calls
+    assert "top.txt" in conf_tree.files
+    assert len(calls) == 4
+    assert "top.txt" in conf_tree.file_locs
+    assert len(calls) == 4
+
+
+def test_empty_tree():
+    """Test the files of an empty configuration tree."""
+    conf_tree = ConfigTree()
+    assert conf_tree.files == {}
+    assert conf_tree.file_locs == {}
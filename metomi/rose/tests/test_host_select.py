@@ -0,0 +1,227 @@
+# Copyright (C) British Crown (Met Office) & Contributors.
+#
+# This file is part of Rose, a framework for meteorological suites.
+#
+# Rose is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Rose is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Rose. If not, see <http://www.gnu.org/licenses/>.
+import os
+import signal
+import sys
+from time import time
+
+import pytest
+
+import metomi.rose.host_select
+from metomi.rose.host_select import HostSelector, main
+from metomi.rose.popen import RosePopener
+
+
+def test_iter_results():
+    """It should yield results as they arrive and leave stragglers."""
+    popen = RosePopener()
+    host_proc_dict = {
+        'slow': (
+            popen.run_bg('sleep', '10', preexec_fn=os.setpgrp),
+            ['slow'],
+        ),
+        'fast': (
+            popen.run_bg('echo', '[1]', preexec_fn=os.setpgrp),
+            ['fast'],
+        ),
+        'bad': (
+            popen.run_bg(
+                'bash', '-c', 'echo oops >&2; exit 3', preexec_fn=os.setpgrp
+            ),
+            ['bad'],
+        ),
+    }
+    time0 = time()
+    results = {
+        host_name: (metrics, ret_code, stdout, stderr)
+        for host_name, metrics, ret_code, stdout, stderr in (
+            HostSelector._iter_results(host_proc_dict, 1.0)
+        )
+    }
+    assert time() - time0 < 5
+    assert results == {
+        'fast': (['fast'], 0, '[1]\n', ''),
+        'bad': (['bad'], 3, '', 'oops\n'),
+    }
+    # the slow host has timed out
+    assert list(host_proc_dict) == ['slow']
+    proc = host_proc_dict['slow'][0]
+    os.killpg(proc.pid, signal.SIGTERM)
+    proc.wait()
+
+
+def test_iter_results_no_exit():
+    """It should not wait past the timeout for a process to exit."""
+    popen = RosePopener()
+    proc = popen.run_bg(
+        'bash', '-c', 'echo "[1]"; exec >&- 2>&-; sleep 10',
+        preexec_fn=os.setpgrp,
+    )
+    host_proc_dict = {'stuck': (proc, ['stuck'])}
+    time0 = time()
+    assert list(HostSelector._iter_results(host_proc_dict, 1.0)) == []
+    assert time() - time0 < 5
+    # the host has timed out
+    assert list(host_proc_dict) == ['stuck']
+    HostSelector._kill(proc)
+    assert proc.returncode is not None
+    assert proc.stdout.closed and proc.stderr.closed
+
+
+def test_select_first_n():
+    """It should return once enough hosts have answered."""
+    popen = RosePopener()
+    # stand-in for "ssh HOST CMD" which reports a load depending on HOST
+    popen.cmds['ssh'] = [
+        'bash',
+        '-c',
+        (
+            'while read; do [[ $REPLY == *end* ]] && break; done;'
+            ' case "$0" in slow*) sleep 10;; esac;'
+            ' echo "[[${0: -1}, 0, 0], 1]"'
+        ),
+    ]
+    selector = HostSelector(popen=popen)
+    time0 = time()
+    host_score_list = selector.select(
+        names=['fast1', 'fast2', 'slow0'],
+        rank_method='load:1',
+        ssh_cmd_timeout=10.0,
+        first_n=2,
+    )
+    assert time() - time0 < 5
+    assert host_score_list == [('fast1', 1.0), ('fast2', 2.0)]
+
+
+def test_select_agent_mode():
+    """It should reuse one agent per host for repeated selections."""
+    popen = RosePopener()
+    # stand-in for "ssh HOST rose host-select-client --agent"
+    popen.cmds['ssh'] = [
+        'bash',
+        '-c',
+        (
+            'echo "profile junk"; n=0;'
+            ' while read; do'
+            ' [[ $REPLY == *end* ]] || continue; n=$((n + 1));'
+            ' echo "**result** $n [[${0: -1}, 0, 0], $n]"; done'
+        ),
+    ]
+    selector = HostSelector(popen=popen, agent_mode=True)
+    try:
+        for n_request in (1, 2):
+            host_score_list = selector.select(
+                names=['host1', 'host2'],
+                rank_method='load:1',
+                ssh_cmd_timeout=10.0,
+            )
+            assert host_score_list == [
+                ('host1', 1.0 / n_request),
+                ('host2', 2.0 / n_request),
+            ]
+            if n_request == 1:
+                procs = {
+                    host_name: agent.proc
+                    for host_name, agent in selector.agents.items()
+                }
+            assert {
+                host_name: agent.proc
+                for host_name, agent in selector.agents.items()
+            } == procs
+    finally:
+        selector.close()
+    assert not selector.agents
+    for proc in procs.values():
+        assert proc.returncode == 0
+
+
+def test_select_agent_mode_stderr():
+    """It should not block on an agent writing a lot to stderr."""
+    popen = RosePopener()
+    # more than a pipe buffer of stderr before each result
+    popen.cmds['ssh'] = [
+        'bash',
+        '-c',
+        (
+            'n=0;'
+            ' while read; do'
+            ' [[ $REPLY == *end* ]] || continue; n=$((n + 1));'
+            ' head -c 200000 /dev/zero | tr "\\0" x >&2;'
+            ' echo "**result** $n [[${0: -1}, 0, 0], $n]"; done'
+        ),
+    ]
+    selector = HostSelector(popen=popen, agent_mode=True)
+    try:
+        for _ in range(2):
+            host_score_list = selector.select(
+                names=['host1'],
+                rank_method='load:1',
+                ssh_cmd_timeout=10.0,
+            )
+            assert [host for host, _ in host_score_list] == ['host1']
+        assert len(selector.agents['host1'].read_stderr()) == 400000
+    finally:
+        selector.close()
+
+
+def test_main_interval(monkeypatch, capsys):
+    """It should select repeatedly with agents, stopping them at the end."""
+    calls = []
+
+    def select(self, **kwargs):
+        calls.append(('select', self.agent_mode))
+        return [('host1', 1.0)]
+
+    def sleep(interval):
+        calls.append(('sleep', interval))
+        if len(calls) > 3:
+            raise KeyboardInterrupt()
+
+    monkeypatch.setattr(HostSelector, '__call__', select)
+    monkeypatch.setattr(
+        HostSelector, 'close', lambda self: calls.append(('close', None))
+    )
+    monkeypatch.setattr(metomi.rose.host_select, 'sleep', sleep)
+    monkeypatch.setattr(
+        sys, 'argv', ['rose host-select', '--interval=0.5', 'host1']
+    )
+    with pytest.raises(KeyboardInterrupt):
+        main()
+    assert calls == [
+        ('select', True),
+        ('sleep', 0.5),
+        ('select', True),
+        ('sleep', 0.5),
+        ('close', None),
+    ]
+    assert capsys.readouterr().out == 'host1\nhost1\n'
+
+
+def test_main_timeout(monkeypatch):
+    """It should pass the --timeout option to the selector in seconds."""
+    kwargs_list = []
+
+    def select(self, **kwargs):
+        kwargs_list.append(kwargs)
+        return [('host1', 1.0)]
+
+    monkeypatch.setattr(HostSelector, '__call__', select)
+    monkeypatch.setattr(
+        sys, 'argv', ['rose host-select', '--timeout=1.5', 'host1']
+    )
+    main()
+    assert kwargs_list[0]['ssh_cmd_timeout'] == 1.5
@@ -90,3 +90,32 @@ def test_request(monkeypatch, capsys):
     result = results[0]
     for key in ('active', 'available', 'free'):
         assert key in result
+
+
+def test_agent(monkeypatch, capsys):
+    """It should answer each request in agent mode until stdin closes."""
+    monkeypatch.setattr('sys.argv', ['host-select-client', '--agent'])
+    monkeypatch.setattr(
+        'sys.stdin',
+        StringIO(
+            dedent(
+                '''
+        **start**
+        []
+        **end**
+        **start**
+        [["cpu_count"]]
+        **end**
+        '''
+            )
+        ),
+    )
+    host_select()
+    captured = capsys.readouterr()
+    assert captured.err == ''
+    lines = captured.out.splitlines()
+    assert lines[0] == '**result** 1 []'
+    marker, n_request, result = lines[1].split(None, 2)
+    assert (marker, n_request) == ('**result**', '2')
+    assert json.loads(result)[0] >= 1
+    assert len(lines) == 2
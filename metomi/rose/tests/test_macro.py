@@ -14,10 +14,25 @@
 # You should have received a copy of the GNU General Public License
 # along with Rose. If not, see <http://www.gnu.org/licenses/>.
 
+from io import StringIO
+import sys
+
 import pytest
 
-from metomi.rose.config import ConfigNode
-from metomi.rose.macro import pretty_format_config
+from metomi.rose.config import ConfigLoader, ConfigNode
+from metomi.rose.config_tree import ConfigTreeLoader
+import metomi.rose.macro
+from metomi.rose.macro import (
+    _METADATA_INDEXES,
+    MetaConfigCache,
+    _run_conf_macros_in_pool,
+    combine_opt_config_map,
+    dump_config_maps,
+    get_metadata_for_config_id,
+    load_meta_config_tree,
+    metadata_index,
+    pretty_format_config,
+)
 
 
 def test_pretty_format_config(capsys):
@@ -38,3 +53,186 @@ def test_pretty_format_config(capsys):
     # and output a message to stderr
     _out, err = capsys.readouterr()
     assert 'Foo does not match foo' in err
+
+
+def test_dump_config_maps(tmp_path, capsys):
+    """It should dump all the configs or none of them."""
+    good_config = ConfigNode()
+    good_config.set(['env', 'FOO'], 'foo')
+    bad_config = ConfigNode()
+    bad_config.set(['namelist:a', 'Foo'], 'bar')
+    for name in ['bar', 'foo']:
+        (tmp_path / name).mkdir()
+        (tmp_path / name / 'rose-app.conf').write_text('[env]\n')
+
+    with pytest.raises(SystemExit):
+        dump_config_maps([
+            (tmp_path / 'bar', {None: good_config, 'opt': good_config}),
+            (tmp_path / 'foo', {None: bad_config}),
+        ])
+    assert sorted(
+        str(path.relative_to(tmp_path)) for path in tmp_path.glob('**/*')
+    ) == ['bar', 'bar/rose-app.conf', 'foo', 'foo/rose-app.conf']
+    assert (tmp_path / 'bar' / 'rose-app.conf').read_text() == '[env]\n'
+
+    dump_config_maps([
+        (tmp_path / 'bar', {None: good_config, 'opt': good_config}),
+        (tmp_path / 'foo', {None: good_config}),
+    ])
+    for path in ['bar/rose-app.conf', 'bar/opt/rose-app-opt.conf',
+                 'foo/rose-app.conf']:
+        assert (tmp_path / path).read_text() == '[env]\nFOO=foo\n'
+
+
+def test_combine_opt_config_map():
+    """It should combine each optional config with a copy of the main one."""
+    main_config = ConfigNode()
+    main_config.set(['foo', 'bar'], 'main', comments=['main'])
+    main_config.set(['foo', 'baz'], 'main')
+    main_config.set(['qux'], 'main')
+    opt_config = ConfigNode()
+    opt_config.set(['foo'], {}, state=ConfigNode.STATE_USER_IGNORED)
+    opt_config.set(['foo', 'bar'], 'opt')
+    opt_config.set(['new', 'option'], 'opt')
+    config_map = {None: main_config, 'opt': opt_config}
+    combined_config_map = combine_opt_config_map(config_map)
+    assert combined_config_map[None] == main_config
+    combined_config = combined_config_map['opt']
+    assert combined_config.get(['foo']).state == '!'
+    assert combined_config.get(['foo', 'bar']).value == 'opt'
+    assert combined_config.get(['foo', 'bar']).comments == []
+    assert combined_config.get(['foo', 'baz']).value == 'main'
+    assert combined_config.get_value(['new', 'option']) == 'opt'
+    assert combined_config.get_value(['qux']) == 'main'
+    # the combined configs are independent of the originals
+    combined_config.set(['new', 'option'], 'changed')
+    combined_config.set(['qux'], 'changed')
+    combined_config_map[None].get(['foo', 'bar']).comments.append('changed')
+    assert opt_config.get_value(['new', 'option']) == 'opt'
+    assert main_config.get_value(['qux']) == 'main'
+    assert main_config.get(['foo', 'bar']).comments == ['main']
+
+
+@pytest.mark.parametrize("indexed", [False, True])
+def test_get_metadata_for_config_id(indexed):
+    """Test metadata lookups, with or without a metadata index."""
+    meta_config = ConfigLoader().load(
+        StringIO(
+            "[namelist:foo]\ntitle=Foo\nduplicate=true\n"
+            "[namelist:foo{bar}]\n!description=ignored\n"
+            "[namelist:foo=baz]\ntitle=Baz\nlength=:\n"
+            "[!namelist:qux]\ntitle=Qux\n"
+        )
+    )
+    expected = {
+        "namelist:foo": {"title": "Foo", "duplicate": "true"},
+        "namelist:foo(2)": {"duplicate": "true"},
+        "namelist:foo{bar}": {"title": "Foo {bar}", "duplicate": "true"},
+        "namelist:foo{bar}(1)": {},
+        "namelist:foo=baz": {"title": "Baz", "length": ":"},
+        "namelist:foo=baz(1)": {"title": "Baz (1)"},
+        "namelist:foo=baz(1:2)": {"title": "Baz (1:2)", "length": ":"},
+        "namelist:qux": {},
+    }
+    for _ in range(2):
+        with metadata_index(meta_config if indexed else None):
+            assert bool(_METADATA_INDEXES) == indexed
+            for setting_id, metadata in expected.items():
+                result = get_metadata_for_config_id(setting_id, meta_config)
+                assert result == dict(metadata, id=setting_id)
+                # results are independent of the index
+                result["title"] = "changed"
+    assert not _METADATA_INDEXES
+
+
+def test_load_meta_config_tree_cache(tmp_path, monkeypatch):
+    """Test that metadata trees are cached until they change."""
+    monkeypatch.setattr(ConfigLoader, "CACHE_MIN_AGE", 0)
+    ConfigTreeLoader.clear_cache()
+    MetaConfigCache.clear()
+    (tmp_path / 'app' / 'meta').mkdir(parents=True)
+    (tmp_path / 'app' / 'meta' / 'rose-meta.conf').write_text(
+        'import=foo\n\n[env=A]\ntitle=A\n'
+    )
+    (tmp_path / 'foo').mkdir()
+    (tmp_path / 'foo' / 'rose-meta.conf').write_text('[env=B]\ntitle=B\n')
+
+    def load():
+        return load_meta_config_tree(
+            ConfigNode(),
+            directory=str(tmp_path / 'app'),
+            opt_meta_paths=[str(tmp_path)],
+        )
+
+    meta_config_tree = load()
+    assert meta_config_tree.conf_dirs == [
+        str(tmp_path / 'app' / 'meta'), str(tmp_path / 'foo')
+    ]
+    assert meta_config_tree.node.get_value(['env=B', 'title']) == 'B'
+    assert len(MetaConfigCache._trees) == 1
+    # a modified copy is not used by the next load
+    meta_config_tree.node.set(['env=A', 'title'], 'modified')
+    meta_config_tree = load()
+    assert meta_config_tree.node.get_value(['env=A', 'title']) == 'A'
+    assert meta_config_tree.conf_dirs == [
+        str(tmp_path / 'app' / 'meta'), str(tmp_path / 'foo')
+    ]
+    # changing an imported metadata file invalidates the cache
+    (tmp_path / 'foo' / 'rose-meta.conf').write_text('[env=B]\ntitle=C\n')
+    assert load().node.get_value(['env=B', 'title']) == 'C'
+    MetaConfigCache.clear()
+    ConfigTreeLoader.clear_cache()
+
+
+@pytest.fixture
+def run_conf_macros(tmp_path, monkeypatch):
+    """Replace _run_conf_macros with a function recording each config run.
+
+    It writes to stdout and stderr in turn, and fails to load "bad".
+
+    """
+    monkeypatch.setattr(
+        metomi.rose.macro, '_load_shared_meta_configs', lambda confs: None
+    )
+
+    def _run_conf_macros(config_file_path, args, opts, verbosity, confs):
+        with open(tmp_path / 'runs', 'a') as handle:
+            handle.write(f'{config_file_path}\n')
+        for i in range(3):
+            print(f'{config_file_path} out {i}')
+            print(f'{config_file_path} err {i}', file=sys.stderr)
+        if config_file_path == 'bad':
+            return None
+        return True
+
+    monkeypatch.setattr(
+        metomi.rose.macro, '_run_conf_macros', _run_conf_macros
+    )
+    return tmp_path / 'runs'
+
+
+def test_run_conf_macros_in_pool_output(run_conf_macros, monkeypatch):
+    """Test that output is written in order, without a buffer."""
+    output = StringIO()
+    monkeypatch.setattr(sys, 'stdout', output)
+    monkeypatch.setattr(sys, 'stderr', output)
+    confs = ['a', 'b', 'c']
+    assert list(_run_conf_macros_in_pool(2, ([], None, 1, confs))) == [
+        True, True, True
+    ]
+    assert output.getvalue() == ''.join(
+        f'{conf} {name} {i}\n'
+        for conf in confs
+        for i in range(3)
+        for name in ('out', 'err')
+    )
+
+
+def test_run_conf_macros_in_pool_bad(run_conf_macros):
+    """Test that no configs are submitted after one fails to load."""
+    confs = ['a', 'bad', 'c', 'd', 'e']
+    assert list(_run_conf_macros_in_pool(2, ([], None, 1, confs))) == [
+        True, None
+    ]
+    runs = run_conf_macros.read_text().split()
+    assert {'a', 'bad'} <= set(runs) <= {'a', 'bad', 'c'}
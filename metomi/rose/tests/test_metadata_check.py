@@ -0,0 +1,105 @@
+# Copyright (C) British Crown (Met Office) & Contributors.
+# This file is part of Rose, a framework for meteorological suites.
+#
+# Rose is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Rose is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Rose. If not, see <http://www.gnu.org/licenses/>.
+# -----------------------------------------------------------------------------
+
+"""Tests for the rose metadata_check module."""
+
+import pytest
+
+from metomi.rose.config_tree import ConfigTreeLoader
+import metomi.rose.metadata_check
+from metomi.rose.metadata_check import metadata_check
+import metomi.rose.resource
+
+
+@pytest.fixture
+def meta_dir(tmp_path):
+    """A metadata directory with a macro, a widget and some problems."""
+    macros_dir = tmp_path / 'lib' / 'python' / 'macros'
+    macros_dir.mkdir(parents=True)
+    (macros_dir / 'check.py').write_text(
+        'class Checker:\n    def validate(self):\n        pass\n'
+    )
+    (macros_dir / 'broken.py').write_text('raise ValueError("broken")\n')
+    meta_text = ''
+    for i in range(20):
+        macros = 'check.Checker, check.Checker.validate'
+        if i % 3 == 0:
+            macros = 'broken.Checker, ' + macros
+        meta_text += (
+            f'[env=OPT{i}]\n'
+            f'macro={macros}\n'
+            'widget[rose-config-edit]=check.Checker\n'
+            f'fail-if=this > env=OPT{i + 1}\n'
+        )
+        if i % 4 == 0:
+            meta_text += 'type=bad\n'
+    (tmp_path / 'rose-meta.conf').write_text(meta_text)
+    return str(tmp_path)
+
+
+def get_meta_config(meta_dir):
+    return ConfigTreeLoader().load(meta_dir, 'rose-meta.conf').node
+
+
+def test_metadata_check_imports_once(meta_dir, monkeypatch):
+    """Test that each macro and widget is imported once."""
+    import_strings = []
+    import_object = metomi.rose.resource.import_object
+
+    def _import_object(import_string, *args):
+        import_strings.append(import_string)
+        return import_object(import_string, *args)
+
+    monkeypatch.setattr(
+        metomi.rose.resource, 'import_object', _import_object
+    )
+    reports = metadata_check(get_meta_config(meta_dir), meta_dir=meta_dir)
+    assert sorted(import_strings) == ['broken.Checker', 'check.Checker']
+    assert sorted(
+        (report.section, report.option, report.info) for report in reports
+    ) == sorted(
+        [
+            (
+                f'env=OPT{i}',
+                'macro',
+                'Could not import broken.Checker: ValueError: broken',
+            )
+            for i in range(0, 20, 3)
+        ]
+        + [
+            (f'env=OPT{i}', 'type', 'Unknown type: bad')
+            for i in range(0, 20, 4)
+        ]
+        + [('env=OPT19', 'fail-if', 'Not found: env=OPT20')]
+    )
+
+
+def test_metadata_check_jobs(meta_dir):
+    """Test that checking in a pool of processes gives the same reports."""
+    meta_config = get_meta_config(meta_dir)
+    reports = metadata_check(meta_config, meta_dir=meta_dir)
+    for jobs in [2, 3, 40]:
+        assert [
+            (report.section, report.option, report.value, report.info)
+            for report in metadata_check(
+                meta_config, meta_dir=meta_dir, jobs=jobs
+            )
+        ] == [
+            (report.section, report.option, report.value, report.info)
+            for report in reports
+        ]
+    assert metomi.rose.metadata_check._CHECK_ARGS is None
@@ -0,0 +1,99 @@
+# Copyright (C) British Crown (Met Office) & Contributors.
+#
+# This file is part of Rose, a framework for meteorological suites.
+#
+# Rose is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Rose is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Rose. If not, see <http://www.gnu.org/licenses/>.
+import json
+import os
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+import pytest
+
+from metomi.rose.task_env import PATH_GLOBS, cached_glob, get_prepend_paths
+
+
+@pytest.fixture
+def suite_dir():
+    # (not tmp_path, test_checksum checksums the pytest base temp dir)
+    with TemporaryDirectory() as tmp_dir:
+        yield Path(tmp_dir)
+
+
+def make_old(path):
+    """Set the modified time of path and the directories in it to the past."""
+    for dir_, _, _ in os.walk(path):
+        os.utime(dir_, (0, 0))
+
+
+def test_cached_glob(suite_dir):
+    """It should use cached results until a directory changes."""
+    (suite_dir / 'work/1/fcm_make/x/bin').mkdir(parents=True)
+    make_old(suite_dir)
+    path_glob = str(suite_dir / PATH_GLOBS['PATH'][1])
+    glob_cache = {}
+    paths = [str(suite_dir / 'work/1/fcm_make/x/bin')]
+    assert cached_glob(path_glob, glob_cache) == paths
+    assert path_glob in json.loads(json.dumps(glob_cache))
+
+    # served from the cache (a corrupted entry is returned as is)
+    glob_cache[path_glob]['paths'] = ['cached']
+    assert cached_glob(path_glob, glob_cache) == ['cached']
+
+    # a new cycle invalidates the cache
+    (suite_dir / 'work/2/fcm_make/x/bin').mkdir(parents=True)
+    paths.append(str(suite_dir / 'work/2/fcm_make/x/bin'))
+    assert cached_glob(path_glob, glob_cache) == paths
+    # ... recently modified, so not cached
+    assert path_glob not in glob_cache
+
+    # a new bin directory in an existing build invalidates the cache
+    make_old(suite_dir)
+    assert cached_glob(path_glob, glob_cache) == paths
+    assert path_glob in glob_cache
+    (suite_dir / 'work/1/fcm_make/y/bin').mkdir(parents=True)
+    paths.insert(1, str(suite_dir / 'work/1/fcm_make/y/bin'))
+    assert cached_glob(path_glob, glob_cache) == paths
+
+
+def test_cached_glob_missing_dir(suite_dir):
+    """It should notice the creation of missing directories."""
+    make_old(suite_dir)
+    path_glob = str(suite_dir / PATH_GLOBS['PATH'][0])
+    glob_cache = {}
+    assert cached_glob(path_glob, glob_cache) == []
+    assert glob_cache[path_glob]['dirs'] == {
+        str(suite_dir): os.stat(suite_dir).st_mtime_ns
+    }
+    (suite_dir / 'share/fcm-make/x/bin').mkdir(parents=True)
+    assert cached_glob(path_glob, glob_cache) == [
+        str(suite_dir / 'share/fcm-make/x/bin')
+    ]
+
+
+def test_get_prepend_paths_glob_cache(suite_dir):
+    """It should return the same paths with or without a glob cache."""
+    for path in ('share/fcm_make/a/bin', 'work/1/fcm-make2/b/bin'):
+        (suite_dir / path).mkdir(parents=True)
+    make_old(suite_dir)
+    glob_cache = {}
+    expected = get_prepend_paths(None, str(suite_dir), [], full_mode=True)
+    for _ in range(2):
+        assert get_prepend_paths(
+            None, str(suite_dir), [], full_mode=True, glob_cache=glob_cache
+        ) == expected
+    assert expected['PATH'][-2:] == [
+        str(suite_dir / 'work/1/fcm-make2/b/bin'),
+        str(suite_dir / 'share/fcm_make/a/bin'),
+    ]
@@ -0,0 +1,65 @@
+# Copyright (C) British Crown (Met Office) & Contributors.
+#
+# This file is part of Rose, a framework for meteorological suites.
+#
+# Rose is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Rose is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Rose. If not, see <http://www.gnu.org/licenses/>.
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from types import SimpleNamespace
+
+import pytest
+
+from metomi.rose.app_run import AppRunner
+from metomi.rose.task_run import TaskRunCache
+
+
+@pytest.fixture
+def suite_dir():
+    # (not tmp_path, test_checksum checksums the pytest base temp dir)
+    with TemporaryDirectory() as tmp_dir:
+        (Path(tmp_dir) / '.service').mkdir()
+        yield Path(tmp_dir)
+
+
+def test_task_run_cache(suite_dir):
+    """It should share builtin app schemes and globs between tasks."""
+    cache = TaskRunCache(str(suite_dir))
+    schemes = cache.get_builtin_app_schemes(AppRunner())
+    assert 'fcm_make' in schemes
+    assert 'rose_prune' in schemes
+    cache.glob_cache['foo'] = {'paths': [], 'dirs': {}}
+    cache.save()
+
+    cache = TaskRunCache(str(suite_dir))
+    # the builtin apps should not be loaded again
+    assert cache.get_builtin_app_schemes(None) == schemes
+    assert cache.glob_cache == {'foo': {'paths': [], 'dirs': {}}}
+
+    # a cache from another version should be ignored
+    cache.data['version'] = 'other'
+    cache.save()
+    cache = TaskRunCache(str(suite_dir))
+    assert cache.glob_cache == {}
+    assert cache.get_builtin_app_schemes(
+        SimpleNamespace(builtins_manager=SimpleNamespace(handlers={}))
+    ) == []
+
+
+def test_task_run_cache_no_service_dir():
+    """It should not write a cache outside of a suite run."""
+    with TemporaryDirectory() as tmp_dir:
+        cache = TaskRunCache(tmp_dir)
+        cache.glob_cache['foo'] = {'paths': [], 'dirs': {}}
+        cache.save()
+        assert not list(Path(tmp_dir).iterdir())
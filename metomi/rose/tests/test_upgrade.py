@@ -0,0 +1,291 @@
+# Copyright (C) British Crown (Met Office) & Contributors.
+# This file is part of Rose, a framework for meteorological suites.
+#
+# Rose is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Rose is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Rose. If not, see <http://www.gnu.org/licenses/>.
+# -----------------------------------------------------------------------------
+from io import StringIO
+import sys
+from types import ModuleType, SimpleNamespace
+
+import pytest
+
+from metomi.rose.config import ConfigLoader, ConfigNode
+import metomi.rose.macro
+from metomi.rose.macro import MacroReport
+import metomi.rose.upgrade
+from metomi.rose.upgrade import (
+    MacroUpgrade,
+    UpgradeMacroCycleError,
+    UpgradeMacroGraph,
+    UpgradeVersionError,
+    _get_macro_optionals,
+    _get_meta_category,
+    _iter_upgrade_changes,
+    get_upgrade_macro_graph,
+)
+
+
+param = pytest.param
+
+
+def get_version_module(*tag_pairs):
+    """Return a versions module with an upgrade macro per tag pair."""
+    version_module = ModuleType('versions')
+    for i, (before_tag, after_tag) in enumerate(tag_pairs):
+        macro_class = type(
+            f'Upgrade{i:02d}',
+            (MacroUpgrade,),
+            {
+                'BEFORE_TAG': before_tag,
+                'AFTER_TAG': after_tag,
+                'upgrade': lambda self, config, meta_config=None: None,
+                'downgrade': lambda self, config, meta_config=None: None,
+            },
+        )
+        setattr(version_module, macro_class.__name__, macro_class)
+    return version_module
+
+
+@pytest.mark.parametrize(
+    'tag_pairs, downgrade, tag, chain', [
+        param(
+            [('1.1', '1.2'), ('1.0', '1.1'), ('1.2', '1.3')],
+            False,
+            '1.0',
+            [('1.0', '1.1'), ('1.1', '1.2'), ('1.2', '1.3')],
+            id='upgrade'
+        ),
+        param(
+            [('1.1', '1.2'), ('1.0', '1.1'), ('1.2', '1.3')],
+            True,
+            '1.2',
+            [('1.1', '1.2'), ('1.0', '1.1')],
+            id='downgrade'
+        ),
+        param(
+            [('1.1', '1.2'), ('1.0', '1.1'), ('1.2', '1.3')],
+            False,
+            'HEAD',
+            [('1.2', '1.3')],
+            id='head'
+        ),
+        param(
+            [('1.0', '1.1'), ('2.0', '2.1')],
+            False,
+            '1.0',
+            [('1.0', '1.1')],
+            id='disconnected'
+        ),
+        param(
+            [('1.0', '1.1')],
+            False,
+            '0.9',
+            [],
+            id='unknown'
+        ),
+    ]
+)
+def test_get_chain(tag_pairs, downgrade, tag, chain):
+    """Test planning the macros to apply from a tag."""
+    macro_graph = UpgradeMacroGraph(get_version_module(*tag_pairs), downgrade)
+    assert [
+        (macro.BEFORE_TAG, macro.AFTER_TAG)
+        for macro in macro_graph.get_chain(tag)
+    ] == chain
+
+
+@pytest.mark.parametrize(
+    'downgrade, tag', [
+        param(False, '1.0', id='upgrade'),
+        param(True, '1.2', id='downgrade'),
+        param(False, 'HEAD', id='head'),
+    ]
+)
+def test_get_chain_cycle(downgrade, tag):
+    """Test that a cycle of macros is reported."""
+    macro_graph = UpgradeMacroGraph(
+        get_version_module(('1.0', '1.1'), ('1.1', '1.2'), ('1.2', '1.0')),
+        downgrade,
+    )
+    with pytest.raises(UpgradeMacroCycleError):
+        macro_graph.get_chain(tag)
+
+
+@pytest.mark.parametrize(
+    'tag_pairs, downgrade, from_tag, to_tag, path', [
+        param(
+            [('1.1', '1.2'), ('1.0', '1.1'), ('1.2', '1.3')],
+            False,
+            '1.1',
+            '1.3',
+            [('1.1', '1.2'), ('1.2', '1.3')],
+            id='upgrade'
+        ),
+        param(
+            [('1.1', '1.2'), ('1.0', '1.1'), ('1.2', '1.3')],
+            True,
+            '1.3',
+            '1.1',
+            [('1.2', '1.3'), ('1.1', '1.2')],
+            id='downgrade'
+        ),
+        param(
+            [('1.0', '1.1'), ('1.1', '1.2'), ('1.0', '1.2'), ('1.2', '1.0')],
+            False,
+            '1.0',
+            '1.2',
+            [('1.0', '1.2')],
+            id='shortest'
+        ),
+        param(
+            [('1.0', '1.1'), ('1.2', '1.3')],
+            False,
+            '1.0',
+            '1.3',
+            None,
+            id='disconnected'
+        ),
+        param(
+            [('1.0', '1.1'), ('1.1', '1.2')],
+            False,
+            '1.2',
+            '1.0',
+            None,
+            id='backwards'
+        ),
+        param(
+            [('1.0', '1.1')],
+            False,
+            '1.0',
+            '1.0',
+            None,
+            id='same'
+        ),
+    ]
+)
+def test_get_path(tag_pairs, downgrade, from_tag, to_tag, path):
+    """Test planning the macros to apply between two tags."""
+    macro_graph = UpgradeMacroGraph(get_version_module(*tag_pairs), downgrade)
+    if path is None:
+        with pytest.raises(UpgradeVersionError):
+            macro_graph.get_path(from_tag, to_tag)
+    else:
+        assert [
+            (macro.BEFORE_TAG, macro.AFTER_TAG)
+            for macro in macro_graph.get_path(from_tag, to_tag)
+        ] == path
+
+
+def test_get_upgrade_macro_graph(tmp_path, monkeypatch):
+    """Test the graph is loaded once per metadata directory version."""
+    monkeypatch.setattr(metomi.rose.upgrade, '_UPGRADE_MACRO_GRAPHS', {})
+    monkeypatch.setattr(ConfigLoader, 'CACHE_MIN_AGE', 0)
+
+    def write_versions(after_tag):
+        (tmp_path / 'versions.py').write_text(
+            'import metomi.rose.upgrade\n'
+            'class Upgrade01(metomi.rose.upgrade.MacroUpgrade):\n'
+            '    BEFORE_TAG = "1.0"\n'
+            f'    AFTER_TAG = "{after_tag}"\n'
+            '    def upgrade(self, config, meta_config=None):\n'
+            '        return config, self.reports\n'
+        )
+
+    write_versions('1.1')
+    try:
+        macro_graph = get_upgrade_macro_graph(str(tmp_path))
+        assert get_upgrade_macro_graph(str(tmp_path)) is macro_graph
+        assert get_upgrade_macro_graph(str(tmp_path), True) is not macro_graph
+        assert [
+            macro.AFTER_TAG for macro in macro_graph.get_chain('1.0')
+        ] == ['1.1']
+        # changing versions.py reloads it
+        write_versions('1.10')
+        macro_graph = get_upgrade_macro_graph(str(tmp_path))
+        assert [
+            macro.AFTER_TAG for macro in macro_graph.get_chain('1.0')
+        ] == ['1.10']
+        assert get_upgrade_macro_graph(str(tmp_path)) is macro_graph
+    finally:
+        sys.modules.pop('versions', None)
+
+
+def test_get_macro_optionals():
+    """Test finding the user-set arguments of a macro method."""
+
+    class UpgradeOptionals(MacroUpgrade):
+        def upgrade(self, config, meta_config=None, foo='1', bar=2):
+            return config, self.reports
+
+    optionals = _get_macro_optionals(UpgradeOptionals().upgrade)
+    assert optionals == {'foo': '1', 'bar': 2}
+    optionals['foo'] = '2'
+    assert _get_macro_optionals(UpgradeOptionals.upgrade) == {
+        'foo': '1', 'bar': 2
+    }
+
+
+@pytest.mark.parametrize(
+    'text, category', [
+        param('meta=foo/bar/1.0\n', 'foo/bar', id='version'),
+        param('!meta=foo/1.0\n', None, id='ignored'),
+        param('meta=foo\n', None, id='no_version'),
+        param('[env]\n', None, id='missing'),
+    ]
+)
+def test_get_meta_category(text, category):
+    """Test finding the category of an app's meta flag."""
+    assert _get_meta_category(ConfigLoader().load(StringIO(text))) == category
+
+
+@pytest.mark.parametrize(
+    'is_warning, n_changes', [
+        param(False, 2, id='changes'),
+        param(True, 1, id='warnings'),
+    ]
+)
+def test_iter_upgrade_changes(monkeypatch, is_warning, n_changes):
+    """Test that triggers are only fixed after upgrade changes."""
+    config = ConfigNode()
+    config.set(['env', 'A'], '1')
+    config.set(['env', 'B'], '2', state=ConfigNode.STATE_SYST_IGNORED)
+    meta_config = ConfigNode()
+    meta_config.set(['env=A', 'trigger'], 'env=B: 1')
+
+    def transform(config, meta_config, opt_non_interactive):
+        return config, [MacroReport('env', 'A', '1', 'info', is_warning)]
+
+    upgrade_manager = SimpleNamespace(
+        downgrade=False,
+        get_name=lambda: 'Upgrade_1.0-1.1',
+        transform=transform,
+    )
+    monkeypatch.setattr(
+        metomi.rose.macro,
+        'load_meta_config',
+        lambda *args, **kwargs: meta_config,
+    )
+    changes = list(
+        _iter_upgrade_changes(
+            upgrade_manager, {None: config}, meta_config, None, True
+        )
+    )
+    assert len(changes) == n_changes
+    assert changes[0][2][None].get(['env', 'B']).state == (
+        ConfigNode.STATE_SYST_IGNORED
+    )
+    if n_changes > 1:
+        assert changes[1][2][None].get(['env', 'B']).state == (
+            ConfigNode.STATE_NORMAL
+        )
@@ -0,0 +1,109 @@
+# Copyright (C) British Crown (Met Office) & Contributors.
+# This file is part of Rose, a framework for meteorological suites.
+#
+# Rose is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Rose is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Rose. If not, see <http://www.gnu.org/licenses/>.
+# -----------------------------------------------------------------------------
+import random
+import re
+
+import pytest
+
+from metomi.rose.variable import _scan_string, array_split
+
+
+def _reference_scan_string(value, delim=',', remove_esc_char=False):
+    """The original, character by character, _scan_string."""
+    item = ''
+    skip_inds = []
+    for quote_pair_match in re.finditer(r"""(''|"")$""", value):
+        skip_inds.extend([quote_pair_match.start(0), quote_pair_match.end(0)])
+    is_in_quotes = {'"': False, "'": False}
+    other_quote = {'"': "'", "'": '"'}
+    esc_char = "\\"
+    was_escaped = False
+    is_escaped = False
+    letter = None
+    for i, letter in enumerate(value):
+        if (
+            letter in is_in_quotes
+            and i not in skip_inds
+            and not is_in_quotes[other_quote[letter]]
+            and not is_escaped
+        ):
+            is_in_quotes[letter] = not is_in_quotes[letter]
+        was_escaped = is_escaped
+        is_escaped = letter == esc_char and not is_escaped
+        if remove_esc_char and was_escaped and letter in (delim + esc_char):
+            item = item[:-1] + letter
+        elif (
+            letter == delim
+            and not any(is_in_quotes.values())
+            and not was_escaped
+        ):
+            yield item
+            item = ''
+        elif item + letter == value:
+            item += letter
+            yield item
+            item = ''
+        else:
+            item += letter
+    if item or (
+        letter == delim and not any(is_in_quotes.values()) and not was_escaped
+    ):
+        yield item
+
+
+@pytest.mark.parametrize(
+    'value, expected',
+    [
+        ('', []),
+        ('1', ['1']),
+        ('1, 2,3', ['1', '2', '3']),
+        ('1 2  3', ['1', '2', '', '3']),
+        ('1,,2,', ['1', '', '2', '']),
+        ("'a,b', \"c,'d\"", ["'a,b'", "\"c,'d\""]),
+        (r"a\,b,c", [r"a\,b", 'c']),
+        ("'it''s', ''", ["'it''s'", "''"]),
+    ],
+)
+def test_array_split(value, expected):
+    """Test splitting values into array elements."""
+    assert array_split(value) == expected
+
+
+def test_array_split_remove_esc_char():
+    """Test splitting values with escaped delimiters."""
+    assert array_split(r"a\,b,c\\d,e", remove_esc_char=True) == [
+        'a,b',
+        'c\\d',
+        'e',
+    ]
+
+
+def test_scan_string_reference():
+    """Test splitting random values matches the original implementation."""
+    rng = random.Random(0)
+    letters = "ab ,;'\"\\\n"
+    for _ in range(20000):
+        value = ''.join(
+            rng.choice(letters) for _ in range(rng.randint(0, 12))
+        )
+        for delim in (',', ' ', ';'):
+            for remove_esc_char in (False, True):
+                assert list(
+                    _scan_string(value, delim, remove_esc_char)
+                ) == list(
+                    _reference_scan_string(value, delim, remove_esc_char)
+                ), (value, delim, remove_esc_char)
@@ -16,12 +16,17 @@
 # -----------------------------------------------------------------------------
 """Module that contains upgrade macro functionality."""
 
-from functools import cmp_to_key
+from concurrent.futures import ProcessPoolExecutor
+import glob
+import importlib
 import inspect
+import multiprocessing
 import os
 import sys
+from typing import Any, Callable, Dict, Tuple
 
 import metomi.rose.config
+import metomi.rose.config_tree
 import metomi.rose.macro
 import metomi.rose.macros.trigger
 import metomi.rose.reporter
@@ -29,6 +34,8 @@ import metomi.rose.reporter
 BEST_VERSION_MARKER = "* "
 CURRENT_VERSION_MARKER = "= "
 ERROR_NO_VALID_VERSIONS = "No versions available."
+ERROR_UPGRADE_CYCLE = "{0}: upgrade macros form a cycle."
+ERROR_UPGRADE_APPS = "{0} of {1} apps failed: no apps changed."
 ERROR_UPGRADE_VERSION = "{0}: invalid version."
 INFO_DOWNGRADED = "Downgraded from {0} to {1}"
 INFO_UPGRADED = "Upgraded from {0} to {1}"
@@ -68,6 +75,14 @@ class UpgradeVersionSame(NameError):
         return SAME_UPGRADE_VERSION.format(self.args[0])
 
 
+class UpgradeMacroCycleError(NameError):
+
+    """Raise this error when upgrade macros lead back to a version."""
+
+    def __str__(self):
+        return ERROR_UPGRADE_CYCLE.format(self.args[0])
+
+
 class MacroUpgrade(metomi.rose.macro.MacroBase):
 
     """Class derived from MacroBase to aid upgrade functionality."""
@@ -563,6 +578,7 @@ class MacroUpgradeManager:
         else:
             self.tag = "HEAD"
         self.meta_flag_no_tag = "/".join(tag_items)
+        self.macro_graph = None
         self.version_macros = None
         self.version_module = None
         self.reports = None
@@ -584,26 +600,12 @@ class MacroUpgradeManager:
             )
             if os.path.exists(node_meta):
                 self.named_tags.append(node)
-        self.version_module = get_meta_upgrade_module(meta_path)
-        if self.version_module is None:
-            # No versions.py.
-            self._load_version_macros([])
-            return
-        macro_info_tuples = metomi.rose.macro.get_macro_class_methods(
-            [self.version_module]
-        )
-        version_macros = []
-        if self.downgrade:
-            grade_method = DOWNGRADE_METHOD
-        else:
-            grade_method = UPGRADE_METHOD
-        for module_name, class_name, method, _ in macro_info_tuples:
-            if method == grade_method:
-                for module in [self.version_module]:
-                    if module.__name__ == module_name:
-                        macro_inst = getattr(module, class_name)()
-                        version_macros.append(macro_inst)
-        self._load_version_macros(version_macros)
+        macro_graph = get_upgrade_macro_graph(meta_path, self.downgrade)
+        self.macro_graph = macro_graph
+        self.version_module = macro_graph.version_module
+        self.version_macros = [
+            macro_class() for macro_class in macro_graph.get_chain(self.tag)
+        ]
 
     def get_tags(self, only_named=False):
         """Return relevant tags, reversed order for downgrades."""
@@ -634,18 +636,15 @@ class MacroUpgradeManager:
 
     def get_macros(self):
         """Return the list of upgrade macros to be applied."""
-        if self.downgrade:
-            prev_tags = [m.AFTER_TAG for m in self.version_macros]
-            next_tags = [m.BEFORE_TAG for m in self.version_macros]
-        else:
-            prev_tags = [m.BEFORE_TAG for m in self.version_macros]
-            next_tags = [m.AFTER_TAG for m in self.version_macros]
         try:
-            start_index = prev_tags.index(self.tag)
-            end_index = next_tags.index(self.new_tag)
-        except ValueError:
+            macro_classes = self.macro_graph.get_path(self.tag, self.new_tag)
+        except UpgradeVersionError:
             return []
-        return self.version_macros[start_index : end_index + 1]
+        version_macros = {type(m): m for m in self.version_macros}
+        return [
+            version_macros.get(macro_class) or macro_class()
+            for macro_class in macro_classes
+        ]
 
     def transform(
         self,
@@ -663,17 +662,7 @@ class MacroUpgradeManager:
                 func = macro.upgrade
             res = {}
             if not opt_non_interactive:
-                arglist = inspect.getfullargspec(func).args
-                defaultlist = inspect.getfullargspec(func).defaults
-                optionals = {}
-                while defaultlist is not None and len(defaultlist) > 0:
-                    if arglist[-1] not in ["self", "config", "meta_config"]:
-                        optionals[arglist[-1]] = defaultlist[-1]
-                        arglist = arglist[0:-1]
-                        defaultlist = defaultlist[0:-1]
-                    else:
-                        break
-
+                optionals = _get_macro_optionals(func)
                 if optionals:
                     if custom_inspector:
                         res = custom_inspector(optionals, "upgrade_macro")
@@ -705,61 +694,225 @@ class MacroUpgradeManager:
         # Check whether a macro instance supports a downgrade transform.
         return hasattr(macro_instance, DOWNGRADE_METHOD)
 
-    def _upgrade_sort(self, mac1, mac2):
-        return (mac1.BEFORE_TAG == mac2.AFTER_TAG) - (
-            mac2.BEFORE_TAG == mac1.AFTER_TAG
-        )
 
-    def _load_version_macros(self, macro_insts):
-        self.version_macros = []
-        for macro in macro_insts:
-            if self.downgrade and macro.AFTER_TAG == self.tag:
-                self.version_macros = [macro]
-                break
-            if not self.downgrade and macro.BEFORE_TAG == self.tag:
-                self.version_macros = [macro]
+class UpgradeMacroGraph:
+
+    """The upgrade (or downgrade) macros of a versions.py module.
+
+    Each macro is an edge from its BEFORE_TAG to its AFTER_TAG, or from
+    its AFTER_TAG to its BEFORE_TAG for downgrades. The chain of macros
+    to apply from a tag is found by following the edges, and the path
+    between two tags by a breadth first search of them. Both are
+    remembered for each tag.
+
+    """
+
+    def __init__(self, version_module, downgrade=False):
+        self.version_module = version_module
+        self.downgrade = downgrade
+        self.macro_classes = []
+        if version_module is not None:
+            if downgrade:
+                grade_method = DOWNGRADE_METHOD
+            else:
+                grade_method = UPGRADE_METHOD
+            for _, class_name, method, _ in (
+                metomi.rose.macro.get_macro_class_methods([version_module])
+            ):
+                if method == grade_method:
+                    self.macro_classes.append(
+                        getattr(version_module, class_name)
+                    )
+        self.macros_from = {}  # {tag: [macro_class, ...], ...}
+        for macro_class in self.macro_classes:
+            self.macros_from.setdefault(
+                self._get_from_tag(macro_class), []
+            ).append(macro_class)
+        self._chains = {}  # {tag: [macro_class, ...], ...}
+        self._paths = {}  # {(from_tag, to_tag): [macro_class, ...], ...}
+
+    def get_chain(self, tag):
+        """Return the macro classes to apply in turn from a tag.
+
+        From "HEAD", start with the macro to the latest version.
+
+        Raise UpgradeMacroCycleError if the macros lead back to a version
+        already in the chain.
+
+        """
+        try:
+            return self._chains[tag]
+        except KeyError:
+            pass
+        chain = []
+        if tag == "HEAD":
+            latest_macro = self._get_latest_macro()
+            if latest_macro is not None:
+                chain.append(latest_macro)
+        if not chain and self.macros_from.get(tag):
+            chain.append(self.macros_from[tag][0])
+        if chain:
+            chain += self._follow(chain[0], self.macros_from, self._get_to_tag)
+        self._chains[tag] = chain
+        return chain
+
+    def get_path(self, from_tag, to_tag):
+        """Return the fewest macro classes to apply from from_tag to to_tag.
+
+        Raise UpgradeVersionError if to_tag cannot be reached from from_tag,
+        for example because the macros between them are disconnected.
+
+        """
+        try:
+            return self._paths[(from_tag, to_tag)]
+        except KeyError:
+            pass
+        paths = {from_tag: []}  # {tag: [macro_class, ...], ...}
+        tags = [from_tag]
+        while to_tag not in paths and tags:
+            next_tags = []
+            for tag in tags:
+                for macro_class in self.macros_from.get(tag, []):
+                    next_tag = self._get_to_tag(macro_class)
+                    if next_tag not in paths:
+                        paths[next_tag] = paths[tag] + [macro_class]
+                        next_tags.append(next_tag)
+            tags = next_tags
+        if from_tag == to_tag or to_tag not in paths:
+            raise UpgradeVersionError(to_tag)
+        self._paths[(from_tag, to_tag)] = paths[to_tag]
+        return paths[to_tag]
+
+    def _get_from_tag(self, macro_class):
+        if self.downgrade:
+            return macro_class.AFTER_TAG
+        return macro_class.BEFORE_TAG
+
+    def _get_to_tag(self, macro_class):
+        if self.downgrade:
+            return macro_class.BEFORE_TAG
+        return macro_class.AFTER_TAG
+
+    def _get_latest_macro(self):
+        """Return the macro that upgrades to the latest version, if any.
+
+        Follow the upgrade edges from the first macro that no other macro
+        upgrades to, so macros disconnected from it are left out.
+
+        """
+        if not self.macro_classes:
+            return None
+        after_tags = {m.AFTER_TAG for m in self.macro_classes}
+        start_macro = self.macro_classes[0]
+        for macro_class in self.macro_classes:
+            if macro_class.BEFORE_TAG not in after_tags:
+                start_macro = macro_class
                 break
-        if self.tag == "HEAD":
-            # Try to figure out the latest upgrade version.
-            macro_insts.sort(key=cmp_to_key(self._upgrade_sort))
-            next_taglist = [m.AFTER_TAG for m in macro_insts]
-            temp_list = list(macro_insts)
-            for macro in list(temp_list[1:]):
-                if macro.BEFORE_TAG not in next_taglist:
-                    # Disconnected macro.
-                    temp_list.remove(macro)
-            if temp_list:
-                self.version_macros = [temp_list[-1]]
-        if not self.version_macros:
-            return
-        while macro_insts:
-            for macro in list(macro_insts):
-                if (
-                    self.downgrade
-                    and macro.AFTER_TAG == self.version_macros[-1].BEFORE_TAG
-                ):
-                    macro_insts.remove(macro)
-                    self.version_macros.append(macro)
-                    break
-                if (
-                    not self.downgrade
-                    and macro.BEFORE_TAG == self.version_macros[-1].AFTER_TAG
-                ):
-                    macro_insts.remove(macro)
-                    self.version_macros.append(macro)
+        macros_before = {}  # {BEFORE_TAG: [macro_class, ...], ...}
+        for macro_class in self.macro_classes:
+            macros_before.setdefault(macro_class.BEFORE_TAG, []).append(
+                macro_class
+            )
+        chain = self._follow(
+            start_macro, macros_before, lambda m: m.AFTER_TAG
+        )
+        if chain:
+            return chain[-1]
+        return start_macro
+
+    @staticmethod
+    def _follow(start_macro, macros_from, get_to_tag):
+        """Return the macros after start_macro, following the edges.
+
+        Stop if there is no macro from the current tag. Raise
+        UpgradeMacroCycleError if every macro from the current tag has
+        already been visited.
+
+        """
+        chain = []
+        visited = {start_macro}
+        macro_class = start_macro
+        while True:
+            tag = get_to_tag(macro_class)
+            next_macros = macros_from.get(tag, [])
+            for next_macro in next_macros:
+                if next_macro not in visited:
                     break
             else:
-                # No more macros found.
-                break
+                if next_macros:
+                    raise UpgradeMacroCycleError(tag)
+                return chain
+            visited.add(next_macro)
+            chain.append(next_macro)
+            macro_class = next_macro
+
+
+# {(meta_path, downgrade): (stats, UpgradeMacroGraph), ...}
+_UPGRADE_MACRO_GRAPHS: Dict[
+    Tuple[str, bool], Tuple[Any, UpgradeMacroGraph]
+] = {}
+
+# {function: {argument: default, ...}, ...}
+_MACRO_OPTIONALS: Dict[Callable, Dict[str, Any]] = {}
+
+
+def get_upgrade_macro_graph(meta_path, downgrade=False):
+    """Return the UpgradeMacroGraph of the versions.py in meta_path.
+
+    The graph is loaded once per metadata directory in a process, so
+    upgrading many apps against the same metadata plans the chain once.
+    It is reloaded, along with versions.py, if versions.py changes.
+
+    """
+    meta_path = os.path.abspath(meta_path)
+    key = (meta_path, downgrade)
+    stats = metomi.rose.config_tree.ConfigTreeLoader.get_dir_stats(
+        os.path.join(meta_path, MACRO_UPGRADE_MODULE_PATH)
+    )
+    item = _UPGRADE_MACRO_GRAPHS.pop(key, None)
+    if stats is not None and item is not None and item[0] == stats:
+        macro_graph = item[1]
+    else:
+        version_module = get_meta_upgrade_module(
+            meta_path, reload=item is not None
+        )
+        macro_graph = UpgradeMacroGraph(version_module, downgrade)
+    if stats is not None:
+        _UPGRADE_MACRO_GRAPHS[key] = (stats, macro_graph)
+    return macro_graph
 
 
-def get_meta_upgrade_module(meta_path):
+def _get_macro_optionals(func):
+    """Return a dict of the optional arguments of a macro method."""
+    func = getattr(func, '__func__', func)
+    try:
+        return dict(_MACRO_OPTIONALS[func])
+    except KeyError:
+        pass
+    argspec = inspect.getfullargspec(func)
+    arglist = argspec.args
+    defaultlist = argspec.defaults
+    optionals = {}
+    while defaultlist is not None and len(defaultlist) > 0:
+        if arglist[-1] not in ["self", "config", "meta_config"]:
+            optionals[arglist[-1]] = defaultlist[-1]
+            arglist = arglist[0:-1]
+            defaultlist = defaultlist[0:-1]
+        else:
+            break
+    _MACRO_OPTIONALS[func] = optionals
+    return dict(optionals)
+
+
+def get_meta_upgrade_module(meta_path, reload=False):
     """Import and return the versions.py module for a given meta_path.
 
     The meta_path should not contain a version, just the category.
     For example, it should be '/some/path/to/rose-meta/my-command'
     rather than '/some/path/to/my-command/vn9.1'.
 
+    If reload is True, re-import a module that has already been imported.
+
     Let ImportErrors bubble up so they can be reported.
 
     """
@@ -771,16 +924,261 @@ def get_meta_upgrade_module(meta_path):
     if os.path.exists(os.path.join(meta_path, "__init__.py")):
         # The category directory is a package.
         sys.path.insert(0, os.path.dirname(meta_path))
-        category_package = __import__(category)
-        version_module = getattr(category_package, MACRO_UPGRADE_MODULE, None)
-        sys.path.pop(0)
+        try:
+            category_package = __import__(category)
+            version_module = getattr(
+                category_package, MACRO_UPGRADE_MODULE, None
+            )
+            if reload and version_module is not None:
+                version_module = importlib.reload(version_module)
+        finally:
+            sys.path.pop(0)
     else:
         sys.path.insert(0, meta_path)
-        version_module = __import__(MACRO_UPGRADE_MODULE)
-        sys.path.pop(0)
+        try:
+            version_module = __import__(MACRO_UPGRADE_MODULE)
+            if reload:
+                version_module = importlib.reload(version_module)
+        finally:
+            sys.path.pop(0)
     return version_module
 
 
+def get_category_app_conf_dirs(conf_dir):
+    """Return the app directories in a suite of the same category.
+
+    Return conf_dir and the app directories beside it whose metadata
+    is of the same category, in name order.
+
+    """
+    category = _get_meta_category(
+        metomi.rose.config.load(
+            os.path.join(conf_dir, metomi.rose.SUB_CONFIG_NAME)
+        )
+    )
+    conf_dirs = []
+    for config_file_path in sorted(
+        glob.glob(
+            os.path.join(
+                os.path.dirname(conf_dir), '*', metomi.rose.SUB_CONFIG_NAME
+            )
+        )
+    ):
+        app_conf_dir = os.path.dirname(config_file_path)
+        if app_conf_dir != conf_dir:
+            try:
+                config = metomi.rose.config.load(config_file_path)
+            except metomi.rose.config.ConfigSyntaxError:
+                continue
+            if _get_meta_category(config) != category:
+                continue
+        conf_dirs.append(app_conf_dir)
+    return conf_dirs
+
+
+def _get_meta_category(app_config):
+    """Return the category of an app's meta flag, or None.
+
+    Return None if the meta flag is missing, ignored, or has no version.
+
+    """
+    meta_opt_node = app_config.get(
+        [metomi.rose.CONFIG_SECT_TOP, metomi.rose.CONFIG_OPT_META_TYPE],
+        no_ignore=True,
+    )
+    if meta_opt_node is None or "/" not in meta_opt_node.value:
+        return None
+    return meta_opt_node.value.rsplit("/", 1)[0]
+
+
+def upgrade_apps(conf_dir, version, opts, reporter):
+    """Change the version of every app of the same category as conf_dir.
+
+    Upgrade (or downgrade) the apps in a pool of up to opts.jobs
+    processes, report the changes to each, then write all the apps, or
+    none of them if any app fails. Optional macro arguments take their
+    default values.
+
+    Return False if any app failed.
+
+    """
+    conf_dirs = get_category_app_conf_dirs(conf_dir)
+    conf_dir_config_maps = []
+    n_failed = 0
+    for app_conf_dir, result, exc in _upgrade_apps(
+        conf_dirs, version, opts.downgrade, opts.jobs
+    ):
+        reporter(
+            os.path.join(
+                metomi.rose.SUB_CONFIGS_DIR,
+                os.path.basename(app_conf_dir),
+                metomi.rose.SUB_CONFIG_NAME,
+            )
+        )
+        if exc is not None:
+            reporter(exc)
+            n_failed += 1
+            continue
+        new_config_map, texts = result
+        if new_config_map is None and not texts:
+            reporter(SAME_UPGRADE_VERSION.format(version))
+            continue
+        for text in texts:
+            reporter(text, level=reporter.V, prefix="")
+        if new_config_map is not None:
+            conf_dir_config_maps.append((app_conf_dir, new_config_map))
+    sys.stdout.flush()
+    if n_failed:
+        reporter(
+            ERROR_UPGRADE_APPS.format(n_failed, len(conf_dirs)),
+            kind=metomi.rose.reporter.Reporter.KIND_ERR,
+            level=metomi.rose.reporter.Reporter.FAIL,
+        )
+        return False
+    if conf_dir_config_maps:
+        metomi.rose.macro.handle_transforms(
+            conf_dir_config_maps, opts.non_interactive, reporter
+        )
+    return True
+
+
+def _upgrade_apps(conf_dirs, version, downgrade, jobs):
+    """Yield (conf_dir, result, exception) for each app in turn.
+
+    Run _upgrade_app for each app, in a pool of jobs processes if more
+    than one. Processes are forked where possible, so they inherit the
+    metadata and upgrade macros already loaded.
+
+    """
+    if jobs <= 1 or len(conf_dirs) <= 1:
+        for conf_dir in conf_dirs:
+            try:
+                result = _upgrade_app(conf_dir, version, downgrade)
+            except Exception as exc:
+                yield conf_dir, None, exc
+            else:
+                yield conf_dir, result, None
+        return
+    mp_context = None
+    if 'fork' in multiprocessing.get_all_start_methods():
+        mp_context = multiprocessing.get_context('fork')
+    executor = ProcessPoolExecutor(jobs, mp_context=mp_context)
+    try:
+        futures = [
+            executor.submit(_upgrade_app, conf_dir, version, downgrade)
+            for conf_dir in conf_dirs
+        ]
+        for conf_dir, future in zip(conf_dirs, futures):
+            try:
+                result = future.result()
+            except Exception as exc:
+                yield conf_dir, None, exc
+            else:
+                yield conf_dir, result, None
+    finally:
+        executor.shutdown(cancel_futures=True)
+
+
+def _upgrade_app(conf_dir, version, downgrade):
+    """Change the version of the app in conf_dir, without writing it.
+
+    Return the new config map, or None if there is nothing to write, and
+    the texts of the changes. Return None and an empty list if the app is
+    already at version.
+
+    """
+    os.chdir(conf_dir)
+    app_config, config_map, meta_config = (
+        metomi.rose.macro.load_conf_from_file(
+            conf_dir,
+            os.path.join(conf_dir, metomi.rose.SUB_CONFIG_NAME),
+            mode="upgrade",
+        )
+    )
+    if _get_meta_category(app_config) is None:
+        raise metomi.rose.macro.MetaConfigFlagMissingError()
+    upgrade_manager = MacroUpgradeManager(app_config, downgrade)
+    if version == upgrade_manager.tag:
+        return None, []
+    if version not in upgrade_manager.get_tags():
+        raise UpgradeVersionError(version)
+    upgrade_manager.set_new_tag(version)
+    new_config_map = None
+    texts = []
+    for macro_id, _, changed_config_map, changes_map in _iter_upgrade_changes(
+        upgrade_manager, config_map, meta_config, conf_dir, True
+    ):
+        texts.append(
+            metomi.rose.macro.get_reports_as_text(
+                changes_map, macro_id, is_from_transform=True
+            )
+        )
+        if _has_changes(changes_map):
+            new_config_map = changed_config_map
+    return new_config_map, texts
+
+
+def _iter_upgrade_changes(
+    upgrade_manager, config_map, meta_config, conf_dir, opt_non_interactive
+):
+    """Yield the changes to an app's config map of an upgrade.
+
+    Yield (macro_id, config_map, new_config_map, changes_map) for the
+    upgrade macros of upgrade_manager. If they change anything other than
+    warnings, yield the same for fixing the triggers of the upgraded config
+    map, if that changes anything. The trigger fixing is worked out only
+    when the next item is requested, so a caller can stop after the
+    upgrade if it is not accepted.
+
+    """
+    method_id = UPGRADE_METHOD.upper()[0]
+    if upgrade_manager.downgrade:
+        method_id = DOWNGRADE_METHOD.upper()[0]
+    macro_id = metomi.rose.macro.MACRO_OUTPUT_ID.format(
+        method_id, upgrade_manager.get_name()
+    )
+    new_config_map, changes_map = metomi.rose.macro.apply_macro_to_config_map(
+        metomi.rose.macro.combine_opt_config_map(config_map),
+        meta_config,
+        lambda conf, meta, conf_key: upgrade_manager.transform(
+            conf, meta, opt_non_interactive
+        ),
+        macro_name=macro_id,
+    )
+    yield macro_id, config_map, new_config_map, changes_map
+    if not _has_changes(changes_map):
+        return
+    new_meta_config = metomi.rose.macro.load_meta_config(
+        new_config_map[None],
+        directory=conf_dir,
+        config_type=metomi.rose.SUB_CONFIG_NAME,
+        ignore_meta_error=True,
+    )
+    config_map = new_config_map
+    new_config_map, changes_map = metomi.rose.macro.apply_macro_to_config_map(
+        metomi.rose.macro.combine_opt_config_map(config_map),
+        new_meta_config,
+        lambda conf, meta, conf_key:
+        metomi.rose.macros.trigger.TriggerMacro().transform(conf, meta),
+        macro_name=macro_id,
+    )
+    if any(changes_map.values()):
+        trig_macro_id = metomi.rose.macro.MACRO_OUTPUT_ID.format(
+            metomi.rose.macro.TRANSFORM_METHOD.upper()[0],
+            MACRO_UPGRADE_TRIGGER_NAME,
+        )
+        yield trig_macro_id, config_map, new_config_map, changes_map
+
+
+def _has_changes(changes_map):
+    """Return True if changes_map has any reports that are not warnings."""
+    return any(
+        not report.is_warning
+        for reports in changes_map.values()
+        for report in reports
+    )
+
+
 def parse_upgrade_args():
     """Parse options/arguments for rose macro and upgrade."""
     opt_parser = metomi.rose.macro.RoseOptionParser(
@@ -796,6 +1194,10 @@ Alternatively, show the available upgrade/downgrade versions:
 If an application contains optional configurations, loop through
 each one, combine with the main, upgrade it, and re-create it as
 a diff vs the upgraded main configuration.
+
+With `--all-apps`, change every application in the suite whose
+metadata is of the same category, up to `--jobs` at a time. If any
+application fails to change, none are written.
         ''',
         epilog='''
 ARGUMENTS
@@ -817,12 +1219,21 @@ ENVIRONMENT VARIABLES
         "output_dir",
         "downgrade",
         "all_versions",
+        "all_apps",
+        "jobs",
     ]
     opt_parser.add_my_options(*options)
     opts, args = opt_parser.parse_args()
     if len(args) > 1:
         sys.stderr.write(opt_parser.get_usage())
         return None
+    if opts.all_apps and opts.output_dir is not None:
+        metomi.rose.reporter.Reporter()(
+            metomi.rose.macro.ERROR_OUT_DIR_MULTIPLE_APPS,
+            kind=metomi.rose.reporter.Reporter.KIND_ERR,
+            level=metomi.rose.reporter.Reporter.FAIL,
+        )
+        return None
     if opts.conf_dir is None:
         opts.conf_dir = os.getcwd()
     opts.conf_dir = os.path.abspath(opts.conf_dir)
@@ -861,16 +1272,12 @@ def main():
         os.chdir(opts.conf_dir)
     verbosity = 1 + opts.verbosity - opts.quietness
     reporter = metomi.rose.reporter.Reporter(verbosity)
-    meta_opt_node = app_config.get(
-        [metomi.rose.CONFIG_SECT_TOP, metomi.rose.CONFIG_OPT_META_TYPE],
-        no_ignore=True,
-    )
-    if meta_opt_node is None or len(meta_opt_node.value.split("/")) < 2:
+    if _get_meta_category(app_config) is None:
         reporter(metomi.rose.macro.MetaConfigFlagMissingError())
         sys.exit(1)
     try:
         upgrade_manager = MacroUpgradeManager(app_config, opts.downgrade)
-    except OSError as exc:
+    except (OSError, UpgradeMacroCycleError) as exc:
         reporter(exc)
         sys.exit(1)
     need_all_versions = opts.all_versions or args
@@ -892,6 +1299,11 @@ def main():
             all_versions.insert(0, curr_mark + upgrade_manager.tag)
         reporter("\n".join(all_versions) + "\n", prefix="")
         sys.exit()
+    if opts.all_apps:
+        sys.exit(
+            0 if upgrade_apps(opts.conf_dir, user_choice, opts, reporter)
+            else 1
+        )
     if user_choice == upgrade_manager.tag:
         reporter(UpgradeVersionSame(user_choice))
         sys.exit(1)
@@ -899,62 +1311,24 @@ def main():
         reporter(UpgradeVersionError(user_choice))
         sys.exit(1)
     upgrade_manager.set_new_tag(user_choice)
-    combined_config_map = metomi.rose.macro.combine_opt_config_map(config_map)
-    macro_function = lambda conf, meta, conf_key: upgrade_manager.transform(
-        conf, meta, opts.non_interactive
-    )
-    method_id = UPGRADE_METHOD.upper()[0]
-    if opts.downgrade:
-        method_id = DOWNGRADE_METHOD.upper()[0]
-    macro_id = metomi.rose.macro.MACRO_OUTPUT_ID.format(
-        method_id, upgrade_manager.get_name()
-    )
-    new_config_map, changes_map = metomi.rose.macro.apply_macro_to_config_map(
-        combined_config_map, meta_config, macro_function, macro_name=macro_id
-    )
-    sys.stdout.flush()  # Ensure text from macro output before next fn
-    has_changes = metomi.rose.macro.handle_transform(
-        config_map,
-        new_config_map,
-        changes_map,
-        macro_id,
-        opts.conf_dir,
-        opts.output_dir,
-        opts.non_interactive,
-        reporter,
-    )
-    if not has_changes:
-        return
-    new_meta_config = metomi.rose.macro.load_meta_config(
-        new_config_map[None],
-        directory=opts.conf_dir,
-        config_type=metomi.rose.SUB_CONFIG_NAME,
-        ignore_meta_error=True,
-    )
-    config_map = new_config_map
-    combined_config_map = metomi.rose.macro.combine_opt_config_map(config_map)
-    macro_function = (
-        lambda conf, meta, conf_key:
-        metomi.rose.macros.trigger.TriggerMacro().transform(conf, meta)
-    )
-    new_config_map, changes_map = metomi.rose.macro.apply_macro_to_config_map(
-        combined_config_map,
-        new_meta_config,
-        macro_function,
-        macro_name=macro_id,
-    )
-    trig_macro_id = metomi.rose.macro.MACRO_OUTPUT_ID.format(
-        metomi.rose.macro.TRANSFORM_METHOD.upper()[0],
-        MACRO_UPGRADE_TRIGGER_NAME,
-    )
-    if any(changes_map.values()):
-        metomi.rose.macro.handle_transform(
+    for macro_id, config_map, new_config_map, changes_map in (
+        _iter_upgrade_changes(
+            upgrade_manager,
+            config_map,
+            meta_config,
+            opts.conf_dir,
+            opts.non_interactive,
+        )
+    ):
+        sys.stdout.flush()  # Ensure text from macro output before next fn
+        if not metomi.rose.macro.handle_transform(
             config_map,
             new_config_map,
             changes_map,
-            trig_macro_id,
+            macro_id,
             opts.conf_dir,
             opts.output_dir,
             opts.non_interactive,
             reporter,
-        )
+        ):
+            break
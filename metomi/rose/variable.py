@@ -25,6 +25,7 @@ This module contains:
 
 import copy
 import re
+from typing import Dict, Pattern
 
 import metomi.rose
 
@@ -37,6 +38,9 @@ REC_RANGE_RANGE = re.compile(
     r"(" + RE_REAL + r"?)" + r"\s*:\s*" + r"(" + RE_REAL + r"?)" + r"(?<!^:)$"
 )  # Expression can't just be a colon.
 REC_FULL_URL = re.compile(r"^(\w+://|www\.)")
+REC_SCAN_END_QUOTE_PAIR = re.compile(r"""(''|"")$""")
+# {delim: regex of characters to scan for, ...}
+_REC_SCAN_SPECIAL_OF: Dict[str, Pattern[str]] = {}
 
 # Ignored types used in metomi.rose.variable.ignored_reason,
 # used by macros and user switches.
@@ -196,44 +200,61 @@ def array_join(array):
 
 
 def _scan_string(value, delim=',', remove_esc_char=False):
-    """Split "value" by "delim", handling quotes."""
-    item = ''
-    skip_inds = []
-    for quote_pair_match in re.finditer(r"""(''|"")$""", value):
-        skip_inds.extend([quote_pair_match.start(0), quote_pair_match.end(0)])
-    is_in_quotes = {'"': False, "'": False}
-    other_quote = {'"': "'", "'": '"'}
+    """Split "value" by "delim", handling quotes.
+
+    Only quotes, escapes and delimiters can change the state of the scan, so
+    jump between them and slice the items out of the value.
+
+    """
     esc_char = "\\"
-    was_escaped = False
-    is_escaped = False
-    letter = None
-    for i, letter in enumerate(value):
+    if not value:
+        return
+    if len(delim) == 1 and not any(
+        char in value for char in ("'", '"', esc_char)
+    ):
+        yield from value.split(delim)
+        return
+    rec_special = _REC_SCAN_SPECIAL_OF.get(delim)
+    if rec_special is None:
+        rec_special = re.compile(
+            "[" + re.escape("".join(set("'\"" + esc_char + delim))) + "]"
+        )
+        _REC_SCAN_SPECIAL_OF[delim] = rec_special
+    # The first quote of a quote pair at the end does not open a quote.
+    match = REC_SCAN_END_QUOTE_PAIR.search(value)
+    skip_ind = -1 if match is None else match.start()
+    quote = None  # the open quote character, if any
+    esc_ind = -2  # the index of the last escape character that escapes
+    pieces = []  # the pieces of the current item, before start
+    start = 0
+    for match in rec_special.finditer(value):
+        i = match.start()
+        letter = value[i]
+        was_escaped = esc_ind == i - 1
         if (
-            letter in is_in_quotes
-            and i not in skip_inds
-            and not is_in_quotes[other_quote[letter]]
-            and not is_escaped
-        ):
-            is_in_quotes[letter] = not is_in_quotes[letter]
-        was_escaped = is_escaped
-        is_escaped = letter == esc_char and not is_escaped
-        if remove_esc_char and was_escaped and letter in (delim + esc_char):
-            item = item[:-1] + letter
-        elif (
-            letter == delim
-            and not any(is_in_quotes.values())
+            letter in "'\""
+            and i != skip_ind
+            and quote in (None, letter)
             and not was_escaped
         ):
-            yield item
-            item = ''
-        elif item + letter == value:
-            item += letter
-            yield item
-            item = ''
-        else:
-            item += letter
+            quote = None if quote else letter
+        if letter == esc_char and not was_escaped:
+            esc_ind = i
+        if remove_esc_char and was_escaped and letter in (delim + esc_char):
+            pieces.append(value[start : i - 1])
+            start = i
+        elif letter == delim and quote is None and not was_escaped:
+            pieces.append(value[start:i])
+            yield "".join(pieces)
+            pieces = []
+            start = i + 1
+    pieces.append(value[start:])
+    item = "".join(pieces)
     if item or (
-        letter == delim and not any(is_in_quotes.values()) and not was_escaped
+        value
+        and value[-1] == delim
+        and quote is None
+        and esc_ind != len(value) - 2
     ):
         yield item
 
@@ -0,0 +1,156 @@
+#!/usr/bin/env bash
+#-------------------------------------------------------------------------------
+# Copyright (C) British Crown (Met Office) & Contributors.
+#
+# This file is part of Rose, a framework for meteorological suites.
+#
+# Rose is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Rose is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Rose. If not, see <http://www.gnu.org/licenses/>.
+#-------------------------------------------------------------------------------
+# Test "rose app-upgrade --all-apps".
+#-------------------------------------------------------------------------------
+. $(dirname $0)/test_header
+#-------------------------------------------------------------------------------
+tests 12
+
+#-------------------------------------------------------------------------------
+function init_app() {
+    mkdir -p $TEST_DIR/suite/app/$1
+    cat >$TEST_DIR/suite/app/$1/rose-app.conf
+}
+
+init_meta test-app-upgrade 0.1 0.2 0.3
+init_macro test-app-upgrade <<'__MACRO__'
+import metomi.rose.upgrade
+
+
+class Upgrade01to02(metomi.rose.upgrade.MacroUpgrade):
+
+    """Upgrade from 0.1 to 0.2."""
+
+    BEFORE_TAG = "0.1"
+    AFTER_TAG = "0.2"
+
+    def upgrade(self, config, meta_config=None):
+        self.add_setting(config, ["env", "Z"], "1")
+        return config, self.reports
+
+
+class Upgrade02to03(metomi.rose.upgrade.MacroUpgrade):
+
+    """Upgrade from 0.2 to 0.3."""
+
+    BEFORE_TAG = "0.2"
+    AFTER_TAG = "0.3"
+
+    def upgrade(self, config, meta_config=None):
+        self.change_setting_value(config, ["env", "Z"], "2")
+        return config, self.reports
+__MACRO__
+for APP in bar foo; do
+    init_app $APP <<'__CONFIG__'
+meta=test-app-upgrade/0.1
+
+[env]
+A=1
+__CONFIG__
+done
+init_app baz <<'__CONFIG__'
+meta=test-app-upgrade/0.3
+
+[env]
+A=1
+Z=2
+__CONFIG__
+init_app qux <<'__CONFIG__'
+meta=test-app-other/0.1
+__CONFIG__
+touch $TEST_DIR/suite/rose-suite.conf
+setup
+#-------------------------------------------------------------------------------
+TEST_KEY=$TEST_KEY_BASE-fail
+# Check no app is changed if an app cannot change version.
+run_fail "$TEST_KEY" rose app-upgrade --non-interactive --all-apps \
+    --meta-path=../rose-meta/ -C ../suite/app/foo 0.2
+file_cmp "$TEST_KEY.out" "$TEST_KEY.out" <<'__OUTPUT__'
+[INFO] app/bar/rose-app.conf
+[U] Upgrade_0.1-0.2: changes: 2
+    env=Z=1
+        Added with value '1'
+    =meta=test-app-upgrade/0.2
+        Upgraded from 0.1 to 0.2
+[INFO] app/baz/rose-app.conf
+[INFO] app/foo/rose-app.conf
+[U] Upgrade_0.1-0.2: changes: 2
+    env=Z=1
+        Added with value '1'
+    =meta=test-app-upgrade/0.2
+        Upgraded from 0.1 to 0.2
+__OUTPUT__
+file_cmp "$TEST_KEY.err" "$TEST_KEY.err" <<'__ERR__'
+[FAIL] 0.2: invalid version.
+[FAIL] 1 of 3 apps failed: no apps changed.
+__ERR__
+file_cmp "$TEST_KEY.foo" ../suite/app/foo/rose-app.conf <<'__CONFIG__'
+meta=test-app-upgrade/0.1
+
+[env]
+A=1
+__CONFIG__
+#-------------------------------------------------------------------------------
+TEST_KEY=$TEST_KEY_BASE-jobs
+# Check changing all apps of a category in parallel.
+run_pass "$TEST_KEY" rose app-upgrade --non-interactive --all-apps \
+    --jobs=2 --meta-path=../rose-meta/ -C ../suite/app/foo 0.3
+file_cmp "$TEST_KEY.out" "$TEST_KEY.out" <<'__OUTPUT__'
+[INFO] app/bar/rose-app.conf
+[U] Upgrade_0.1-0.3: changes: 3
+    env=Z=1
+        Added with value '1'
+    env=Z=2
+        Value: '1' -> '2'
+    =meta=test-app-upgrade/0.3
+        Upgraded from 0.1 to 0.3
+[INFO] app/baz/rose-app.conf
+[INFO] 0.3: already at this version.
+[INFO] app/foo/rose-app.conf
+[U] Upgrade_0.1-0.3: changes: 3
+    env=Z=1
+        Added with value '1'
+    env=Z=2
+        Value: '1' -> '2'
+    =meta=test-app-upgrade/0.3
+        Upgraded from 0.1 to 0.3
+__OUTPUT__
+file_cmp "$TEST_KEY.err" "$TEST_KEY.err" </dev/null
+for APP in bar baz foo; do
+    file_cmp "$TEST_KEY.$APP" ../suite/app/$APP/rose-app.conf <<'__CONFIG__'
+meta=test-app-upgrade/0.3
+
+[env]
+A=1
+Z=2
+__CONFIG__
+done
+file_cmp "$TEST_KEY.qux" ../suite/app/qux/rose-app.conf <<'__CONFIG__'
+meta=test-app-other/0.1
+__CONFIG__
+#-------------------------------------------------------------------------------
+TEST_KEY=$TEST_KEY_BASE-output-dir
+# Check an output directory cannot be used for all apps.
+run_fail "$TEST_KEY" rose app-upgrade --non-interactive --all-apps \
+    --meta-path=../rose-meta/ -C ../suite/app/foo -O ../out 0.3
+teardown
+rm -rf $TEST_DIR/suite
+#-------------------------------------------------------------------------------
+exit
@@ -0,0 +1,131 @@
+#!/usr/bin/env bash
+#-------------------------------------------------------------------------------
+# Copyright (C) British Crown (Met Office) & Contributors.
+#
+# This file is part of Rose, a framework for meteorological suites.
+#
+# Rose is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Rose is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Rose. If not, see <http://www.gnu.org/licenses/>.
+#-------------------------------------------------------------------------------
+# Test "rose macro --jobs=N" gives the same results as a serial run.
+#-------------------------------------------------------------------------------
+. $(dirname $0)/test_header
+init </dev/null
+rm config/rose-app.conf
+#-------------------------------------------------------------------------------
+tests 9
+#-------------------------------------------------------------------------------
+# Setup.
+TEST_SUITE=test-suite
+mkdir -p $TEST_DIR/$TEST_SUITE
+cat >$TEST_DIR/$TEST_SUITE/rose-suite.conf <<'__SUITE_CONF__'
+[env]
+ANSWER=42
+__SUITE_CONF__
+
+# Metadata shared by the apps.
+mkdir -p $TEST_DIR/meta/test-app/HEAD
+cat >$TEST_DIR/meta/test-app/HEAD/rose-meta.conf <<'__META_CONF__'
+[env=NUMBER]
+type=integer
+
+[env=CHOICE]
+compulsory=true
+values=yes,no
+__META_CONF__
+export ROSE_META_PATH=$TEST_DIR/meta
+
+for NAME in one two three four five; do
+    mkdir -p $TEST_DIR/$TEST_SUITE/app/$NAME
+    cat >$TEST_DIR/$TEST_SUITE/app/$NAME/rose-app.conf <<__APP_CONF__
+meta=test-app
+
+[env]
+NUMBER=$NAME
+__APP_CONF__
+done
+cat >$TEST_DIR/$TEST_SUITE/app/two/rose-app.conf <<'__APP_CONF__'
+meta=test-app
+
+[env]
+CHOICE=yes
+NUMBER=2
+__APP_CONF__
+#-------------------------------------------------------------------------------
+# Validate the suite in series and with jobs.
+TEST_KEY=$TEST_KEY_BASE-validate-serial
+run_fail $TEST_KEY rose macro -C $TEST_DIR/$TEST_SUITE -V
+file_cmp $TEST_KEY.err $TEST_KEY.err <<'__ERR__'
+[V] metomi.rose.macros.DefaultValidators: issues: 2
+    env=CHOICE=None
+        Variable set as compulsory, but not in configuration.
+    env=NUMBER=five
+        Not an integer: 'five'
+[V] metomi.rose.macros.DefaultValidators: issues: 2
+    env=CHOICE=None
+        Variable set as compulsory, but not in configuration.
+    env=NUMBER=four
+        Not an integer: 'four'
+[V] metomi.rose.macros.DefaultValidators: issues: 2
+    env=CHOICE=None
+        Variable set as compulsory, but not in configuration.
+    env=NUMBER=one
+        Not an integer: 'one'
+[V] metomi.rose.macros.DefaultValidators: issues: 2
+    env=CHOICE=None
+        Variable set as compulsory, but not in configuration.
+    env=NUMBER=three
+        Not an integer: 'three'
+__ERR__
+file_cmp $TEST_KEY.out $TEST_KEY.out <<'__OUT__'
+[INFO] app/five/rose-app.conf
+[INFO] app/four/rose-app.conf
+[INFO] app/one/rose-app.conf
+[INFO] app/three/rose-app.conf
+[INFO] app/two/rose-app.conf
+[INFO] rose-suite.conf
+__OUT__
+TEST_KEY=$TEST_KEY_BASE-validate-jobs
+run_fail $TEST_KEY rose macro -C $TEST_DIR/$TEST_SUITE -V --jobs=3
+file_cmp $TEST_KEY.err $TEST_KEY.err $TEST_KEY_BASE-validate-serial.err
+file_cmp $TEST_KEY.out $TEST_KEY.out $TEST_KEY_BASE-validate-serial.out
+#-------------------------------------------------------------------------------
+# Fix the suite with jobs, which runs one config at a time.
+TEST_KEY=$TEST_KEY_BASE-fix-jobs
+run_pass $TEST_KEY rose macro -C $TEST_DIR/$TEST_SUITE -F -y --jobs=3
+file_cmp $TEST_KEY.out $TEST_KEY.out <<'__OUT__'
+[INFO] app/five/rose-app.conf
+[T] metomi.rose.macros.DefaultTransforms: changes: 1
+    env=CHOICE=yes
+        Added compulsory option
+[INFO] app/four/rose-app.conf
+[T] metomi.rose.macros.DefaultTransforms: changes: 1
+    env=CHOICE=yes
+        Added compulsory option
+[INFO] app/one/rose-app.conf
+[T] metomi.rose.macros.DefaultTransforms: changes: 1
+    env=CHOICE=yes
+        Added compulsory option
+[INFO] app/three/rose-app.conf
+[T] metomi.rose.macros.DefaultTransforms: changes: 1
+    env=CHOICE=yes
+        Added compulsory option
+[INFO] app/two/rose-app.conf
+[T] metomi.rose.macros.DefaultTransforms: changes: 0
+[INFO] rose-suite.conf
+[T] metomi.rose.macros.DefaultTransforms: changes: 0
+__OUT__
+file_cmp $TEST_KEY.err $TEST_KEY.err </dev/null
+#-------------------------------------------------------------------------------
+rm -r $TEST_DIR/$TEST_SUITE $TEST_DIR/meta
+exit